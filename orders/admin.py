@@ -1,5 +1,7 @@
 from django.contrib import admin
 
+from reporting.pagination import EstimatedCountPaginator
+
 from .models import Order, OrderItem1, OrderItem2
 
 
@@ -10,6 +12,9 @@ class OrderAdmin(admin.ModelAdmin):
     search_fields = ("user__email", "id")
     ordering = ("-created_at",)
     raw_id_fields = ("user",)
+    list_select_related = ("user",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(OrderItem1)
@@ -19,6 +24,9 @@ class OrderItem1Admin(admin.ModelAdmin):
     search_fields = ("order__id",)
     ordering = ("-created_at",)
     raw_id_fields = ("order",)
+    list_select_related = ("order__user",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 @admin.register(OrderItem2)
@@ -28,6 +36,9 @@ class OrderItem2Admin(admin.ModelAdmin):
     search_fields = ("order__id",)
     ordering = ("-created_at",)
     raw_id_fields = ("order",)
+    list_select_related = ("order__user",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def total_price(self, obj):
         return obj.placement_price + obj.article_price
@@ -0,0 +1,181 @@
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.cache import invalidate_closed_days
+from orders.models import (
+    ArchivedOrder,
+    ArchivedOrderItem1,
+    ArchivedOrderItem2,
+    DailySketch,
+    Order,
+    OrderItem1,
+    OrderItem2,
+    UserDailyStats,
+)
+from orders.rollups import apply_contribution
+
+ARCHIVE_COPIES = [
+    (ArchivedOrderItem1, OrderItem1, "order_id", ["id", "order_id", "price", "created_at", "updated_at"]),
+    (
+        ArchivedOrderItem2,
+        OrderItem2,
+        "order_id",
+        ["id", "order_id", "placement_price", "article_price", "created_at", "updated_at"],
+    ),
+    (ArchivedOrder, Order, "id", ["id", "user_id", "created_at", "updated_at"]),
+]
+
+
+def _rollup_deltas(order_ids) -> Dict:
+    deltas: Dict = defaultdict(lambda: defaultdict(int))
+
+    orders = (
+        Order.objects.filter(pk__in=order_ids)
+        .annotate(day=TruncDate("created_at"))
+        .values("user_id", "day")
+        .annotate(orders_count=Count("id"))
+        .order_by()
+    )
+    for row in orders:
+        deltas[(row["user_id"], row["day"])]["orders_count"] -= row["orders_count"]
+
+    items1 = (
+        OrderItem1.objects.filter(order_id__in=order_ids)
+        .annotate(day=TruncDate("created_at"))
+        .values("order__user_id", "day")
+        .annotate(orderitem1_count=Count("id"), orderitem1_amount=Sum("price"))
+        .order_by()
+    )
+    for row in items1:
+        target = deltas[(row["order__user_id"], row["day"])]
+        target["orderitem1_count"] -= row["orderitem1_count"]
+        target["orderitem1_amount"] -= row["orderitem1_amount"]
+
+    items2 = (
+        OrderItem2.objects.filter(order_id__in=order_ids)
+        .annotate(day=TruncDate("created_at"))
+        .values("order__user_id", "day")
+        .annotate(
+            orderitem2_count=Count("id"),
+            orderitem2_amount=Sum(F("placement_price") + F("article_price"), output_field=DecimalField()),
+        )
+        .order_by()
+    )
+    for row in items2:
+        target = deltas[(row["order__user_id"], row["day"])]
+        target["orderitem2_count"] -= row["orderitem2_count"]
+        target["orderitem2_amount"] -= row["orderitem2_amount"]
+
+    return deltas
+
+
+def _copy_to_archive(order_ids, archived_at: datetime) -> None:
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for archive_model, model, key, columns in ARCHIVE_COPIES:
+            column_list = ", ".join(quote(column) for column in columns)
+            cursor.execute(
+                f"INSERT INTO {quote(archive_model._meta.db_table)} ({column_list}, {quote('archived_at')}) "
+                f"SELECT {column_list}, %s FROM {quote(model._meta.db_table)} WHERE {quote(key)} = ANY(%s) "
+                f"ON CONFLICT ({quote('id')}) DO NOTHING",
+                [archived_at, list(order_ids)],
+            )
+
+
+def _delete_rows(order_ids) -> Dict[str, int]:
+    quote = connection.ops.quote_name
+    deleted = {}
+    with connection.cursor() as cursor:
+        for name, model, key in [
+            ("items1", OrderItem1, "order_id"),
+            ("items2", OrderItem2, "order_id"),
+            ("orders", Order, "id"),
+        ]:
+            cursor.execute(
+                f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(key)} = ANY(%s)",
+                [list(order_ids)],
+            )
+            deleted[name] = cursor.rowcount
+    return deleted
+
+
+def archive_batch(cutoff: datetime, batch_size: int, copy: bool = True, statement_timeout: Optional[float] = None):
+    with transaction.atomic():
+        if statement_timeout and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT set_config('statement_timeout', %s, true)", [f"{int(statement_timeout * 1000)}"])
+
+        order_ids = list(
+            Order.objects.filter(created_at__lt=cutoff)
+            .order_by("created_at")
+            .select_for_update(skip_locked=True)
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not order_ids:
+            return {"orders": 0, "items1": 0, "items2": 0}
+
+        deltas = _rollup_deltas(order_ids)
+        if copy:
+            _copy_to_archive(order_ids, timezone.now())
+        deleted = _delete_rows(order_ids)
+
+        for (user_id, day), fields in deltas.items():
+            apply_contribution((user_id, day, dict(fields)), create=False)
+
+        users = {user_id for user_id, _ in deltas}
+        days = {day for _, day in deltas}
+        UserDailyStats.objects.filter(
+            user_id__in=users, day__in=days, orders_count=0, orderitem1_count=0, orderitem2_count=0
+        ).delete()
+        DailySketch.objects.filter(day__in=days).delete()
+        transaction.on_commit(lambda: invalidate_closed_days(*days))
+
+    return deleted
+
+
+def archive_orders(
+    cutoff: datetime,
+    batch_size: int = 1000,
+    copy: bool = True,
+    pause: float = 0.0,
+    max_runtime: Optional[float] = None,
+    target_batch_seconds: float = 1.0,
+    min_batch_size: int = 50,
+    statement_timeout: Optional[float] = 30.0,
+    on_batch: Optional[Callable[[Dict[str, int], int, float], None]] = None,
+) -> Dict[str, int]:
+    totals = {"orders": 0, "items1": 0, "items2": 0, "batches": 0}
+    max_batch_size = batch_size
+    started = time.monotonic()
+
+    while True:
+        batch_started = time.monotonic()
+        deleted = archive_batch(cutoff, batch_size, copy=copy, statement_timeout=statement_timeout)
+        elapsed = time.monotonic() - batch_started
+        if not deleted["orders"]:
+            break
+
+        totals["batches"] += 1
+        for name, count in deleted.items():
+            totals[name] += count
+        if on_batch:
+            on_batch(deleted, batch_size, elapsed)
+
+        if elapsed > target_batch_seconds:
+            batch_size = max(min_batch_size, batch_size // 2)
+        elif elapsed < target_batch_seconds / 2:
+            batch_size = min(max_batch_size, batch_size * 2)
+
+        if max_runtime is not None and time.monotonic() - started >= max_runtime:
+            break
+        if pause:
+            time.sleep(pause)
+
+    return totals
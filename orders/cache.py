@@ -0,0 +1,118 @@
+import hashlib
+import json
+import threading
+import time as clock
+import uuid
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import date, datetime, time
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+VERSION_KEY = "reports:version"
+COALESCE_POLL_INTERVAL = 0.05
+
+_MISSING = object()
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def get_report_cache_version() -> str:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        generation = uuid.uuid4().hex
+        cache.add(VERSION_KEY, generation, timeout=None)
+        version = cache.get(VERSION_KEY, generation)
+    return version
+
+
+def bump_report_cache_version() -> None:
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_closed_days(*days: Optional[date]) -> None:
+    today = timezone.localdate()
+    if any(day is not None and day < today for day in days):
+        bump_report_cache_version()
+
+
+def is_closed_range(end_date: datetime) -> bool:
+    if timezone.is_aware(end_date):
+        end_date = timezone.localtime(end_date)
+    today = timezone.localdate()
+    return end_date.date() < today or (end_date.date() == today and end_date.time() == time.min)
+
+
+def cached_for_closed_range(name: str, params: Dict[str, Any], end_date: datetime, compute: Callable[[], Any]) -> Any:
+    if not is_closed_range(end_date):
+        return compute()
+
+    key = f"reports:{get_report_cache_version()}:{name}:{_params_digest(params)}"
+
+    result = cache.get(key)
+    if result is None:
+        result = compute()
+        cache.set(key, result, timeout=settings.REPORT_CACHE_TIMEOUT)
+    return result
+
+
+def coalesced(name: str, params: Dict[str, Any], compute: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+    timeout = settings.REPORT_COALESCE_TIMEOUT if timeout is None else timeout
+    key = f"coalesce:{get_report_cache_version()}:{name}:{_params_digest(params)}"
+
+    with _inflight_lock:
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = _inflight[key] = Future()
+
+    if not leader:
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            return compute()
+
+    try:
+        result = _compute_once(key, compute, timeout)
+    except BaseException as exc:
+        future.set_exception(exc)
+        raise
+    else:
+        future.set_result(result)
+        return result
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def _compute_once(key: str, compute: Callable[[], Any], timeout: float) -> Any:
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout=timeout):
+        try:
+            result = compute()
+            cache.set(f"{key}:{token}", result, timeout=timeout)
+            return result
+        finally:
+            cache.delete(lock_key)
+
+    leader = cache.get(lock_key)
+    deadline = clock.monotonic() + timeout
+    while leader is not None and clock.monotonic() < deadline:
+        clock.sleep(COALESCE_POLL_INTERVAL)
+        result = cache.get(f"{key}:{leader}", _MISSING)
+        if result is not _MISSING:
+            return result
+        if cache.get(lock_key) != leader:
+            result = cache.get(f"{key}:{leader}", _MISSING)
+            if result is not _MISSING:
+                return result
+            break
+    return compute()
+
+
+def _params_digest(params: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
@@ -0,0 +1,52 @@
+import base64
+import json
+from datetime import timedelta
+from typing import Any, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+class InvalidWatermark(ValueError):
+    pass
+
+
+def encode_watermark(updated_at, pk) -> str:
+    payload = json.dumps({"t": updated_at.isoformat(), "id": str(pk)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_watermark(token: str) -> Tuple[Any, str]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        updated_at = parse_datetime(payload["t"])
+        pk = payload["id"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidWatermark("Invalid change feed token") from exc
+
+    if updated_at is None:
+        raise InvalidWatermark("Invalid change feed token")
+    return updated_at, pk
+
+
+def read_changes(
+    queryset: QuerySet, token: Optional[str], limit: int, safety_lag: timedelta = timedelta()
+) -> Tuple[List[Any], Optional[str], bool]:
+    queryset = queryset.filter(updated_at__lt=timezone.now() - safety_lag)
+    if token:
+        updated_at, pk = decode_watermark(token)
+        try:
+            pk = queryset.model._meta.pk.to_python(pk)
+        except ValidationError as exc:
+            raise InvalidWatermark("Invalid change feed token") from exc
+        queryset = queryset.filter(updated_at__gte=updated_at).filter(Q(updated_at__gt=updated_at) | Q(pk__gt=pk))
+
+    rows = list(queryset.order_by("updated_at", "pk")[: limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if rows:
+        token = encode_watermark(rows[-1].updated_at, rows[-1].pk)
+    return rows, token, has_more
@@ -0,0 +1,56 @@
+from django.db.models import F
+
+from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+
+from .models import Order, OrderItem1, OrderItem2
+
+FILTER_IN_MAX_VALUES = 100
+
+CREATED_AT_LOOKUPS = ["exact", "gte", "gt", "lte", "lt"]
+PRICE_LOOKUPS = ["gte", "lte"]
+
+
+class UUIDInFilter(filters.BaseInFilter, filters.UUIDFilter):
+    def filter(self, qs, value):
+        if value and len(value) > FILTER_IN_MAX_VALUES:
+            raise ValidationError({self.field_name + "__in": f"At most {FILTER_IN_MAX_VALUES} values can be listed"})
+        return super().filter(qs, value)
+
+
+class OrderFilter(filters.FilterSet):
+    user__in = UUIDInFilter(field_name="user_id", lookup_expr="in")
+
+    class Meta:
+        model = Order
+        fields = {"user": ["exact"], "created_at": CREATED_AT_LOOKUPS}
+
+
+class OrderItem1Filter(filters.FilterSet):
+    order__in = UUIDInFilter(field_name="order_id", lookup_expr="in")
+
+    class Meta:
+        model = OrderItem1
+        fields = {"order": ["exact"], "created_at": CREATED_AT_LOOKUPS, "price": PRICE_LOOKUPS}
+
+
+class OrderItem2Filter(filters.FilterSet):
+    order__in = UUIDInFilter(field_name="order_id", lookup_expr="in")
+    total_price__gte = filters.NumberFilter(method="filter_total_price")
+    total_price__lte = filters.NumberFilter(method="filter_total_price")
+
+    class Meta:
+        model = OrderItem2
+        fields = {
+            "order": ["exact"],
+            "created_at": CREATED_AT_LOOKUPS,
+            "placement_price": PRICE_LOOKUPS,
+            "article_price": PRICE_LOOKUPS,
+        }
+
+    def filter_total_price(self, queryset, name, value):
+        if value is None:
+            return queryset
+        return queryset.alias(_total_price=F("placement_price") + F("article_price")).filter(
+            **{name.replace("total_price", "_total_price"): value}
+        )
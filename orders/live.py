@@ -0,0 +1,229 @@
+import json
+import logging
+import select
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from orders.reports import ReportService
+
+logger = logging.getLogger(__name__)
+
+LIVE_CHANNEL = "orders_live_report"
+LISTEN_POLL_INTERVAL = 0.25
+
+LIVE_METRICS = (
+    "new_users",
+    "activated_users",
+    "orders_count",
+    "orderitem1_count",
+    "orderitem1_amount",
+    "orderitem2_count",
+    "orderitem2_amount",
+)
+
+Snapshot = Tuple[int, int, FrozenSet[int]]
+
+
+def parse_snapshot(value: str) -> Snapshot:
+    xmin, xmax, xip = value.split(":")
+    return int(xmin), int(xmax), frozenset(int(xid) for xid in xip.split(",") if xid)
+
+
+def visible_in_snapshot(xid: int, snapshot: Snapshot) -> bool:
+    xmin, xmax, in_progress = snapshot
+    return xid < xmin or (xid < xmax and xid not in in_progress)
+
+
+def publish_live_deltas(changes: Sequence[Tuple[date, Dict[str, Any]]], using: str = "default") -> None:
+    if not changes:
+        return
+    payload = json.dumps([[str(day), deltas] for day, deltas in changes], cls=DjangoJSONEncoder)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_notify(%s, json_build_object('xid', pg_current_xact_id()::text, 'changes', %s::json)::text)",
+            [LIVE_CHANNEL, payload],
+        )
+
+
+class LiveReport:
+    def __init__(self, resync_interval: Optional[float] = None, using: str = "default"):
+        self.resync_interval = resync_interval
+        self.using = using
+        self._condition = threading.Condition()
+        self._sync_lock = threading.Lock()
+        self._listen_lock = threading.Lock()
+        self._listener = None
+        self._thread = None
+        self._day = None
+        self._totals: Optional[Dict[str, Any]] = None
+        self._snapshot: Optional[Snapshot] = None
+        self._backlog: Optional[List[Tuple[Optional[int], date, Dict[str, Any]]]] = None
+        self._synced_at = 0.0
+        self.version = 0
+
+    def snapshot(self) -> Tuple[int, Dict[str, Any]]:
+        self.listen()
+        if self._is_stale():
+            self.resync()
+        with self._condition:
+            return self.version, self._row()
+
+    def wait(self, version: int, timeout: float) -> Tuple[int, Optional[Dict[str, Any]]]:
+        with self._condition:
+            changed = self._condition.wait_for(lambda: self.version != version, timeout=timeout)
+        if not changed and not self._is_stale():
+            return version, None
+        return self.snapshot()
+
+    def apply(self, day, deltas: Dict[str, Any], xid: Optional[int] = None) -> None:
+        with self._condition:
+            if self._backlog is not None:
+                self._backlog.append((xid, day, deltas))
+            if not self._add(day, deltas, xid):
+                return
+            self.version += 1
+            self._condition.notify_all()
+
+    def resync(self) -> None:
+        with self._sync_lock:
+            if not self._is_stale():
+                return
+
+            with self._condition:
+                self._backlog = []
+            try:
+                day = timezone.localdate()
+                snapshot, stats = self._read_today(day)
+            except BaseException:
+                with self._condition:
+                    self._backlog = None
+                raise
+
+            totals = {metric: 0 for metric in LIVE_METRICS}
+            for table in stats:
+                for metric, value in table.get(str(day), {}).items():
+                    if metric in totals:
+                        totals[metric] = value
+
+            with self._condition:
+                self._day, self._totals, self._snapshot = day, totals, snapshot
+                for xid, delta_day, deltas in self._backlog:
+                    self._add(delta_day, deltas, xid)
+                self._backlog, self._synced_at = None, time.monotonic()
+                self.version += 1
+                self._condition.notify_all()
+
+    def listen(self) -> None:
+        with self._listen_lock:
+            if self._listener is not None:
+                return
+            connection = connections[self.using]
+            listener = connection.get_new_connection(connection.get_connection_params())
+            listener.autocommit = True
+            listener.execute(f"LISTEN {LIVE_CHANNEL}")
+            with self._condition:
+                self._synced_at = 0.0
+            self._listener = listener
+            self._thread = threading.Thread(
+                target=self._receive, args=(listener,), name="live-report-listener", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        with self._listen_lock:
+            thread, self._listener, self._thread = self._thread, None, None
+        if thread is not None:
+            thread.join()
+
+    def reset(self) -> None:
+        self.stop()
+        with self._condition:
+            self._day, self._totals, self._snapshot, self._synced_at = None, None, None, 0.0
+
+    def _receive(self, listener) -> None:
+        try:
+            while self._listener is listener:
+                if not select.select([listener.fileno()], [], [], LISTEN_POLL_INTERVAL)[0]:
+                    continue
+                listener.pgconn.consume_input()
+                notification = listener.pgconn.notifies()
+                while notification is not None:
+                    message = json.loads(notification.extra)
+                    for day, deltas in message["changes"]:
+                        self.apply(date.fromisoformat(day), deltas, xid=int(message["xid"]))
+                    notification = listener.pgconn.notifies()
+        except Exception:
+            logger.warning("Live report listener disconnected; resyncing on the next request", exc_info=True)
+            with self._listen_lock:
+                if self._listener is listener:
+                    self._listener, self._thread = None, None
+            with self._condition:
+                self._synced_at = 0.0
+                self.version += 1
+                self._condition.notify_all()
+        finally:
+            listener.close()
+
+    def _read_today(self, day: date) -> Tuple[Snapshot, Tuple[Dict[str, Dict], ...]]:
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+        connection = connections[self.using]
+        outermost = not connection.in_atomic_block
+        with transaction.atomic(using=self.using):
+            with connection.cursor() as cursor:
+                if outermost:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cursor.execute("SELECT pg_current_snapshot()::text")
+                snapshot = parse_snapshot(cursor.fetchone()[0])
+            stats = ReportService._collect_statistics([(start, start + timedelta(days=1))], TruncDate, workers=1)
+        if outermost:
+            connection.close()
+        return snapshot, stats
+
+    def _add(self, day, deltas: Dict[str, Any], xid: Optional[int]) -> bool:
+        if self._totals is None or day != self._day:
+            return False
+        if xid is not None and self._snapshot is not None and visible_in_snapshot(xid, self._snapshot):
+            return False
+        for metric, value in deltas.items():
+            self._totals[metric] += Decimal(value) if isinstance(value, str) else value
+        return True
+
+    def _is_stale(self) -> bool:
+        interval = settings.REPORT_LIVE_RESYNC_SECONDS if self.resync_interval is None else self.resync_interval
+        return (
+            self._totals is None or self._day != timezone.localdate() or time.monotonic() - self._synced_at >= interval
+        )
+
+    def _row(self) -> Dict[str, Any]:
+        return ReportService._build_row(str(self._day), self._totals, self._totals, self._totals, self._totals)
+
+
+live_report = LiveReport()
+
+
+def format_event(version: int, row: Dict[str, Any]) -> str:
+    return f"id: {version}\nevent: report\ndata: {json.dumps(row)}\n\n"
+
+
+def stream_live_report(report: LiveReport = live_report, heartbeat: Optional[float] = None):
+    heartbeat = settings.REPORT_LIVE_HEARTBEAT_SECONDS if heartbeat is None else heartbeat
+    version, row = report.snapshot()
+    yield f"retry: {int(heartbeat * 1000)}\n"
+    yield format_event(version, row)
+
+    while True:
+        next_version, row = report.wait(version, heartbeat)
+        if row is None:
+            yield ": keepalive\n\n"
+            continue
+        version = next_version
+        yield format_event(version, row)
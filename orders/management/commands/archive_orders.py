@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from orders.archival import archive_orders
+from orders.models import Order, OrderItem1, OrderItem2
+
+
+class Command(BaseCommand):
+    help = "Archive or purge orders and their items older than a cutoff in small, throttled batches"
+
+    def add_arguments(self, parser):
+        cutoff = parser.add_mutually_exclusive_group(required=True)
+        cutoff.add_argument(
+            "--before",
+            type=str,
+            help="Archive orders created before this date (YYYY-MM-DD).",
+        )
+        cutoff.add_argument(
+            "--older-than-days",
+            type=int,
+            help="Archive orders created more than this many days ago.",
+        )
+        parser.add_argument(
+            "--purge",
+            action="store_true",
+            help="Delete rows without copying them to the archive tables.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Maximum orders per batch. Batches shrink when they run longer than --target-seconds. Default: 1000",
+        )
+        parser.add_argument(
+            "--target-seconds",
+            type=float,
+            default=1.0,
+            help="Target duration of one batch transaction. Default: 1.0",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0.1,
+            help="Pause between batches in seconds. Default: 0.1",
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            help="Stop after this many seconds; rerun to continue.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only count the rows that would be archived.",
+        )
+
+    def handle(self, *args, **options):
+        if options["before"]:
+            try:
+                cutoff = timezone.make_aware(datetime.strptime(options["before"], "%Y-%m-%d"))
+            except ValueError:
+                raise CommandError(f"Invalid date: {options['before']}. Expected YYYY-MM-DD")
+        else:
+            cutoff = timezone.now() - timedelta(days=options["older_than_days"])
+
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        if options["dry_run"]:
+            orders = Order.objects.filter(created_at__lt=cutoff)
+            self.stdout.write(
+                f"Would archive {orders.count()} orders, "
+                f"{OrderItem1.objects.filter(order__in=orders).count()} OrderItem1 and "
+                f"{OrderItem2.objects.filter(order__in=orders).count()} OrderItem2 created before {cutoff}"
+            )
+            return
+
+        action = "Purging" if options["purge"] else "Archiving"
+        self.stdout.write(self.style.SUCCESS(f"{action} orders created before {cutoff}..."))
+
+        def report(deleted, batch_size, elapsed):
+            self.stdout.write(
+                f"  batch of {batch_size}: {deleted['orders']} orders, {deleted['items1']} OrderItem1, "
+                f"{deleted['items2']} OrderItem2 in {elapsed:.2f}s"
+            )
+
+        totals = archive_orders(
+            cutoff,
+            batch_size=options["batch_size"],
+            copy=not options["purge"],
+            pause=options["sleep"],
+            max_runtime=options["max_runtime"],
+            target_batch_seconds=options["target_seconds"],
+            on_batch=report,
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done: {totals['orders']} orders, {totals['items1']} OrderItem1 and {totals['items2']} OrderItem2 "
+                f"in {totals['batches']} batches"
+            )
+        )
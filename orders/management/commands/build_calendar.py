@@ -0,0 +1,64 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.periods import CALENDAR_SCHEMES, build_calendar
+
+
+class Command(BaseCommand):
+    help = "Fill the calendar table that maps each day to its week, month, quarter and fiscal periods"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            type=str,
+            required=True,
+            help="First day to map (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--end",
+            type=str,
+            required=True,
+            help="Day after the last day to map (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--schemes",
+            nargs="+",
+            choices=list(CALENDAR_SCHEMES),
+            help="Period schemes to build. Default: all",
+        )
+        parser.add_argument(
+            "--fiscal-start-month",
+            type=int,
+            default=1,
+            help="Month the fiscal year starts in; it begins on the Monday nearest the 1st. Default: 1",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows upserted per statement. Default: 5000",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.strptime(options["start"], "%Y-%m-%d").date()
+            end = datetime.strptime(options["end"], "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError("Invalid date. Expected YYYY-MM-DD")
+
+        if start >= end:
+            raise CommandError("--start must be before --end")
+        if not 1 <= options["fiscal_start_month"] <= 12:
+            raise CommandError("--fiscal-start-month must be between 1 and 12")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        written = build_calendar(
+            start,
+            end,
+            schemes=options["schemes"],
+            fiscal_start_month=options["fiscal_start_month"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} calendar rows from {start} to {end}"))
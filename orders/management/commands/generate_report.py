@@ -1,8 +1,10 @@
 from datetime import datetime, timedelta
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 
 from orders.reports import ReportService, print_report
+from orders.writers import REPORT_FORMATS, WriterUnavailable, open_report_writer, write_rows
 
 
 class Command(BaseCommand):
@@ -26,6 +28,29 @@ class Command(BaseCommand):
             default="daily",
             help="Aggregation period (daily, weekly, or monthly). Default: daily",
         )
+        parser.add_argument(
+            "--format",
+            type=str,
+            choices=["table"] + REPORT_FORMATS,
+            default="table",
+            help="Output format (table, csv, jsonl, or parquet). Default: table",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            help="Compute the report in parallel time shards on this many connections. "
+            "Default: REPORT_SHARD_WORKERS setting",
+        )
+        parser.add_argument(
+            "--shard-days",
+            type=int,
+            help="Days per shard when running in parallel. Default: REPORT_SHARD_DAYS setting",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="Write the report to this file instead of stdout. Required for parquet.",
+        )
 
     def handle(self, *args, **options):
         if options["end_date"]:
@@ -39,15 +64,43 @@ class Command(BaseCommand):
             start_date = end_date - timedelta(days=30)
 
         period = options["period"]
+        fmt = options["format"]
+        output = options["output"]
+        workers = options["workers"] if options["workers"] is not None else settings.REPORT_SHARD_WORKERS
+        shard_days = options["shard_days"]
+        if shard_days is not None and shard_days <= 0:
+            raise CommandError("--shard-days must be positive")
 
-        self.stdout.write(
-            self.style.SUCCESS(f"Generating {period} report from {start_date.date()} to {end_date.date()}...")
-        )
+        if fmt == "table":
+            self.stdout.write(
+                self.style.SUCCESS(f"Generating {period} report from {start_date.date()} to {end_date.date()}...")
+            )
+
+            report_data = ReportService.generate_report(start_date, end_date, period, workers, shard_days)
 
-        report_data = ReportService.generate_report(start_date, end_date, period)
+            self.stdout.write("\n")
+            print_report(report_data)
+
+            self.stdout.write("\n")
+            self.stdout.write(self.style.SUCCESS(f"Report generated successfully with {len(report_data)} periods"))
+            return
+
+        if fmt == "parquet" and not output:
+            raise CommandError("--output is required for parquet format")
+
+        if workers > 1:
+            rows = iter(ReportService.generate_report(start_date, end_date, period, workers, shard_days))
+        else:
+            rows = ReportService.iter_report(start_date, end_date, period)
 
-        self.stdout.write("\n")
-        print_report(report_data)
+        try:
+            if output and fmt != "parquet":
+                with open(output, "w", newline="", encoding="utf-8") as stream:
+                    written = write_rows(rows, open_report_writer(fmt, stream=stream))
+            else:
+                written = write_rows(rows, open_report_writer(fmt, stream=self.stdout, path=output))
+        except WriterUnavailable as exc:
+            raise CommandError(str(exc))
 
-        self.stdout.write("\n")
-        self.stdout.write(self.style.SUCCESS(f"Report generated successfully with {len(report_data)} periods"))
+        if output:
+            self.stdout.write(self.style.SUCCESS(f"Report written to {output} with {written} periods"))
@@ -0,0 +1,82 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.reports import ReportService, print_report
+
+
+class Command(BaseCommand):
+    help = "Generate several reports from one shared scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--spec",
+            action="append",
+            dest="specs",
+            default=[],
+            metavar="START:END[:PERIOD]",
+            help="Report to generate, e.g. 2025-01-01:2025-04-01:monthly. Repeat for several reports.",
+        )
+        parser.add_argument(
+            "--file",
+            type=str,
+            help='JSON file with a list of {"start_date", "end_date", "period"} objects.',
+        )
+        parser.add_argument(
+            "--format",
+            type=str,
+            choices=["table", "json"],
+            default="table",
+            help="Output format (table or json). Default: table",
+        )
+
+    def handle(self, *args, **options):
+        specs = [self._parse_spec(value) for value in options["specs"]]
+        if options["file"]:
+            with open(options["file"], encoding="utf-8") as stream:
+                specs += [
+                    self._build_spec(item["start_date"], item["end_date"], item.get("period", "daily"))
+                    for item in json.load(stream)
+                ]
+        if not specs:
+            raise CommandError("Provide at least one --spec or a --file")
+
+        try:
+            reports = ReportService.generate_reports(specs)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        if options["format"] == "json":
+            payload = [
+                {
+                    "start_date": start_date.date().isoformat(),
+                    "end_date": end_date.date().isoformat(),
+                    "period": period,
+                    "data": report_data,
+                }
+                for (start_date, end_date, period), report_data in zip(specs, reports)
+            ]
+            self.stdout.write(json.dumps({"reports": payload}, indent=2))
+            return
+
+        for (start_date, end_date, period), report_data in zip(specs, reports):
+            self.stdout.write(
+                self.style.SUCCESS(f"{period.capitalize()} report from {start_date.date()} to {end_date.date()}")
+            )
+            print_report(report_data)
+            self.stdout.write("\n")
+
+        self.stdout.write(self.style.SUCCESS(f"Generated {len(reports)} reports from one scan"))
+
+    def _parse_spec(self, value):
+        parts = value.split(":")
+        if len(parts) not in (2, 3):
+            raise CommandError(f"Invalid spec: {value}. Expected START:END[:PERIOD]")
+        return self._build_spec(*parts)
+
+    def _build_spec(self, start_date, end_date, period="daily"):
+        try:
+            return (datetime.strptime(start_date, "%Y-%m-%d"), datetime.strptime(end_date, "%Y-%m-%d"), period)
+        except ValueError:
+            raise CommandError(f"Invalid dates: {start_date}, {end_date}. Expected YYYY-MM-DD")
@@ -1,6 +1,6 @@
 from datetime import timedelta
 from decimal import Decimal
-from random import choice, randint
+from random import choice, randint, seed
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
@@ -25,10 +25,17 @@ class Command(BaseCommand):
             default=7,
             help="Number of days to spread data across. Default: 7",
         )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            help="Random seed for a reproducible dataset.",
+        )
 
     def handle(self, *args, **options):
         num_users = options["users"]
         num_days = options["days"]
+        if options["seed"] is not None:
+            seed(options["seed"])
 
         self.stdout.write(self.style.SUCCESS(f"Generating sample data: {num_users} users over {num_days} days..."))
 
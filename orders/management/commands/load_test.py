@@ -0,0 +1,263 @@
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from users.models import User
+
+DEFAULT_MIX = "daily=3,weekly=1,monthly=1,statistics=2,orders_list=3,orders_create=1"
+
+
+def _report_params(rng, anchor, period_days):
+    end_date = anchor - timedelta(days=rng.randint(0, 30))
+    return {"start_date": (end_date - timedelta(days=period_days)).isoformat(), "end_date": end_date.isoformat()}
+
+
+def _created_at(rng, anchor):
+    start = timezone.make_aware(datetime.combine(anchor, datetime.min.time()))
+    return (start + timedelta(seconds=rng.randrange(24 * 60 * 60))).isoformat()
+
+
+ENDPOINTS = {
+    "daily": lambda rng, user_ids, anchor: ("GET", "/api/reports/daily/", _report_params(rng, anchor, 30), None),
+    "weekly": lambda rng, user_ids, anchor: ("GET", "/api/reports/weekly/", _report_params(rng, anchor, 90), None),
+    "monthly": lambda rng, user_ids, anchor: ("GET", "/api/reports/monthly/", _report_params(rng, anchor, 365), None),
+    "cohorts": lambda rng, user_ids, anchor: ("GET", "/api/reports/cohorts/", _report_params(rng, anchor, 180), None),
+    "statistics": lambda rng, user_ids, anchor: ("GET", "/api/users/statistics/", {}, None),
+    "leaderboard": lambda rng, user_ids, anchor: (
+        "GET",
+        "/api/users/leaderboard/",
+        {"metric": "spend", **_report_params(rng, anchor, 30)},
+        None,
+    ),
+    "orders_list": lambda rng, user_ids, anchor: (
+        "GET",
+        "/api/orders/",
+        {"ordering": rng.choice(["created_at", "-created_at"])},
+        None,
+    ),
+    "orders_create": lambda rng, user_ids, anchor: (
+        "POST",
+        "/api/orders/",
+        {},
+        {"user": rng.choice(user_ids), "created_at": _created_at(rng, anchor)},
+    ),
+}
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise CommandError(f"Unknown endpoint in mix: {name}. Choose from {', '.join(ENDPOINTS)}")
+        try:
+            mix[name] = int(weight or 1)
+        except ValueError:
+            raise CommandError(f"Invalid weight for {name}: {weight}")
+        if mix[name] < 0:
+            raise CommandError(f"Invalid weight for {name}: {weight}")
+    if not any(mix.values()):
+        raise CommandError("The request mix must contain at least one positive weight")
+    return mix
+
+
+def build_plan(mix, user_ids, anchor, seed, requests):
+    rng = random.Random(seed)
+    names = [name for name, weight in mix.items() if weight]
+    weights = [mix[name] for name in names]
+    return [(name, ENDPOINTS[name](rng, user_ids, anchor)) for name in rng.choices(names, weights, k=requests)]
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    rank = q * (len(values) - 1)
+    lower = int(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def summarize(results, elapsed):
+    summary = {}
+    for name, samples in sorted(results.items()):
+        latencies = sorted(sample["latency"] * 1000 for sample in samples)
+        queries = [sample["queries"] for sample in samples if sample["queries"] is not None]
+        statuses = defaultdict(int)
+        for sample in samples:
+            statuses[str(sample["status"])] += 1
+
+        summary[name] = {
+            "requests": len(samples),
+            "errors": sum(1 for sample in samples if not 200 <= sample["status"] < 400),
+            "throughput_rps": round(len(samples) / elapsed, 2) if elapsed else None,
+            "status_codes": dict(statuses),
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies), 2),
+                "p50": round(percentile(latencies, 0.5), 2),
+                "p95": round(percentile(latencies, 0.95), 2),
+                "p99": round(percentile(latencies, 0.99), 2),
+                "max": round(latencies[-1], 2),
+            },
+            "queries": {
+                "mean": round(sum(queries) / len(queries), 2) if queries else None,
+                "max": max(queries) if queries else None,
+                "total": sum(queries) if queries else None,
+            },
+        }
+    return summary
+
+
+class Command(BaseCommand):
+    help = "Drive the API with a concurrent, reproducible request mix and report latency and query counts as JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--base-url",
+            type=str,
+            default="http://127.0.0.1:8000",
+            help="Server to test. Default: http://127.0.0.1:8000",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="Number of concurrent clients. Default: 8",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=500,
+            help="Total number of requests. Default: 500",
+        )
+        parser.add_argument(
+            "--mix",
+            type=str,
+            default=DEFAULT_MIX,
+            help=f"Weighted request mix. Endpoints: {', '.join(ENDPOINTS)}. Default: {DEFAULT_MIX}",
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=0,
+            help="Random seed for the request sequence. Default: 0",
+        )
+        parser.add_argument(
+            "--anchor-date",
+            type=str,
+            help="Day (YYYY-MM-DD) that every report range and created order is derived from. Default: today",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=30.0,
+            help="Per-request timeout in seconds. Default: 30",
+        )
+        parser.add_argument(
+            "--output",
+            type=str,
+            help="Write the JSON results to this file instead of stdout.",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1 or options["requests"] < 1:
+            raise CommandError("--concurrency and --requests must be positive")
+
+        url = urlsplit(options["base_url"])
+        if url.scheme != "http" or not url.hostname:
+            raise CommandError("--base-url must be an http:// URL")
+
+        mix = parse_mix(options["mix"])
+        if options["anchor_date"]:
+            try:
+                anchor = datetime.strptime(options["anchor_date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError(f"Invalid --anchor-date: {options['anchor_date']}. Use YYYY-MM-DD")
+        else:
+            anchor = timezone.localdate()
+
+        user_ids = list(User.objects.order_by("pk").values_list("pk", flat=True)[:1000])
+        if mix.get("orders_create") and not user_ids:
+            raise CommandError("orders_create needs existing users; run generate_sample_data first")
+
+        plan = build_plan(mix, user_ids, anchor, options["seed"], options["requests"])
+
+        results = defaultdict(list)
+        lock = threading.Lock()
+        position = iter(plan)
+
+        def worker():
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=options["timeout"])
+            try:
+                while True:
+                    with lock:
+                        item = next(position, None)
+                    if item is None:
+                        return
+                    name, request = item
+                    sample = self._send(connection, url.path.rstrip("/"), request)
+                    with lock:
+                        results[name].append(sample)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options["concurrency"])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        total = sum(len(samples) for samples in results.values())
+        report = {
+            "config": {
+                "base_url": options["base_url"],
+                "concurrency": options["concurrency"],
+                "requests": options["requests"],
+                "mix": mix,
+                "seed": options["seed"],
+                "anchor_date": anchor.isoformat(),
+            },
+            "duration_seconds": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+            "endpoints": summarize(results, elapsed),
+        }
+
+        payload = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as stream:
+                stream.write(payload)
+            self.stderr.write(self.style.SUCCESS(f"Load test results written to {options['output']}"))
+        else:
+            self.stdout.write(payload)
+
+    def _send(self, connection, prefix, request):
+        method, path, params, body = request
+        target = prefix + path + (f"?{urlencode(params)}" if params else "")
+        headers = {"Accept": "application/json"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body, default=str)
+            headers["Content-Type"] = "application/json"
+
+        started = time.perf_counter()
+        try:
+            connection.request(method, target, body=payload, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status, queries = response.status, response.getheader("X-Query-Count")
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            status, queries = 0, None
+        latency = time.perf_counter() - started
+
+        return {"status": status, "latency": latency, "queries": int(queries) if queries is not None else None}
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from orders.rollups import rebuild_user_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-user daily order rollup from the order tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rollup rows inserted per statement. Default: 1000",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("Rebuilding user daily stats..."))
+
+        rows = rebuild_user_daily_stats(batch_size=options["batch_size"])
+
+        self.stdout.write(self.style.SUCCESS(f"User daily stats rebuilt with {rows} rows"))
@@ -3,11 +3,14 @@ import uuid
 from django.conf import settings
 from django.db import models
 
+from reporting.transactions import AtomicSaveMixin
 
-class Order(models.Model):
+
+class Order(AtomicSaveMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name="orders", on_delete=models.CASCADE)
     created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = "orders_order"
@@ -15,16 +18,18 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=["created_at"]),
             models.Index(fields=["user", "created_at"]),
+            models.Index(fields=["updated_at", "id"]),
         ]
 
     def __str__(self):
         return f"Order {self.id} by {self.user.email}"
 
 
-class OrderItem1(models.Model):
+class OrderItem1(AtomicSaveMixin, models.Model):
     order = models.ForeignKey(Order, related_name="items1", on_delete=models.CASCADE)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = "orders_orderitem1"
@@ -32,17 +37,19 @@ class OrderItem1(models.Model):
         indexes = [
             models.Index(fields=["created_at"]),
             models.Index(fields=["order", "created_at"]),
+            models.Index(fields=["updated_at", "id"]),
         ]
 
     def __str__(self):
         return f"OrderItem1 for Order {self.order.id} - {self.price}"
 
 
-class OrderItem2(models.Model):
+class OrderItem2(AtomicSaveMixin, models.Model):
     order = models.ForeignKey(Order, related_name="items2", on_delete=models.CASCADE)
     placement_price = models.DecimalField(max_digits=10, decimal_places=2)
     article_price = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = "orders_orderitem2"
@@ -50,8 +57,128 @@ class OrderItem2(models.Model):
         indexes = [
             models.Index(fields=["created_at"]),
             models.Index(fields=["order", "created_at"]),
+            models.Index(fields=["updated_at", "id"]),
         ]
 
     def __str__(self):
         total = self.placement_price + self.article_price
         return f"OrderItem2 for Order {self.order.id} - {total}"
+
+
+class UserDailyStats(models.Model):
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name="daily_stats", on_delete=models.CASCADE)
+    day = models.DateField()
+    orders_count = models.IntegerField(default=0)
+    orderitem1_count = models.IntegerField(default=0)
+    orderitem1_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orderitem2_count = models.IntegerField(default=0)
+    orderitem2_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = "orders_userdailystats"
+        ordering = ["day"]
+        indexes = [
+            models.Index(fields=["day"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="orders_userdailystats_user_day_uniq"),
+        ]
+
+    def __str__(self):
+        return f"UserDailyStats for {self.user_id} on {self.day}"
+
+
+class DailySketch(models.Model):
+    ORDER_VALUE = "order_value"
+    UNIQUE_BUYERS = "unique_buyers"
+
+    KIND_CHOICES = [
+        (ORDER_VALUE, "Order value"),
+        (UNIQUE_BUYERS, "Unique buyers"),
+    ]
+
+    kind = models.CharField(max_length=32, choices=KIND_CHOICES)
+    day = models.DateField()
+    data = models.JSONField()
+
+    class Meta:
+        db_table = "orders_dailysketch"
+        ordering = ["kind", "day"]
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "day"], name="orders_dailysketch_kind_day_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} sketch for {self.day}"
+
+
+class CalendarPeriod(models.Model):
+    scheme = models.CharField(max_length=32)
+    day = models.DateField()
+    period = models.DateField()
+    label = models.CharField(max_length=32)
+
+    class Meta:
+        db_table = "orders_calendarperiod"
+        ordering = ["scheme", "day"]
+        indexes = [
+            models.Index(fields=["scheme", "period"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["scheme", "day"], name="orders_calendarperiod_scheme_day_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} in {self.scheme} period {self.label}"
+
+
+class ArchivedOrder(models.Model):
+    id = models.UUIDField(primary_key=True, editable=False)
+    user_id = models.UUIDField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "orders_archivedorder"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["user_id", "created_at"]),
+        ]
+
+    def __str__(self):
+        return f"Archived order {self.id}"
+
+
+class ArchivedOrderItem1(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order_id = models.UUIDField(db_index=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "orders_archivedorderitem1"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Archived OrderItem1 for Order {self.order_id} - {self.price}"
+
+
+class ArchivedOrderItem2(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order_id = models.UUIDField(db_index=True)
+    placement_price = models.DecimalField(max_digits=10, decimal_places=2)
+    article_price = models.DecimalField(max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        db_table = "orders_archivedorderitem2"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Archived OrderItem2 for Order {self.order_id} - {self.placement_price + self.article_price}"
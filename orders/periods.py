@@ -0,0 +1,116 @@
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from orders.models import CalendarPeriod
+
+FISCAL_WEEK_PATTERN = (4, 4, 5) * 4
+
+PeriodAssignment = Tuple[date, str]
+
+
+def _daily(day: date, fiscal_start_month: int) -> PeriodAssignment:
+    return day, day.isoformat()
+
+
+def _weekly(day: date, fiscal_start_month: int) -> PeriodAssignment:
+    year, week, _ = day.isocalendar()
+    return day - timedelta(days=day.weekday()), f"{year}-W{week:02d}"
+
+
+def _monthly(day: date, fiscal_start_month: int) -> PeriodAssignment:
+    return day.replace(day=1), day.strftime("%Y-%m")
+
+
+def _quarterly(day: date, fiscal_start_month: int) -> PeriodAssignment:
+    quarter = (day.month - 1) // 3
+    return date(day.year, quarter * 3 + 1, 1), f"{day.year}-Q{quarter + 1}"
+
+
+def _yearly(day: date, fiscal_start_month: int) -> PeriodAssignment:
+    return date(day.year, 1, 1), str(day.year)
+
+
+def fiscal_year_start(year: int, fiscal_start_month: int = 1) -> date:
+    anchor = date(year, fiscal_start_month, 1)
+    if anchor.weekday() <= 3:
+        return anchor - timedelta(days=anchor.weekday())
+    return anchor + timedelta(days=7 - anchor.weekday())
+
+
+def fiscal_position(day: date, fiscal_start_month: int = 1) -> Tuple[int, date, int]:
+    year = day.year
+    if day < fiscal_year_start(year, fiscal_start_month):
+        year -= 1
+    elif day >= fiscal_year_start(year + 1, fiscal_start_month):
+        year += 1
+
+    year_start = fiscal_year_start(year, fiscal_start_month)
+    week = (day - year_start).days // 7
+    weeks_before = 0
+    for index, weeks in enumerate(FISCAL_WEEK_PATTERN):
+        if week < weeks_before + weeks or index == len(FISCAL_WEEK_PATTERN) - 1:
+            return year, year_start + timedelta(weeks=weeks_before), index
+        weeks_before += weeks
+
+
+def _fiscal_445(day: date, fiscal_start_month: int) -> PeriodAssignment:
+    year, period_start, index = fiscal_position(day, fiscal_start_month)
+    return period_start, f"FY{year}-P{index + 1:02d}"
+
+
+def _fiscal_quarterly(day: date, fiscal_start_month: int) -> PeriodAssignment:
+    year, _, index = fiscal_position(day, fiscal_start_month)
+    quarter = index // 3
+    weeks_before = sum(FISCAL_WEEK_PATTERN[: quarter * 3])
+    return fiscal_year_start(year, fiscal_start_month) + timedelta(weeks=weeks_before), f"FY{year}-Q{quarter + 1}"
+
+
+CALENDAR_SCHEMES: Dict[str, Callable[[date, int], PeriodAssignment]] = {
+    "daily": _daily,
+    "weekly": _weekly,
+    "monthly": _monthly,
+    "quarterly": _quarterly,
+    "yearly": _yearly,
+    "fiscal_445": _fiscal_445,
+    "fiscal_quarterly": _fiscal_quarterly,
+}
+
+
+def calendar_rows(
+    start: date, end: date, schemes: Optional[Iterable[str]] = None, fiscal_start_month: int = 1
+) -> Iterable[CalendarPeriod]:
+    for scheme in schemes or CALENDAR_SCHEMES:
+        if scheme not in CALENDAR_SCHEMES:
+            raise ValueError(f"Invalid scheme: {scheme}. Must be one of {', '.join(CALENDAR_SCHEMES)}")
+        assign = CALENDAR_SCHEMES[scheme]
+        day = start
+        while day < end:
+            period, label = assign(day, fiscal_start_month)
+            yield CalendarPeriod(scheme=scheme, day=day, period=period, label=label)
+            day += timedelta(days=1)
+
+
+def build_calendar(
+    start: date,
+    end: date,
+    schemes: Optional[Iterable[str]] = None,
+    fiscal_start_month: int = 1,
+    batch_size: int = 5000,
+) -> int:
+    written = 0
+    batch = []
+    for row in calendar_rows(start, end, schemes, fiscal_start_month):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            written += _upsert(batch)
+            batch = []
+    if batch:
+        written += _upsert(batch)
+    return written
+
+
+def _upsert(rows) -> int:
+    CalendarPeriod.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=["scheme", "day"], update_fields=["period", "label"]
+    )
+    return len(rows)
@@ -1,93 +1,1184 @@
-from datetime import datetime, timedelta
+import math
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
-from typing import Any, Dict, List, Literal
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple
 
-from django.db.models import Count, DecimalField, F, Q, Sum
-from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+from django.conf import settings
+from django.db import connections
+from django.db.models import (
+    Aggregate,
+    Avg,
+    Case,
+    Count,
+    DecimalField,
+    F,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Floor, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
 
-from orders.models import Order, OrderItem1, OrderItem2
+from dateutil.relativedelta import relativedelta
+
+from orders.models import CalendarPeriod, DailySketch, Order, OrderItem1, OrderItem2, UserDailyStats
+from orders.rollups import day_bounds
+from orders.sketches import HyperLogLog, QuantileSketch
 from users.models import User
 
 PeriodType = Literal["daily", "weekly", "monthly"]
+CohortPeriodType = Literal["weekly", "monthly"]
+DistributionMode = Literal["exact", "approx"]
+CompareType = Literal["previous", "year_ago"]
+DateRange = Tuple[datetime, datetime]
+ReportSpec = Tuple[datetime, datetime, PeriodType]
+GroupByType = Literal["activation", "signup_month", "users"]
+
+DEFAULT_PERCENTILES = (0.5, 0.9, 0.99)
+ROLLING_MAX_DAYS = 366
+SAMPLE_METHODS = ("SYSTEM", "BERNOULLI")
+APPROX_CONFIDENCE_Z = 1.96
+SAMPLE_EMPTY_CELL_EVENTS = 3
+
+
+TRUNC_FUNCTIONS = {
+    "daily": TruncDate,
+    "weekly": TruncWeek,
+    "monthly": TruncMonth,
+}
+
+GROUP_BY_EXPRESSIONS = {
+    "activation": lambda user_path: F(f"{user_path}is_active"),
+    "signup_month": lambda user_path: TruncMonth(f"{user_path}date_joined"),
+    "users": lambda user_path: F(f"{user_path}id"),
+}
+
+SAMPLED_STATISTICS = {
+    "Orders": (Order, {"orders_count": lambda: Value(1)}),
+    "OrderItem1": (OrderItem1, {"orderitem1_count": lambda: Value(1), "orderitem1_amount": lambda: F("price")}),
+    "OrderItem2": (
+        OrderItem2,
+        {
+            "orderitem2_count": lambda: Value(1),
+            "orderitem2_amount": lambda: F("placement_price") + F("article_price"),
+        },
+    ),
+}
+
+SAMPLED_MARGINS = {
+    "OrdersCount": ["orders_count"],
+    "OrderItem1Count": ["orderitem1_count"],
+    "OrderItem1Amount": ["orderitem1_amount"],
+    "OrderItem2Count": ["orderitem2_count"],
+    "OrderItem2Amount": ["orderitem2_amount"],
+    "OrdersTotalAmount": ["orderitem1_amount", "orderitem2_amount"],
+}
+
+
+class PercentileCont(Aggregate):
+    function = "PERCENTILE_CONT"
+    name = "PercentileCont"
+    template = "%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile: float, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+def order_total_expression():
+    item1_total = (
+        OrderItem1.objects.filter(order=OuterRef("pk")).order_by().values("order").annotate(total=Sum("price"))
+    )
+    item2_total = (
+        OrderItem2.objects.filter(order=OuterRef("pk"))
+        .order_by()
+        .values("order")
+        .annotate(total=Sum(F("placement_price") + F("article_price")))
+    )
+    return Coalesce(Subquery(item1_total.values("total")), Decimal("0"), output_field=DecimalField()) + Coalesce(
+        Subquery(item2_total.values("total")), Decimal("0"), output_field=DecimalField()
+    )
+
+
+def parse_rolling_windows(value: str) -> List[int]:
+    windows = []
+    for part in value.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        if not part.endswith("d") or not part[:-1].isdigit():
+            raise ValueError(f"Invalid rolling window: {part}. Use a number of days such as 7d")
+        days = int(part[:-1])
+        if not 1 <= days <= ROLLING_MAX_DAYS:
+            raise ValueError(f"Rolling windows must be between 1 and {ROLLING_MAX_DAYS} days")
+        windows.append(days)
+    return sorted(set(windows))
 
 
 class ReportService:
     @staticmethod
-    def generate_report(start_date: datetime, end_date: datetime, period: PeriodType = "daily") -> List[Dict[str, Any]]:
-        trunc_functions = {
-            "daily": TruncDate,
-            "weekly": TruncWeek,
-            "monthly": TruncMonth,
+    def generate_report(
+        start_date: datetime,
+        end_date: datetime,
+        period: PeriodType = "daily",
+        workers: Optional[int] = None,
+        shard_days: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        trunc_func = ReportService._get_trunc_func(period)
+        stats = ReportService._collect_statistics([(start_date, end_date)], trunc_func, workers, shard_days)
+
+        result = ReportService._merge_statistics(*stats, start_date, end_date, period)
+
+        return result
+
+    @staticmethod
+    def generate_segmented_report(
+        start_date: datetime,
+        end_date: datetime,
+        period: PeriodType = "daily",
+        group_by: GroupByType = "activation",
+        user_ids: Optional[Sequence] = None,
+    ) -> List[Dict[str, Any]]:
+        trunc_func = ReportService._get_trunc_func(period)
+        if group_by not in GROUP_BY_EXPRESSIONS:
+            raise ValueError(f"Invalid group_by: {group_by}. Must be one of {', '.join(GROUP_BY_EXPRESSIONS)}")
+        if group_by == "users" and not user_ids:
+            raise ValueError("Grouping by users requires a list of user ids")
+
+        querysets = ReportService._statistics_querysets(
+            [(start_date, end_date)], trunc_func, group_by=group_by, user_ids=user_ids
+        )
+        tables: List[Dict[str, Dict[str, Dict]]] = []
+        for queryset in querysets:
+            table: Dict[str, Dict[str, Dict]] = {}
+            for row in queryset:
+                segment = ReportService._segment_key(group_by, row.pop("group"))
+                table.setdefault(segment, {})[ReportService._period_key(row["period"])] = row
+            tables.append(table)
+
+        if group_by == "activation":
+            segments = ["activated", "not_activated"]
+        elif group_by == "users":
+            segments = list(dict.fromkeys(str(user_id) for user_id in user_ids))
+        else:
+            segments = sorted({segment for table in tables for segment in table})
+
+        return [
+            {
+                "Segment": segment,
+                "Data": ReportService._merge_statistics(
+                    *(table.get(segment, {}) for table in tables), start_date, end_date, period
+                ),
+            }
+            for segment in segments
+        ]
+
+    @staticmethod
+    def _segment_key(group_by: GroupByType, value) -> str:
+        if group_by == "activation":
+            return "activated" if value else "not_activated"
+        if group_by == "signup_month":
+            return ReportService._period_key(value)
+        return str(value)
+
+    @staticmethod
+    def iter_report(
+        start_date: datetime, end_date: datetime, period: PeriodType = "daily", chunk_size: int = 2000
+    ) -> Iterator[Dict[str, Any]]:
+        trunc_func = ReportService._get_trunc_func(period)
+        streams = [
+            _PeriodStream(queryset.order_by("period").iterator(chunk_size=chunk_size))
+            for queryset in ReportService._statistics_querysets([(start_date, end_date)], trunc_func)
+        ]
+
+        for period_date in ReportService._iter_periods(start_date, end_date, period):
+            period_key = str(period_date)
+            yield ReportService._build_row(period_key, *(stream.take(period_key) for stream in streams))
+
+    @staticmethod
+    def generate_comparison_report(
+        start_date: datetime, end_date: datetime, period: PeriodType = "daily", compare: CompareType = "previous"
+    ) -> List[Dict[str, Any]]:
+        ReportService._get_trunc_func(period)
+        shift = ReportService._comparison_shift(start_date, end_date, period, compare)
+        current_rows, previous_rows = ReportService.generate_reports(
+            [(start_date, end_date, period), (start_date - shift, end_date - shift, period)]
+        )
+
+        result = []
+        for index, row in enumerate(current_rows):
+            previous = previous_rows[index] if index < len(previous_rows) else None
+            comparison = {}
+            for metric, value in row.items():
+                if metric == "Period":
+                    continue
+                previous_value = previous[metric] if previous else 0
+                delta = value - previous_value
+                comparison[metric] = {
+                    "Previous": previous_value,
+                    "Delta": round(delta, 2) if isinstance(delta, float) else delta,
+                    "DeltaPercent": round(delta / previous_value * 100, 2) if previous_value else None,
+                }
+
+            result.append({**row, "PreviousPeriod": previous["Period"] if previous else None, "Comparison": comparison})
+
+        return result
+
+    @staticmethod
+    def generate_window_report(
+        start_date: datetime,
+        end_date: datetime,
+        period: PeriodType = "daily",
+        rolling: Sequence[int] = (),
+        cumulative: bool = False,
+    ) -> List[Dict[str, Any]]:
+        trunc_func = ReportService._get_trunc_func(period)
+        rolling = sorted(set(rolling))
+        if any(days <= 0 for days in rolling):
+            raise ValueError("Rolling windows must be a positive number of days")
+        if not rolling and not cumulative:
+            return ReportService.generate_report(start_date, end_date, period)
+
+        start_date, end_date = ReportService._aware(start_date), ReportService._aware(end_date)
+        all_periods = ReportService._generate_all_periods(start_date, end_date, period)
+        if not all_periods:
+            return []
+
+        first_period = datetime.combine(all_periods[0], time(), tzinfo=start_date.tzinfo)
+        scan_start = min(start_date, first_period - timedelta(days=max(rolling, default=1) - 1))
+        calendar = (ReportService._period_start(timezone.localtime(scan_start).date(), period), all_periods[-1])
+
+        tables = [
+            ReportService._window_statistics(queryset, calendar, period, rolling, cumulative)
+            for queryset in ReportService._statistics_querysets([(scan_start, end_date)], trunc_func, [start_date])
+        ]
+
+        result = []
+        for period_date in all_periods:
+            period_key = str(period_date)
+            cells = [table.get(period_key, {}) for table in tables]
+            row = ReportService._build_row(period_key, *(cell.get("base", {}) for cell in cells))
+
+            if rolling:
+                row["Rolling"] = {}
+                for days in rolling:
+                    buckets = ReportService._buckets_in_window(period_date, days, period)
+                    sums = ReportService._build_row(period_key, *(cell.get(f"{days}d", {}) for cell in cells))
+                    row["Rolling"][f"{days}d"] = {
+                        metric: round(value / buckets, 2) for metric, value in sums.items() if metric != "Period"
+                    }
+            if cumulative:
+                totals = ReportService._build_row(period_key, *(cell.get("cumulative", {}) for cell in cells))
+                row["Cumulative"] = {metric: value for metric, value in totals.items() if metric != "Period"}
+
+            result.append(row)
+
+        return result
+
+    @staticmethod
+    def generate_approx_report(
+        start_date: datetime,
+        end_date: datetime,
+        period: PeriodType = "monthly",
+        sample_rows: Optional[int] = None,
+        method: Optional[str] = None,
+        seed: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        trunc_func = ReportService._get_trunc_func(period)
+        sample_rows = settings.REPORT_SAMPLE_ROWS if sample_rows is None else sample_rows
+        method = (method or settings.REPORT_SAMPLE_METHOD).upper()
+        if method not in SAMPLE_METHODS:
+            raise ValueError(f"Invalid sample method: {method}. Must be one of {', '.join(SAMPLE_METHODS)}")
+        if sample_rows <= 0:
+            raise ValueError("Sample size must be a positive number of rows")
+
+        ranges = [(start_date, end_date)]
+        users = {
+            ReportService._period_key(row["period"]): row
+            for row in ReportService._get_user_statistics(ranges, trunc_func)
+        }
+        samples = {
+            name: ReportService._sampled_statistics(model, metrics, ranges, trunc_func, sample_rows, method, seed)
+            for name, (model, metrics) in SAMPLED_STATISTICS.items()
         }
+        floors = {metric: floor for name in SAMPLED_STATISTICS for metric, floor in samples[name][2].items()}
 
-        if period not in trunc_functions:
-            raise ValueError(f"Invalid period: {period}. Must be 'daily', 'weekly', or 'monthly'")
+        result = []
+        for period_date in ReportService._generate_all_periods(start_date, end_date, period):
+            period_key = str(period_date)
+            cells = [samples[name][0].get(period_key, {}) for name in SAMPLED_STATISTICS]
+            estimates = [{metric: estimate for metric, (estimate, _) in cell.items()} for cell in cells]
+            variances = {metric: variance for cell in cells for metric, (_, variance) in cell.items()}
+
+            row = ReportService._build_row(period_key, users.get(period_key, {}), *estimates)
+            lower, upper = {}, {}
+            for column, value in row.items():
+                if column == "Period":
+                    continue
+                metrics = SAMPLED_MARGINS.get(column, ())
+                margin = max(
+                    APPROX_CONFIDENCE_Z * math.sqrt(sum(variances.get(metric, 0.0) for metric in metrics)),
+                    math.sqrt(sum(floors.get(metric, 0.0) ** 2 for metric in metrics)),
+                )
+                if isinstance(value, int):
+                    lower[column], upper[column] = max(0, math.floor(value - margin)), math.ceil(value + margin)
+                else:
+                    row[column] = round(value, 2)
+                    lower[column], upper[column] = max(0.0, round(value - margin, 2)), round(value + margin, 2)
+
+            row["ConfidenceInterval"] = {"Lower": lower, "Upper": upper}
+            row["SamplePercent"] = {name: samples[name][1] for name in SAMPLED_STATISTICS}
+            result.append(row)
+
+        return result
 
-        trunc_func = trunc_functions[period]
-        user_stats = ReportService._get_user_statistics(start_date, end_date, trunc_func)
-        order_stats = ReportService._get_order_statistics(start_date, end_date, trunc_func)
-        item1_stats = ReportService._get_orderitem1_statistics(start_date, end_date, trunc_func)
-        item2_stats = ReportService._get_orderitem2_statistics(start_date, end_date, trunc_func)
+    @staticmethod
+    def _sampled_statistics(
+        model, metrics: Dict, ranges: Sequence[DateRange], trunc_func, sample_rows: int, method: str, seed=None
+    ) -> Tuple[Dict[str, Dict[str, Tuple[Any, float]]], float, Dict[str, float]]:
+        connection = connections[model.objects.db]
+        table = connection.ops.quote_name(model._meta.db_table)
+        if method == "SYSTEM":
+            cluster = f"({table}.ctid::text::point)[0]"
+        else:
+            cluster = f"{table}.ctid::text"
 
-        result = ReportService._merge_statistics(
-            user_stats, order_stats, item1_stats, item2_stats, start_date, end_date, period
+        queryset = (
+            model.objects.filter(ReportService._range_filter("created_at", ranges))
+            .annotate(
+                period=trunc_func("created_at"),
+                cluster=RawSQL(cluster, ()),
+                **{metric: expression() for metric, expression in metrics.items()},
+            )
+            .order_by()
+            .values("period", "cluster", *metrics)
         )
+        sql, params = queryset.query.sql_with_params()
+        repeatable = f" REPEATABLE ({int(seed)})" if seed is not None else ""
+        from_clause = f"FROM {table}"
+        if sql.count(from_clause) != 1:
+            raise ValueError(f"Cannot sample {table}: expected exactly one {from_clause} in {sql}")
+        sql = sql.replace(from_clause, f"{from_clause} TABLESAMPLE {method} ((SELECT percent FROM sample)){repeatable}")
 
+        cluster_sums = ", ".join(f'SUM(rows."{metric}") AS "{metric}"' for metric in metrics)
+        totals = ", ".join(
+            f'SUM(clusters."{metric}") AS "{metric}", '
+            f'SUM(clusters."{metric}" * clusters."{metric}") AS "{metric}__squares"'
+            for metric in metrics
+        )
+        sampled_sql = (
+            "WITH sample AS ("
+            "SELECT LEAST(100, 100.0 * %s / GREATEST(reltuples, 1)) AS percent FROM pg_class WHERE oid = %s::regclass"
+            f") SELECT sample.percent, clusters.period, {totals} "
+            f"FROM sample LEFT JOIN (SELECT rows.period, {cluster_sums} FROM ({sql}) AS rows "
+            "GROUP BY rows.period, rows.cluster) AS clusters ON TRUE "
+            "GROUP BY sample.percent, clusters.period"
+        )
+
+        with connection.cursor() as cursor:
+            cursor.execute(sampled_sql, [sample_rows, model._meta.db_table, *params])
+            names = [column.name for column in cursor.description]
+            rows = [dict(zip(names, values)) for values in cursor.fetchall()]
+
+        percent = float(rows[0]["percent"]) if rows else 100.0
+        fraction = percent / 100
+        sampled = {metric: sum(float(row[metric] or 0) for row in rows) for metric in metrics}
+        sampled_rows = max(next(total for metric, total in sampled.items() if metric.endswith("_count")), 1)
+        floors = {}
+        for metric, total in sampled.items():
+            per_row = 1.0 if metric.endswith("_count") else total / sampled_rows
+            floors[metric] = SAMPLE_EMPTY_CELL_EVENTS * per_row / fraction if fraction < 1 else 0.0
+        table_stats = {}
+        for row in rows:
+            if row["period"] is None:
+                continue
+            cell = {}
+            for metric in metrics:
+                total = float(row[metric] or 0)
+                squares = float(row[f"{metric}__squares"] or 0)
+                estimate = total / fraction
+                cell[metric] = (
+                    round(estimate) if metric.endswith("_count") else Decimal(f"{estimate:.2f}"),
+                    (1 - fraction) * squares / fraction**2,
+                )
+            table_stats[ReportService._period_key(row["period"])] = cell
+
+        return table_stats, round(percent, 4), floors
+
+    @staticmethod
+    def generate_calendar_report(start_date: datetime, end_date: datetime, scheme: str) -> List[Dict[str, Any]]:
+        start_date, end_date = ReportService._aware(start_date), ReportService._aware(end_date)
+        first_day, last_day = day_bounds(timezone.localtime(start_date), timezone.localtime(end_date))
+        if first_day >= last_day:
+            return []
+
+        tables = []
+        for queryset in ReportService._statistics_querysets([(start_date, end_date)], TruncDate):
+            table = ReportService._calendar_statistics(queryset, scheme, first_day, last_day)
+            if not tables:
+                covered = sum(row["days"] for row in table.values())
+                if covered != (last_day - first_day).days:
+                    raise ValueError(
+                        f"Calendar scheme {scheme} covers {covered} of {(last_day - first_day).days} days "
+                        f"between {first_day} and {last_day}. Run build_calendar first"
+                    )
+            tables.append(table)
+
+        result = []
+        for period_key, row in tables[0].items():
+            cells = [table.get(period_key, {}) for table in tables]
+            result.append({**ReportService._build_row(period_key, *cells), "Label": row["label"]})
         return result
 
     @staticmethod
-    def _get_user_statistics(start_date: datetime, end_date: datetime, trunc_func) -> Dict[str, Dict]:
-        users = (
-            User.objects.filter(date_joined__gte=start_date, date_joined__lt=end_date)
-            .annotate(period=trunc_func("date_joined"))
-            .values("period")
-            .annotate(new_users=Count("id"), activated_users=Count("id", filter=Q(is_active=True)))
+    def _calendar_statistics(queryset: QuerySet, scheme: str, first_day: date, last_day: date) -> Dict[str, Dict]:
+        metrics = {
+            name: expression.output_field
+            for name, expression in queryset.query.annotations.items()
+            if expression.contains_aggregate
+        }
+        columns = ["calendar.period", "calendar.label", "COUNT(DISTINCT calendar.day) AS days"] + [
+            f'SUM(stats."{metric}") AS "{metric}"' for metric in metrics
+        ]
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        calendar_sql = (
+            f"SELECT {', '.join(columns)} "
+            f"FROM {CalendarPeriod._meta.db_table} AS calendar "
+            f"LEFT JOIN ({sql}) AS stats ON stats.period = calendar.day "
+            "WHERE calendar.scheme = %s AND calendar.day >= %s AND calendar.day < %s "
+            "GROUP BY calendar.period, calendar.label "
+            "ORDER BY calendar.period"
         )
 
-        return {str(u["period"]): u for u in users}
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(calendar_sql, [*params, scheme, first_day, last_day])
+            names = [column.name for column in cursor.description]
+            rows = [dict(zip(names, values)) for values in cursor.fetchall()]
+
+        return {
+            ReportService._period_key(row["period"]): {
+                "label": row["label"],
+                "days": row["days"],
+                **{metric: output_field.to_python(row[metric] or 0) for metric, output_field in metrics.items()},
+            }
+            for row in rows
+        }
 
     @staticmethod
-    def _get_order_statistics(start_date: datetime, end_date: datetime, trunc_func) -> Dict[str, Dict]:
-        orders = (
-            Order.objects.filter(created_at__gte=start_date, created_at__lt=end_date)
-            .annotate(period=trunc_func("created_at"))
-            .values("period")
-            .annotate(orders_count=Count("id"))
+    def _window_statistics(
+        queryset: QuerySet, calendar: Tuple[date, date], period: PeriodType, rolling: Sequence[int], cumulative: bool
+    ) -> Dict[str, Dict[str, Dict]]:
+        metrics = {
+            name: expression.output_field
+            for name, expression in queryset.query.annotations.items()
+            if expression.contains_aggregate
+        }
+        windows = [
+            (f"{days}d", f"RANGE BETWEEN INTERVAL '{days - 1} days' PRECEDING AND CURRENT ROW") for days in rolling
+        ]
+
+        columns = ["calendar.period", "buckets.segment"] + [f'buckets."{metric}"' for metric in metrics]
+        for metric in metrics:
+            for label, frame in windows:
+                columns.append(
+                    f'SUM(buckets."{metric}") OVER (ORDER BY calendar.period {frame}) AS "{metric}__{label}"'
+                )
+            if cumulative:
+                columns.append(
+                    f'SUM(buckets."{metric}") FILTER (WHERE buckets.segment = 1) '
+                    f'OVER (ORDER BY calendar.period) AS "{metric}__cumulative"'
+                )
+
+        sql, params = queryset.order_by().query.sql_with_params()
+        step = {"daily": "1 day", "weekly": "1 week", "monthly": "1 month"}[period]
+        window_sql = (
+            f"SELECT {', '.join(columns)} "
+            f"FROM generate_series(%s::timestamp, %s::timestamp, INTERVAL '{step}') AS calendar(period) "
+            f"LEFT JOIN ({sql}) AS buckets ON buckets.period = calendar.period"
+        )
+
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(window_sql, [*calendar, *params])
+            names = [column.name for column in cursor.description]
+            rows = [dict(zip(names, values)) for values in cursor.fetchall()]
+
+        table: Dict[str, Dict[str, Dict]] = {}
+        for row in rows:
+            cell = table.setdefault(ReportService._period_key(row["period"]), {"base": {}})
+            if row["segment"] == 1:
+                cell["base"] = {metric: row[metric] for metric in metrics}
+            for label in [label for label, _ in windows] + (["cumulative"] if cumulative else []):
+                cell[label] = {
+                    metric: output_field.to_python(row[f"{metric}__{label}"] or 0)
+                    for metric, output_field in metrics.items()
+                }
+
+        return table
+
+    @staticmethod
+    def _buckets_in_window(period_date: date, days: int, period: PeriodType) -> int:
+        window_start = period_date - timedelta(days=days - 1)
+        buckets, current = 0, period_date
+        while current >= window_start:
+            buckets += 1
+            current = ReportService._period_start(current - timedelta(days=1), period)
+        return buckets
+
+    @staticmethod
+    def _comparison_shift(start_date: datetime, end_date: datetime, period: PeriodType, compare: CompareType):
+        if compare == "year_ago":
+            return relativedelta(weeks=52) if period == "weekly" else relativedelta(years=1)
+        if compare != "previous":
+            raise ValueError(f"Invalid compare mode: {compare}. Must be 'previous' or 'year_ago'")
+
+        buckets = len(ReportService._generate_all_periods(start_date, end_date, period))
+        if period == "monthly":
+            return relativedelta(months=buckets)
+        if period == "weekly":
+            return relativedelta(weeks=buckets)
+        return relativedelta(days=buckets)
+
+    @staticmethod
+    def generate_reports(specs: Sequence[ReportSpec]) -> List[List[Dict[str, Any]]]:
+        specs = [(ReportService._aware(start), ReportService._aware(end), period) for start, end, period in specs]
+        for _, _, period in specs:
+            ReportService._get_trunc_func(period)
+        if not specs:
+            return []
+
+        ranges = ReportService._merge_ranges([(start, end) for start, end, _ in specs])
+        boundaries = {value for start, end, _ in specs for value in (start, end)}
+        cuts = sorted(value for value in boundaries if timezone.localtime(value).time() != time())
+
+        cells = [
+            ReportService._collect_cells(queryset)
+            for queryset in ReportService._statistics_querysets(ranges, TruncDate, cuts)
+        ]
+
+        reports = []
+        for start_date, end_date, period in specs:
+            stats = [ReportService._roll_up_cells(table, cuts, start_date, end_date, period) for table in cells]
+            reports.append(ReportService._merge_statistics(*stats, start_date, end_date, period))
+
+        return reports
+
+    @staticmethod
+    def _merge_ranges(ranges: Sequence[DateRange]) -> List[DateRange]:
+        merged: List[DateRange] = []
+        for start_date, end_date in sorted(ranges):
+            if start_date >= end_date:
+                continue
+            if merged and start_date <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end_date))
+            else:
+                merged.append((start_date, end_date))
+        return merged
+
+    @staticmethod
+    def _collect_cells(queryset: QuerySet) -> Dict[Tuple[date, int], Dict]:
+        cells = {}
+        for row in queryset:
+            day = row.pop("period")
+            day = day.date() if isinstance(day, datetime) else day
+            cells[(day, row.pop("segment", 0))] = row
+        return cells
+
+    @staticmethod
+    def _roll_up_cells(
+        cells: Dict[Tuple[date, int], Dict],
+        cuts: Sequence[datetime],
+        start_date: datetime,
+        end_date: datetime,
+        period: PeriodType,
+    ) -> Dict[str, Dict]:
+        tzinfo = timezone.get_current_timezone()
+        stats: Dict[str, Dict] = {}
+        for (day, segment), row in cells.items():
+            cell_start = datetime.combine(day, time(), tzinfo=tzinfo)
+            if segment:
+                cell_start = max(cell_start, cuts[segment - 1])
+            if not start_date <= cell_start < end_date:
+                continue
+
+            bucket = stats.setdefault(str(ReportService._period_start(day, period)), {})
+            for metric, value in row.items():
+                bucket[metric] = bucket.get(metric, 0) + value
+
+        return stats
+
+    @staticmethod
+    def _aware(value: datetime) -> datetime:
+        if timezone.is_naive(value):
+            return timezone.make_aware(value)
+        return value
+
+    @staticmethod
+    def _statistics_querysets(
+        ranges: Sequence[DateRange],
+        trunc_func,
+        cuts: Sequence[datetime] = (),
+        group_by: Optional[GroupByType] = None,
+        user_ids: Optional[Sequence] = None,
+    ) -> Tuple[QuerySet, ...]:
+        return (
+            ReportService._get_user_statistics(ranges, trunc_func, cuts, group_by, user_ids),
+            ReportService._get_order_statistics(ranges, trunc_func, cuts, group_by, user_ids),
+            ReportService._get_orderitem1_statistics(ranges, trunc_func, cuts, group_by, user_ids),
+            ReportService._get_orderitem2_statistics(ranges, trunc_func, cuts, group_by, user_ids),
         )
 
-        return {str(o["period"]): o for o in orders}
+    @staticmethod
+    def _collect_statistics(
+        ranges: Sequence[DateRange], trunc_func, workers: Optional[int] = None, shard_days: Optional[int] = None
+    ) -> Tuple[Dict[str, Dict], ...]:
+        workers = settings.REPORT_SHARD_WORKERS if workers is None else workers
+        shard_days = settings.REPORT_SHARD_DAYS if shard_days is None else shard_days
+        shards = ReportService._split_ranges(ranges, shard_days)
+
+        if workers <= 1 or len(shards) <= 1:
+            return tuple(
+                {ReportService._period_key(row["period"]): row for row in queryset}
+                for queryset in ReportService._statistics_querysets(ranges, trunc_func)
+            )
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(shards))) as executor:
+            partials = list(executor.map(lambda shard: ReportService._collect_shard(shard, trunc_func), shards))
+
+        return tuple(ReportService._merge_partials(tables) for tables in zip(*partials))
+
+    @staticmethod
+    def _collect_shard(shard: DateRange, trunc_func) -> Tuple[Dict[str, Dict], ...]:
+        try:
+            return ReportService._collect_statistics([shard], trunc_func, workers=1)
+        finally:
+            connections.close_all()
+
+    @staticmethod
+    def _split_ranges(ranges: Sequence[DateRange], shard_days: int) -> List[DateRange]:
+        if shard_days <= 0:
+            raise ValueError("Shard size must be a positive number of days")
+
+        shards = []
+        for start_date, end_date in ranges:
+            current = start_date
+            while current < end_date:
+                shard_end = min(current + timedelta(days=shard_days), end_date)
+                shards.append((current, shard_end))
+                current = shard_end
+        return shards
+
+    @staticmethod
+    def _merge_partials(tables: Sequence[Dict[str, Dict]]) -> Dict[str, Dict]:
+        merged: Dict[str, Dict] = {}
+        for table in tables:
+            for period_key, row in table.items():
+                if period_key not in merged:
+                    merged[period_key] = dict(row)
+                    continue
+                target = merged[period_key]
+                for metric, value in row.items():
+                    if metric != "period":
+                        target[metric] += value
+        return merged
+
+    @staticmethod
+    def _group_by_period(
+        queryset: QuerySet,
+        field: str,
+        trunc_func,
+        cuts: Sequence[datetime] = (),
+        group_by: Optional[GroupByType] = None,
+        user_ids: Optional[Sequence] = None,
+        user_path: str = "",
+    ) -> QuerySet:
+        queryset = queryset.annotate(period=trunc_func(field))
+        keys = ["period"]
+
+        if cuts:
+            segment = Case(
+                *(When(**{f"{field}__lt": cut}, then=Value(index)) for index, cut in enumerate(cuts)),
+                default=Value(len(cuts)),
+                output_field=IntegerField(),
+            )
+            queryset = queryset.annotate(segment=segment)
+            keys.append("segment")
+
+        if user_ids is not None:
+            queryset = queryset.filter(**{f"{user_path}id__in": user_ids})
+        if group_by:
+            queryset = queryset.annotate(group=GROUP_BY_EXPRESSIONS[group_by](user_path))
+            keys.append("group")
+
+        return queryset.values(*keys)
 
     @staticmethod
-    def _get_orderitem1_statistics(start_date: datetime, end_date: datetime, trunc_func) -> Dict[str, Dict]:
-        items1 = (
-            OrderItem1.objects.filter(created_at__gte=start_date, created_at__lt=end_date)
-            .annotate(period=trunc_func("created_at"))
+    def _range_filter(field: str, ranges: Sequence[DateRange]) -> Q:
+        condition = Q()
+        for start_date, end_date in ranges:
+            condition |= Q(**{f"{field}__gte": start_date, f"{field}__lt": end_date})
+        return condition
+
+    @staticmethod
+    def generate_user_report(
+        user_id, start_date: datetime, end_date: datetime, period: PeriodType = "daily"
+    ) -> List[Dict[str, Any]]:
+        trunc_func = ReportService._get_trunc_func(period)
+        first_day, last_day = day_bounds(start_date, end_date)
+
+        stats = (
+            UserDailyStats.objects.filter(user_id=user_id, day__gte=first_day, day__lt=last_day)
+            .annotate(period=trunc_func("day"))
             .values("period")
             .annotate(
-                orderitem1_count=Count("id"),
-                orderitem1_amount=Coalesce(Sum("price"), Decimal("0"), output_field=DecimalField()),
+                orders_count=Sum("orders_count"),
+                orderitem1_count=Sum("orderitem1_count"),
+                orderitem1_amount=Sum("orderitem1_amount"),
+                orderitem2_count=Sum("orderitem2_count"),
+                orderitem2_amount=Sum("orderitem2_amount"),
             )
+            .order_by()
         )
+        stats_by_period = {ReportService._period_key(s["period"]): s for s in stats}
+
+        result = []
+        for period_date in ReportService._generate_all_periods(start_date, end_date, period):
+            period_key = str(period_date)
+            data = stats_by_period.get(period_key, {})
+
+            orderitem1_amount = data.get("orderitem1_amount", Decimal("0"))
+            orderitem2_amount = data.get("orderitem2_amount", Decimal("0"))
+
+            result.append(
+                {
+                    "Period": period_key,
+                    "OrdersCount": data.get("orders_count", 0),
+                    "OrderItem1Count": data.get("orderitem1_count", 0),
+                    "OrderItem1Amount": float(orderitem1_amount),
+                    "OrderItem2Count": data.get("orderitem2_count", 0),
+                    "OrderItem2Amount": float(orderitem2_amount),
+                    "OrdersTotalAmount": float(orderitem1_amount + orderitem2_amount),
+                }
+            )
 
-        return {str(i["period"]): i for i in items1}
+        return result
 
     @staticmethod
-    def _get_orderitem2_statistics(start_date: datetime, end_date: datetime, trunc_func) -> Dict[str, Dict]:
-        items2 = (
-            OrderItem2.objects.filter(created_at__gte=start_date, created_at__lt=end_date)
-            .annotate(period=trunc_func("created_at"))
-            .values("period")
+    def generate_cohort_report(
+        start_date: datetime, end_date: datetime, period: CohortPeriodType = "monthly"
+    ) -> List[Dict[str, Any]]:
+        if period not in ("weekly", "monthly"):
+            raise ValueError(f"Invalid cohort period: {period}. Must be 'weekly' or 'monthly'")
+
+        trunc_func = ReportService._get_trunc_func(period)
+        first_day, last_day = day_bounds(start_date, end_date)
+        cohort_users = User.objects.filter(date_joined__gte=start_date, date_joined__lt=end_date)
+
+        sizes = (
+            cohort_users.annotate(cohort=trunc_func("date_joined"))
+            .values("cohort")
+            .annotate(users=Count("id"))
+            .order_by()
+        )
+        cohort_sizes = {ReportService._period_key(s["cohort"]): s["users"] for s in sizes}
+
+        activity = (
+            cohort_users.filter(daily_stats__day__gte=first_day, daily_stats__day__lt=last_day)
+            .annotate(cohort=trunc_func("date_joined"), activity=trunc_func("daily_stats__day"))
+            .values("cohort", "activity")
             .annotate(
-                orderitem2_count=Count("id"),
-                orderitem2_amount=Coalesce(
-                    Sum(F("placement_price") + F("article_price"), output_field=DecimalField()),
-                    Decimal("0"),
-                    output_field=DecimalField(),
-                ),
+                active_users=Count("id", distinct=True, filter=Q(daily_stats__orders_count__gt=0)),
+                revenue=Sum(F("daily_stats__orderitem1_amount") + F("daily_stats__orderitem2_amount")),
             )
+            .order_by()
         )
+        activity_by_cohort: Dict[str, Dict[str, Dict]] = {}
+        for row in activity:
+            cohort_key = ReportService._period_key(row["cohort"])
+            activity_by_cohort.setdefault(cohort_key, {})[ReportService._period_key(row["activity"])] = row
 
-        return {str(i["period"]): i for i in items2}
+        all_periods = [str(p) for p in ReportService._generate_all_periods(start_date, end_date, period)]
+
+        result = []
+        for index, cohort_key in enumerate(all_periods):
+            users = cohort_sizes.get(cohort_key, 0)
+            cohort_activity = activity_by_cohort.get(cohort_key, {})
+
+            periods = []
+            cohort_revenue = Decimal("0")
+            for offset, period_key in enumerate(all_periods[index:]):
+                data = cohort_activity.get(period_key, {})
+                active_users = data.get("active_users", 0)
+                revenue = data.get("revenue") or Decimal("0")
+                cohort_revenue += revenue
+
+                periods.append(
+                    {
+                        "Offset": offset,
+                        "Period": period_key,
+                        "ActiveUsers": active_users,
+                        "Retention": round(active_users / users, 4) if users else 0.0,
+                        "Revenue": float(revenue),
+                    }
+                )
+
+            result.append(
+                {
+                    "Cohort": cohort_key,
+                    "Users": users,
+                    "Revenue": float(cohort_revenue),
+                    "Periods": periods,
+                }
+            )
+
+        return result
+
+    @staticmethod
+    def generate_distribution_report(
+        start_date: datetime,
+        end_date: datetime,
+        period: PeriodType = "daily",
+        mode: DistributionMode = "exact",
+        bin_width: Decimal = Decimal("50"),
+        percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    ) -> List[Dict[str, Any]]:
+        trunc_func = ReportService._get_trunc_func(period)
+        if mode not in ("exact", "approx"):
+            raise ValueError(f"Invalid mode: {mode}. Must be 'exact' or 'approx'")
+        if bin_width <= 0:
+            raise ValueError("Histogram bin width must be positive")
+
+        if mode == "exact":
+            stats = ReportService._get_exact_distribution(start_date, end_date, trunc_func, bin_width, percentiles)
+        else:
+            stats = ReportService._get_approx_distribution(start_date, end_date, period, bin_width, percentiles)
+
+        result = []
+        for period_date in ReportService._generate_all_periods(start_date, end_date, period):
+            period_key = str(period_date)
+            data = stats.get(period_key, {})
+
+            row = {
+                "Period": period_key,
+                "OrdersCount": data.get("orders_count", 0),
+                "Mean": data.get("mean"),
+            }
+            for percentile in percentiles:
+                row[ReportService._percentile_label(percentile)] = data.get(percentile)
+            row["Histogram"] = data.get("histogram", [])
+            result.append(row)
+
+        return result
+
+    @staticmethod
+    def generate_unique_buyers_report(
+        start_date: datetime, end_date: datetime, period: PeriodType = "daily", mode: DistributionMode = "exact"
+    ) -> List[Dict[str, Any]]:
+        return ReportService._unique_buyers(start_date, end_date, period, mode, with_total=False)[0]
+
+    @staticmethod
+    def generate_unique_buyers_report_with_total(
+        start_date: datetime, end_date: datetime, period: PeriodType = "daily", mode: DistributionMode = "exact"
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        return ReportService._unique_buyers(start_date, end_date, period, mode, with_total=True)
+
+    @staticmethod
+    def _unique_buyers(
+        start_date: datetime, end_date: datetime, period: PeriodType, mode: DistributionMode, with_total: bool
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        trunc_func = ReportService._get_trunc_func(period)
+        if mode not in ("exact", "approx"):
+            raise ValueError(f"Invalid mode: {mode}. Must be 'exact' or 'approx'")
+
+        total = None
+        if mode == "exact":
+            buyers = (
+                Order.objects.filter(created_at__gte=start_date, created_at__lt=end_date)
+                .annotate(period=trunc_func("created_at"))
+                .values("period")
+                .annotate(unique_buyers=Count("user", distinct=True))
+                .order_by()
+            )
+            counts = {ReportService._period_key(row["period"]): row["unique_buyers"] for row in buyers}
+            if with_total:
+                total = ReportService.count_unique_buyers(start_date, end_date, mode)
+        else:
+            first_day, last_day = day_bounds(start_date, end_date)
+            merged: Dict[str, HyperLogLog] = {}
+            overall = HyperLogLog()
+            for day, sketch in ReportService._get_daily_buyer_sketches(first_day, last_day).items():
+                merged.setdefault(str(ReportService._period_start(day, period)), HyperLogLog()).merge(sketch)
+                overall.merge(sketch)
+            counts = {period_key: sketch.count() for period_key, sketch in merged.items()}
+            total = overall.count()
+
+        rows = [
+            {"Period": str(period_date), "UniqueBuyers": counts.get(str(period_date), 0)}
+            for period_date in ReportService._generate_all_periods(start_date, end_date, period)
+        ]
+        return rows, total
+
+    @staticmethod
+    def count_unique_buyers(start_date: datetime, end_date: datetime, mode: DistributionMode = "exact") -> int:
+        if mode == "exact":
+            orders = Order.objects.filter(created_at__gte=start_date, created_at__lt=end_date)
+            return orders.aggregate(unique_buyers=Count("user", distinct=True))["unique_buyers"]
+        if mode != "approx":
+            raise ValueError(f"Invalid mode: {mode}. Must be 'exact' or 'approx'")
+
+        merged = HyperLogLog()
+        for sketch in ReportService._get_daily_buyer_sketches(*day_bounds(start_date, end_date)).values():
+            merged.merge(sketch)
+        return merged.count()
+
+    @staticmethod
+    def _get_exact_distribution(
+        start_date: datetime, end_date: datetime, trunc_func, bin_width: Decimal, percentiles: Sequence[float]
+    ) -> Dict[str, Dict]:
+        orders = (
+            Order.objects.filter(created_at__gte=start_date, created_at__lt=end_date)
+            .annotate(period=trunc_func("created_at"), total=order_total_expression())
+            .order_by()
+        )
+
+        summary = orders.values("period").annotate(
+            orders_count=Count("id"),
+            mean=Avg("total", output_field=FloatField()),
+            **{f"p{index}": PercentileCont("total", percentile) for index, percentile in enumerate(percentiles)},
+        )
+
+        stats: Dict[str, Dict] = {}
+        for row in summary:
+            data = {"orders_count": row["orders_count"], "mean": row["mean"], "histogram": []}
+            for index, percentile in enumerate(percentiles):
+                data[percentile] = row[f"p{index}"]
+            stats[ReportService._period_key(row["period"])] = data
+
+        histogram = (
+            orders.annotate(bucket=Floor(F("total") / bin_width))
+            .values("period", "bucket")
+            .annotate(count=Count("id"))
+            .order_by("period", "bucket")
+        )
+        width = float(bin_width)
+        for row in histogram:
+            bucket = int(row["bucket"])
+            stats[ReportService._period_key(row["period"])]["histogram"].append(
+                {"Lower": bucket * width, "Upper": (bucket + 1) * width, "Count": row["count"]}
+            )
+
+        return stats
+
+    @staticmethod
+    def _get_approx_distribution(
+        start_date: datetime,
+        end_date: datetime,
+        period: PeriodType,
+        bin_width: Decimal,
+        percentiles: Sequence[float],
+    ) -> Dict[str, Dict]:
+        first_day, last_day = day_bounds(start_date, end_date)
+
+        merged: Dict[str, QuantileSketch] = {}
+        for day, sketch in ReportService._get_daily_order_value_sketches(first_day, last_day).items():
+            period_key = str(ReportService._period_start(day, period))
+            merged.setdefault(period_key, QuantileSketch()).merge(sketch)
+
+        stats: Dict[str, Dict] = {}
+        for period_key, sketch in merged.items():
+            data = {
+                "orders_count": sketch.count,
+                "mean": sketch.mean(),
+                "histogram": sketch.histogram(float(bin_width)),
+            }
+            for percentile in percentiles:
+                data[percentile] = sketch.quantile(percentile)
+            stats[period_key] = data
+
+        return stats
+
+    @staticmethod
+    def _get_daily_order_value_sketches(first_day: date, last_day: date) -> Dict[date, QuantileSketch]:
+        def order_values(scan_start, scan_end):
+            return (
+                Order.objects.filter(created_at__gte=scan_start, created_at__lt=scan_end)
+                .annotate(day=TruncDate("created_at"), total=order_total_expression())
+                .order_by()
+                .values_list("day", "total")
+            )
+
+        return ReportService._get_daily_sketches(
+            DailySketch.ORDER_VALUE, QuantileSketch, first_day, last_day, order_values
+        )
+
+    @staticmethod
+    def _get_daily_buyer_sketches(first_day: date, last_day: date) -> Dict[date, HyperLogLog]:
+        def buyers(scan_start, scan_end):
+            return (
+                Order.objects.filter(created_at__gte=scan_start, created_at__lt=scan_end)
+                .annotate(day=TruncDate("created_at"))
+                .order_by()
+                .values_list("day", "user_id")
+                .distinct()
+            )
+
+        return ReportService._get_daily_sketches(DailySketch.UNIQUE_BUYERS, HyperLogLog, first_day, last_day, buyers)
+
+    @staticmethod
+    def _get_daily_sketches(kind: str, sketch_class, first_day: date, last_day: date, scan) -> Dict[date, Any]:
+        stored = DailySketch.objects.filter(kind=kind, day__gte=first_day, day__lt=last_day)
+        sketches = {row.day: sketch_class.from_dict(row.data) for row in stored}
+
+        missing = [
+            first_day + timedelta(days=offset)
+            for offset in range((last_day - first_day).days)
+            if first_day + timedelta(days=offset) not in sketches
+        ]
+        if not missing:
+            return sketches
+
+        scan_start = datetime.combine(missing[0], datetime.min.time(), tzinfo=timezone.get_current_timezone())
+        scan_end = datetime.combine(missing[-1], datetime.min.time(), tzinfo=timezone.get_current_timezone())
+        missing_days = set(missing)
+        computed: Dict[date, Any] = {}
+
+        for day, value in scan(scan_start, scan_end + timedelta(days=1)).iterator():
+            if day in missing_days:
+                computed.setdefault(day, sketch_class()).add(value)
+
+        today = timezone.localdate()
+        DailySketch.objects.bulk_create(
+            [
+                DailySketch(kind=kind, day=day, data=computed.get(day, sketch_class()).to_dict())
+                for day in missing
+                if day < today
+            ],
+            ignore_conflicts=True,
+        )
+
+        sketches.update(computed)
+        return sketches
+
+    @staticmethod
+    def _percentile_label(percentile: float) -> str:
+        return f"P{percentile * 100:g}".replace(".", "_")
+
+    @staticmethod
+    def _period_start(day: date, period: PeriodType) -> date:
+        if period == "weekly":
+            return day - timedelta(days=day.weekday())
+        if period == "monthly":
+            return day.replace(day=1)
+        return day
+
+    @staticmethod
+    def _get_trunc_func(period: PeriodType):
+        if period not in TRUNC_FUNCTIONS:
+            raise ValueError(f"Invalid period: {period}. Must be 'daily', 'weekly', or 'monthly'")
+        return TRUNC_FUNCTIONS[period]
+
+    @staticmethod
+    def _period_key(value) -> str:
+        if isinstance(value, datetime):
+            value = value.date()
+        return str(value)
+
+    @staticmethod
+    def _get_user_statistics(
+        ranges: Sequence[DateRange],
+        trunc_func,
+        cuts: Sequence[datetime] = (),
+        group_by: Optional[GroupByType] = None,
+        user_ids: Optional[Sequence] = None,
+    ) -> QuerySet:
+        users = ReportService._group_by_period(
+            User.objects.filter(ReportService._range_filter("date_joined", ranges)),
+            "date_joined",
+            trunc_func,
+            cuts,
+            group_by,
+            user_ids,
+        ).annotate(new_users=Count("id"), activated_users=Count("id", filter=Q(is_active=True)))
+
+        return users
+
+    @staticmethod
+    def _get_order_statistics(
+        ranges: Sequence[DateRange],
+        trunc_func,
+        cuts: Sequence[datetime] = (),
+        group_by: Optional[GroupByType] = None,
+        user_ids: Optional[Sequence] = None,
+    ) -> QuerySet:
+        orders = ReportService._group_by_period(
+            Order.objects.filter(ReportService._range_filter("created_at", ranges)),
+            "created_at",
+            trunc_func,
+            cuts,
+            group_by,
+            user_ids,
+            "user__",
+        ).annotate(orders_count=Count("id"))
+
+        return orders
+
+    @staticmethod
+    def _get_orderitem1_statistics(
+        ranges: Sequence[DateRange],
+        trunc_func,
+        cuts: Sequence[datetime] = (),
+        group_by: Optional[GroupByType] = None,
+        user_ids: Optional[Sequence] = None,
+    ) -> QuerySet:
+        items1 = ReportService._group_by_period(
+            OrderItem1.objects.filter(ReportService._range_filter("created_at", ranges)),
+            "created_at",
+            trunc_func,
+            cuts,
+            group_by,
+            user_ids,
+            "order__user__",
+        ).annotate(
+            orderitem1_count=Count("id"),
+            orderitem1_amount=Coalesce(Sum("price"), Decimal("0"), output_field=DecimalField()),
+        )
+
+        return items1
+
+    @staticmethod
+    def _get_orderitem2_statistics(
+        ranges: Sequence[DateRange],
+        trunc_func,
+        cuts: Sequence[datetime] = (),
+        group_by: Optional[GroupByType] = None,
+        user_ids: Optional[Sequence] = None,
+    ) -> QuerySet:
+        items2 = ReportService._group_by_period(
+            OrderItem2.objects.filter(ReportService._range_filter("created_at", ranges)),
+            "created_at",
+            trunc_func,
+            cuts,
+            group_by,
+            user_ids,
+            "order__user__",
+        ).annotate(
+            orderitem2_count=Count("id"),
+            orderitem2_amount=Coalesce(
+                Sum(F("placement_price") + F("article_price"), output_field=DecimalField()),
+                Decimal("0"),
+                output_field=DecimalField(),
+            ),
+        )
+
+        return items2
 
     @staticmethod
     def _merge_statistics(
@@ -104,66 +1195,87 @@ class ReportService:
         result = []
         for period_date in all_periods:
             period_key = str(period_date)
+            result.append(
+                ReportService._build_row(
+                    period_key,
+                    user_stats.get(period_key, {}),
+                    order_stats.get(period_key, {}),
+                    item1_stats.get(period_key, {}),
+                    item2_stats.get(period_key, {}),
+                )
+            )
 
-            user_data = user_stats.get(period_key, {})
-            order_data = order_stats.get(period_key, {})
-            item1_data = item1_stats.get(period_key, {})
-            item2_data = item2_stats.get(period_key, {})
+        return result
 
-            new_users = user_data.get("new_users", 0)
-            activated_users = user_data.get("activated_users", 0)
-            orders_count = order_data.get("orders_count", 0)
+    @staticmethod
+    def _build_row(period_key: str, user_data: Dict, order_data: Dict, item1_data: Dict, item2_data: Dict):
+        new_users = user_data.get("new_users", 0)
+        activated_users = user_data.get("activated_users", 0)
+        orders_count = order_data.get("orders_count", 0)
 
-            orderitem1_count = item1_data.get("orderitem1_count", 0)
-            orderitem1_amount = item1_data.get("orderitem1_amount", Decimal("0"))
+        orderitem1_count = item1_data.get("orderitem1_count", 0)
+        orderitem1_amount = item1_data.get("orderitem1_amount", Decimal("0"))
 
-            orderitem2_count = item2_data.get("orderitem2_count", 0)
-            orderitem2_amount = item2_data.get("orderitem2_amount", Decimal("0"))
+        orderitem2_count = item2_data.get("orderitem2_count", 0)
+        orderitem2_amount = item2_data.get("orderitem2_amount", Decimal("0"))
 
-            orders_total_amount = orderitem1_amount + orderitem2_amount
+        orders_total_amount = orderitem1_amount + orderitem2_amount
 
-            result.append(
-                {
-                    "Period": period_key,
-                    "NewUsers": new_users,
-                    "ActivatedUsers": activated_users,
-                    "OrdersCount": orders_count,
-                    "OrderItem1Count": orderitem1_count,
-                    "OrderItem1Amount": float(orderitem1_amount),
-                    "OrderItem2Count": orderitem2_count,
-                    "OrderItem2Amount": float(orderitem2_amount),
-                    "OrdersTotalAmount": float(orders_total_amount),
-                }
-            )
+        return {
+            "Period": period_key,
+            "NewUsers": new_users,
+            "ActivatedUsers": activated_users,
+            "OrdersCount": orders_count,
+            "OrderItem1Count": orderitem1_count,
+            "OrderItem1Amount": float(orderitem1_amount),
+            "OrderItem2Count": orderitem2_count,
+            "OrderItem2Amount": float(orderitem2_amount),
+            "OrdersTotalAmount": float(orders_total_amount),
+        }
 
-        return result
+    @staticmethod
+    def _generate_all_periods(start_date: datetime, end_date: datetime, period: PeriodType) -> List[date]:
+        return list(ReportService._iter_periods(start_date, end_date, period))
 
     @staticmethod
-    def _generate_all_periods(start_date: datetime, end_date: datetime, period: PeriodType) -> List[datetime]:
-        periods = []
+    def _iter_periods(start_date: datetime, end_date: datetime, period: PeriodType) -> Iterator[date]:
         current = start_date
 
         if period == "daily":
             while current < end_date:
-                periods.append(current.date())
+                yield current.date()
                 current += timedelta(days=1)
 
         elif period == "weekly":
             current = current - timedelta(days=current.weekday())
             while current < end_date:
-                periods.append(current.date())
+                yield current.date()
                 current += timedelta(weeks=1)
 
         elif period == "monthly":
             current = current.replace(day=1)
             while current < end_date:
-                periods.append(current.date())
+                yield current.date()
                 if current.month == 12:
                     current = current.replace(year=current.year + 1, month=1)
                 else:
                     current = current.replace(month=current.month + 1)
 
-        return periods
+
+class _PeriodStream:
+    def __init__(self, rows: Iterable[Dict[str, Any]]):
+        self._rows = iter(rows)
+        self._current = next(self._rows, None)
+
+    def take(self, period_key: str) -> Dict[str, Any]:
+        while self._current is not None and ReportService._period_key(self._current["period"]) < period_key:
+            self._current = next(self._rows, None)
+
+        if self._current is None or ReportService._period_key(self._current["period"]) != period_key:
+            return {}
+
+        row, self._current = self._current, next(self._rows, None)
+        return row
 
 
 def print_report(report_data: List[Dict[str, Any]]) -> None:
@@ -0,0 +1,212 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from django.db import connections, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from orders.cache import invalidate_closed_days
+from orders.models import DailySketch, Order, OrderItem1, OrderItem2, UserDailyStats
+
+Contribution = Tuple[object, date, Dict[str, object]]
+
+
+def to_day(value: datetime) -> date:
+    if timezone.is_aware(value):
+        return timezone.localtime(value).date()
+    return value.date()
+
+
+def day_bounds(start_date: datetime, end_date: datetime) -> Tuple[date, date]:
+    last_day = end_date.date()
+    if end_date.time() != datetime.min.time():
+        last_day += timedelta(days=1)
+    return start_date.date(), last_day
+
+
+def order_contribution(user_id, created_at: datetime) -> Contribution:
+    return user_id, to_day(created_at), {"orders_count": 1}
+
+
+def orderitem1_contribution(user_id, created_at: datetime, price) -> Contribution:
+    return user_id, to_day(created_at), {"orderitem1_count": 1, "orderitem1_amount": Decimal(price)}
+
+
+def orderitem2_contribution(user_id, created_at: datetime, placement_price, article_price) -> Contribution:
+    amount = Decimal(placement_price) + Decimal(article_price)
+    return user_id, to_day(created_at), {"orderitem2_count": 1, "orderitem2_amount": amount}
+
+
+def negate(contribution: Contribution) -> Contribution:
+    user_id, day, deltas = contribution
+    return user_id, day, {field: -value for field, value in deltas.items()}
+
+
+def apply_contribution(contribution: Optional[Contribution], create: bool = True) -> None:
+    if contribution is None:
+        return
+
+    user_id, day, deltas = contribution
+    updates = {field: F(field) + value for field, value in deltas.items()}
+
+    with transaction.atomic(savepoint=False):
+        updated = UserDailyStats.objects.filter(user_id=user_id, day=day).update(**updates)
+        if not updated and create:
+            stats, created = UserDailyStats.objects.get_or_create(user_id=user_id, day=day, defaults=deltas)
+            if not created:
+                UserDailyStats.objects.filter(pk=stats.pk).update(**updates)
+
+
+class RollupBatch:
+    def __init__(self, using: str):
+        self.using = using
+        self.contributions: Dict[Tuple[object, date], Tuple[Dict[str, object], bool]] = {}
+        self.stale_sketches: Dict[str, Set[date]] = defaultdict(set)
+        self.closed_days: Set[date] = set()
+        self.orders: Dict[object, Tuple[object, datetime]] = {}
+        self.wanted_orders: Set[object] = set()
+        self.flushed = False
+
+    def add(self, contribution: Optional[Contribution], create: bool = True) -> None:
+        if contribution is None:
+            return
+        user_id, day, deltas = contribution
+        totals, creates = self.contributions.get((user_id, day), ({}, False))
+        for field, value in deltas.items():
+            totals[field] = totals.get(field, 0) + value
+        self.contributions[(user_id, day)] = totals, creates or create
+
+    def invalidate(self, *days: Optional[date]) -> None:
+        self.closed_days.update(day for day in days if day is not None)
+
+    def invalidate_sketches(self, kinds: List[str], *days: Optional[date]) -> None:
+        for kind in kinds:
+            self.stale_sketches[kind].update(day for day in days if day is not None)
+
+    def order_state(self, order_id) -> Tuple[object, datetime]:
+        if order_id not in self.orders:
+            missing = (self.wanted_orders | {order_id}) - self.orders.keys()
+            rows = Order.objects.using(self.using).filter(pk__in=missing).values_list("pk", "user_id", "created_at")
+            for pk, user_id, created_at in rows:
+                self.orders[pk] = user_id, created_at
+            self.wanted_orders.clear()
+        return self.orders[order_id]
+
+    def flush(self) -> None:
+        self.flushed = True
+        today = timezone.localdate()
+        with transaction.atomic(using=self.using):
+            for (user_id, day), (deltas, create) in sorted(
+                self.contributions.items(), key=lambda item: (str(item[0][0]), item[0][1])
+            ):
+                if any(deltas.values()):
+                    apply_contribution((user_id, day, deltas), create=create)
+            for kind, days in self.stale_sketches.items():
+                days = {day for day in days if day < today}
+                if days:
+                    DailySketch.objects.filter(kind=kind, day__in=days).delete()
+        invalidate_closed_days(*self.closed_days)
+
+    def is_pending(self, connection) -> bool:
+        return not self.flushed and any(callback == self.flush for _, callback, *_ in connection.run_on_commit)
+
+
+@contextmanager
+def deferred_rollups(using: str = "default") -> Iterator[RollupBatch]:
+    with transaction.atomic(using=using, savepoint=False):
+        connection = connections[using]
+        batches = {
+            key: batch
+            for key, batch in getattr(connection, "rollup_batches", {}).items()
+            if batch.is_pending(connection)
+        }
+        key = tuple(connection.savepoint_ids)
+        if key not in batches:
+            batches[key] = RollupBatch(using)
+            transaction.on_commit(batches[key].flush, using=using)
+        connection.rollup_batches = batches
+        yield batches[key]
+
+
+def order_items_contributions(order_id, user_id) -> List[Contribution]:
+    totals: Dict[date, Dict[str, object]] = defaultdict(dict)
+
+    items1 = (
+        OrderItem1.objects.filter(order_id=order_id)
+        .annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(orderitem1_count=Count("id"), orderitem1_amount=Sum("price"))
+        .order_by()
+    )
+    for row in items1:
+        totals[row.pop("day")].update(row)
+
+    items2 = (
+        OrderItem2.objects.filter(order_id=order_id)
+        .annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(
+            orderitem2_count=Count("id"),
+            orderitem2_amount=Sum(F("placement_price") + F("article_price"), output_field=DecimalField()),
+        )
+        .order_by()
+    )
+    for row in items2:
+        totals[row.pop("day")].update(row)
+
+    return [(user_id, day, deltas) for day, deltas in totals.items()]
+
+
+def rebuild_user_daily_stats(batch_size: int = 1000) -> int:
+    totals: Dict[Tuple[object, date], Dict[str, object]] = defaultdict(dict)
+
+    orders = (
+        Order.objects.annotate(day=TruncDate("created_at"))
+        .values("user_id", "day")
+        .annotate(orders_count=Count("id"))
+        .order_by()
+    )
+    for row in orders.iterator():
+        totals[(row["user_id"], row["day"])]["orders_count"] = row["orders_count"]
+
+    items1 = (
+        OrderItem1.objects.annotate(day=TruncDate("created_at"))
+        .values("order__user_id", "day")
+        .annotate(orderitem1_count=Count("id"), orderitem1_amount=Sum("price"))
+        .order_by()
+    )
+    for row in items1.iterator():
+        totals[(row["order__user_id"], row["day"])].update(
+            orderitem1_count=row["orderitem1_count"], orderitem1_amount=row["orderitem1_amount"]
+        )
+
+    items2 = (
+        OrderItem2.objects.annotate(day=TruncDate("created_at"))
+        .values("order__user_id", "day")
+        .annotate(
+            orderitem2_count=Count("id"),
+            orderitem2_amount=Coalesce(
+                Sum(F("placement_price") + F("article_price"), output_field=DecimalField()),
+                Decimal("0"),
+                output_field=DecimalField(),
+            ),
+        )
+        .order_by()
+    )
+    for row in items2.iterator():
+        totals[(row["order__user_id"], row["day"])].update(
+            orderitem2_count=row["orderitem2_count"], orderitem2_amount=row["orderitem2_amount"]
+        )
+
+    with transaction.atomic():
+        UserDailyStats.objects.all().delete()
+        UserDailyStats.objects.bulk_create(
+            (UserDailyStats(user_id=user_id, day=day, **values) for (user_id, day), values in totals.items()),
+            batch_size=batch_size,
+        )
+
+    return len(totals)
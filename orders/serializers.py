@@ -2,6 +2,8 @@ from rest_framework import serializers
 
 from .models import Order, OrderItem1, OrderItem2
 
+REPORT_BATCH_MAX_SPECS = 100
+
 
 class OrderItem1Serializer(serializers.ModelSerializer):
     class Meta:
@@ -32,12 +34,33 @@ class OrderSerializer(serializers.ModelSerializer):
         read_only_fields = ["id"]
 
     def get_items1_count(self, obj):
+        if hasattr(obj, "items1_count"):
+            return obj.items1_count
         return obj.items1.count()
 
     def get_items2_count(self, obj):
+        if hasattr(obj, "items2_count"):
+            return obj.items2_count
         return obj.items2.count()
 
 
+class OrderChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Order
+        fields = ["id", "user", "created_at", "updated_at"]
+        read_only_fields = fields
+
+
+class OrderItem1ChangeSerializer(OrderItem1Serializer):
+    class Meta(OrderItem1Serializer.Meta):
+        fields = OrderItem1Serializer.Meta.fields + ["updated_at"]
+
+
+class OrderItem2ChangeSerializer(OrderItem2Serializer):
+    class Meta(OrderItem2Serializer.Meta):
+        fields = OrderItem2Serializer.Meta.fields + ["updated_at"]
+
+
 class OrderDetailSerializer(serializers.ModelSerializer):
     items1 = OrderItem1Serializer(many=True, read_only=True)
     items2 = OrderItem2Serializer(many=True, read_only=True)
@@ -59,3 +82,136 @@ class ReportSerializer(serializers.Serializer):
     OrderItem2Count = serializers.IntegerField()
     OrderItem2Amount = serializers.FloatField()
     OrdersTotalAmount = serializers.FloatField()
+
+
+class ReportMetricsSerializer(ReportSerializer):
+    Period = None
+
+
+class ReportWindowSerializer(ReportSerializer):
+    Rolling = serializers.DictField(child=serializers.DictField(child=serializers.FloatField()), required=False)
+    Cumulative = ReportMetricsSerializer(required=False)
+
+
+class ConfidenceIntervalSerializer(serializers.Serializer):
+    Lower = ReportMetricsSerializer()
+    Upper = ReportMetricsSerializer()
+
+
+class ApproxReportSerializer(ReportSerializer):
+    ConfidenceInterval = ConfidenceIntervalSerializer()
+    SamplePercent = serializers.DictField(child=serializers.FloatField())
+
+
+class CalendarReportSerializer(ReportSerializer):
+    Label = serializers.CharField()
+
+
+class SegmentedReportSerializer(serializers.Serializer):
+    Segment = serializers.CharField()
+    Data = ReportSerializer(many=True)
+
+
+class MetricComparisonSerializer(serializers.Serializer):
+    Previous = serializers.FloatField()
+    Delta = serializers.FloatField()
+    DeltaPercent = serializers.FloatField(allow_null=True)
+
+
+class ReportComparisonSerializer(ReportSerializer):
+    PreviousPeriod = serializers.CharField(required=False, allow_null=True)
+    Comparison = serializers.DictField(child=MetricComparisonSerializer(), required=False)
+
+
+class UserReportSerializer(serializers.Serializer):
+    Period = serializers.CharField()
+    OrdersCount = serializers.IntegerField()
+    OrderItem1Count = serializers.IntegerField()
+    OrderItem1Amount = serializers.FloatField()
+    OrderItem2Count = serializers.IntegerField()
+    OrderItem2Amount = serializers.FloatField()
+    OrdersTotalAmount = serializers.FloatField()
+
+
+class CohortPeriodSerializer(serializers.Serializer):
+    Offset = serializers.IntegerField()
+    Period = serializers.CharField()
+    ActiveUsers = serializers.IntegerField()
+    Retention = serializers.FloatField()
+    Revenue = serializers.FloatField()
+
+
+class CohortSerializer(serializers.Serializer):
+    Cohort = serializers.CharField()
+    Users = serializers.IntegerField()
+    Revenue = serializers.FloatField()
+    Periods = CohortPeriodSerializer(many=True)
+
+
+class HistogramBucketSerializer(serializers.Serializer):
+    Lower = serializers.FloatField()
+    Upper = serializers.FloatField()
+    Count = serializers.IntegerField()
+
+
+class DistributionSerializer(serializers.Serializer):
+    Period = serializers.CharField()
+    OrdersCount = serializers.IntegerField()
+    Mean = serializers.FloatField(allow_null=True)
+    P50 = serializers.FloatField(allow_null=True)
+    P90 = serializers.FloatField(allow_null=True)
+    P99 = serializers.FloatField(allow_null=True)
+    Histogram = HistogramBucketSerializer(many=True)
+
+
+class UniqueBuyersSerializer(serializers.Serializer):
+    Period = serializers.CharField()
+    UniqueBuyers = serializers.IntegerField()
+
+
+class ChangeFeedSerializer(serializers.Serializer):
+    results = serializers.ListField(child=serializers.DictField())
+    next_token = serializers.CharField(allow_null=True)
+    has_more = serializers.BooleanField()
+
+
+class ReportSpecSerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    period = serializers.ChoiceField(choices=["daily", "weekly", "monthly"], default="daily")
+
+
+class ReportBatchRequestSerializer(serializers.Serializer):
+    reports = ReportSpecSerializer(many=True, allow_empty=False, max_length=REPORT_BATCH_MAX_SPECS)
+
+
+class ReportBatchResultSerializer(ReportSpecSerializer):
+    data = ReportSerializer(many=True)
+
+
+class ReportBatchResponseSerializer(serializers.Serializer):
+    reports = ReportBatchResultSerializer(many=True)
+
+
+class ReportResponseSerializer(ReportSpecSerializer):
+    period = serializers.ChoiceField(choices=["daily", "weekly", "monthly"])
+    data = ReportSerializer(many=True)
+
+
+class ReportWindowResponseSerializer(ReportResponseSerializer):
+    data = ReportWindowSerializer(many=True)
+
+
+class ReportComparisonResponseSerializer(ReportResponseSerializer):
+    compare = serializers.ChoiceField(choices=["previous", "year_ago"])
+    data = ReportComparisonSerializer(many=True)
+
+
+class SegmentedReportResponseSerializer(ReportResponseSerializer):
+    group_by = serializers.ChoiceField(choices=["activation", "signup_month", "users"])
+    data = SegmentedReportSerializer(many=True)
+
+
+class ApproxReportResponseSerializer(ReportResponseSerializer):
+    accuracy = serializers.ChoiceField(choices=["approx"])
+    data = ApproxReportSerializer(many=True)
@@ -0,0 +1,165 @@
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from orders.cache import bump_report_cache_version
+from orders.live import publish_live_deltas
+from orders.models import DailySketch, Order, OrderItem1, OrderItem2
+from orders.rollups import (
+    deferred_rollups,
+    negate,
+    order_contribution,
+    order_items_contributions,
+    orderitem1_contribution,
+    orderitem2_contribution,
+    to_day,
+)
+from users.models import User
+
+
+def _previous_order_state(instance):
+    row = Order.objects.filter(pk=instance.pk).values("user_id", "created_at").first()
+    if not row:
+        return None, None
+    return order_contribution(row["user_id"], row["created_at"]), to_day(row["created_at"])
+
+
+def _previous_orderitem1_state(instance):
+    row = (
+        OrderItem1.objects.filter(pk=instance.pk)
+        .values("order__user_id", "order__created_at", "created_at", "price")
+        .first()
+    )
+    if not row:
+        return None, None
+    contribution = orderitem1_contribution(row["order__user_id"], row["created_at"], row["price"])
+    return contribution, to_day(row["order__created_at"])
+
+
+def _previous_orderitem2_state(instance):
+    row = (
+        OrderItem2.objects.filter(pk=instance.pk)
+        .values("order__user_id", "order__created_at", "created_at", "placement_price", "article_price")
+        .first()
+    )
+    if not row:
+        return None, None
+    contribution = orderitem2_contribution(
+        row["order__user_id"], row["created_at"], row["placement_price"], row["article_price"]
+    )
+    return contribution, to_day(row["order__created_at"])
+
+
+def _order_state(instance, batch):
+    if isinstance(instance, Order):
+        return instance.user_id, instance.created_at
+    if type(instance).order.is_cached(instance):
+        return instance.order.user_id, instance.order.created_at
+    return batch.order_state(instance.order_id)
+
+
+def _contribution(instance, user_id):
+    if isinstance(instance, Order):
+        return order_contribution(user_id, instance.created_at)
+    if isinstance(instance, OrderItem1):
+        return orderitem1_contribution(user_id, instance.created_at, instance.price)
+    return orderitem2_contribution(user_id, instance.created_at, instance.placement_price, instance.article_price)
+
+
+def _sketch_kinds(instance):
+    if isinstance(instance, Order):
+        return [DailySketch.ORDER_VALUE, DailySketch.UNIQUE_BUYERS]
+    return [DailySketch.ORDER_VALUE]
+
+
+def _publish_live(using, *contributions):
+    publish_live_deltas([(day, deltas) for _, day, deltas in filter(None, contributions)], using=using)
+
+
+PREVIOUS_STATES = {
+    Order: _previous_order_state,
+    OrderItem1: _previous_orderitem1_state,
+    OrderItem2: _previous_orderitem2_state,
+}
+
+
+@receiver(pre_save, sender=Order)
+@receiver(pre_save, sender=OrderItem1)
+@receiver(pre_save, sender=OrderItem2)
+def remember_previous_contribution(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        instance._previous_contribution, instance._previous_order_day = None, None
+        return
+    instance._previous_contribution, instance._previous_order_day = PREVIOUS_STATES[sender](instance)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_save, sender=OrderItem1)
+@receiver(post_save, sender=OrderItem2)
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    with deferred_rollups(instance._state.db) as batch:
+        if isinstance(instance, Order):
+            batch.orders[instance.pk] = instance.user_id, instance.created_at
+        user_id, order_created_at = _order_state(instance, batch)
+        previous = getattr(instance, "_previous_contribution", None)
+        current = _contribution(instance, user_id)
+        if previous is not None:
+            batch.add(negate(previous), create=False)
+        batch.add(current)
+        _publish_live(instance._state.db, negate(previous) if previous else None, current)
+
+        item_days = []
+        if isinstance(instance, Order) and previous is not None and previous[0] != instance.user_id:
+            for contribution in order_items_contributions(instance.pk, previous[0]):
+                batch.add(negate(contribution), create=False)
+                batch.add((instance.user_id, *contribution[1:]))
+                item_days.append(contribution[1])
+
+        order_day = to_day(order_created_at)
+        previous_order_day = getattr(instance, "_previous_order_day", None)
+        batch.invalidate_sketches(_sketch_kinds(instance), order_day, previous_order_day)
+        batch.invalidate(current[1], previous[1] if previous else None, order_day, previous_order_day, *item_days)
+
+
+@receiver(pre_delete, sender=Order)
+@receiver(pre_delete, sender=OrderItem1)
+@receiver(pre_delete, sender=OrderItem2)
+def remember_deleted_order_state(sender, instance, **kwargs):
+    with deferred_rollups(instance._state.db) as batch:
+        if isinstance(instance, Order):
+            batch.orders[instance.pk] = instance.user_id, instance.created_at
+        elif type(instance).order.is_cached(instance):
+            batch.orders[instance.order_id] = instance.order.user_id, instance.order.created_at
+        else:
+            batch.wanted_orders.add(instance.order_id)
+
+
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=OrderItem1)
+@receiver(post_delete, sender=OrderItem2)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    with deferred_rollups(instance._state.db) as batch:
+        user_id, order_created_at = _order_state(instance, batch)
+        current = _contribution(instance, user_id)
+        batch.add(negate(current), create=False)
+        _publish_live(instance._state.db, negate(current))
+
+        order_day = to_day(order_created_at)
+        batch.invalidate_sketches(_sketch_kinds(instance), order_day)
+        batch.invalidate(current[1], order_day)
+
+
+@receiver(post_save, sender=User)
+def publish_new_user(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        deltas = {"new_users": 1, "activated_users": int(instance.is_active)}
+        _publish_live(instance._state.db, (instance.pk, to_day(instance.date_joined), deltas))
+
+
+@receiver(post_save, sender=User)
+def invalidate_renamed_user(sender, instance, created=False, raw=False, **kwargs):
+    previous, instance._loaded_identity = getattr(instance, "_loaded_identity", None), instance.identity()
+    if created or raw or previous == instance._loaded_identity:
+        return
+    bump_report_cache_version()
@@ -0,0 +1,176 @@
+import hashlib
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class QuantileSketch:
+    """DDSketch: log-spaced buckets, quantiles within ``relative_accuracy``, merged by adding counts."""
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, count: int = 1) -> None:
+        value = float(value)
+        if value <= 0:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[index] = self.bins.get(index, 0) + count
+
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def update(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        if other.max is not None:
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1")
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        lower = self._value_at_rank(math.floor(rank))
+        upper = self._value_at_rank(math.ceil(rank))
+        return lower + (upper - lower) * (rank - math.floor(rank))
+
+    def histogram(self, bin_width: float) -> List[Dict[str, Any]]:
+        counts: Dict[int, int] = {}
+        if self.zero_count:
+            counts[0] = self.zero_count
+        for index, count in self.bins.items():
+            bucket = int(self._bin_value(index) // bin_width)
+            counts[bucket] = counts.get(bucket, 0) + count
+
+        return [
+            {"Lower": bucket * bin_width, "Upper": (bucket + 1) * bin_width, "Count": counts[bucket]}
+            for bucket in sorted(counts)
+        ]
+
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": {str(index): count for index, count in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(data["relative_accuracy"])
+        sketch.bins = {int(index): count for index, count in data["bins"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.total = data["total"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
+
+    def _value_at_rank(self, rank: int) -> float:
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return min(max(self._bin_value(index), self.min), self.max)
+
+        return self.max
+
+    def _bin_value(self, index: int) -> float:
+        return 2 * self.gamma**index / (self.gamma + 1)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter: 2**precision registers, standard error about 1.04 / sqrt(2**precision)."""
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError("Precision must be between 4 and 16")
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers: Dict[int, int] = {}
+
+    def add(self, value: Any) -> None:
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers.get(index, 0):
+            self.registers[index] = rank
+
+    def update(self, values: Iterable[Any]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+
+        for index, rank in other.registers.items():
+            if rank > self.registers.get(index, 0):
+                self.registers[index] = rank
+
+    def count(self) -> int:
+        if not self.registers:
+            return 0
+
+        zeros = self.size - len(self.registers)
+        harmonic = zeros + sum(2.0**-rank for rank in self.registers.values())
+        estimate = self._alpha() * self.size * self.size / harmonic
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        return round(estimate)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "precision": self.precision,
+            "registers": {str(index): rank for index, rank in self.registers.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        sketch = cls(data["precision"])
+        sketch.registers = {int(index): rank for index, rank in data["registers"].items()}
+        return sketch
+
+    def _alpha(self) -> float:
+        if self.size == 16:
+            return 0.673
+        if self.size == 32:
+            return 0.697
+        if self.size == 64:
+            return 0.709
+        return 0.7213 / (1 + 1.079 / self.size)
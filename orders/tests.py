@@ -1,56 +1,102 @@
-from datetime import datetime, timedelta
+import csv
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.paginator import EmptyPage
+from django.db import connection, connections, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import TruncMonth
+from django.test import LiveServerTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
 
-from orders.models import Order, OrderItem1, OrderItem2
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from orders import signals
+from orders.archival import archive_orders
+from orders.cache import _params_digest, coalesced, get_report_cache_version
+from orders.checks import check_shared_report_cache
+from orders.live import LiveReport, live_report, stream_live_report
+from orders.management.commands.load_test import build_plan, parse_mix
+from orders.models import (
+    ArchivedOrder,
+    ArchivedOrderItem1,
+    ArchivedOrderItem2,
+    CalendarPeriod,
+    DailySketch,
+    Order,
+    OrderItem1,
+    OrderItem2,
+    UserDailyStats,
+)
+from orders.periods import build_calendar, fiscal_position
 from orders.reports import ReportService
+from orders.rollups import rebuild_user_daily_stats
+from orders.sketches import HyperLogLog, QuantileSketch
+from orders.snapshots import export_snapshot
+from orders.writers import open_report_writer, write_rows
+from reporting.pagination import EstimatedCountPaginator, estimate_count, planner_row_estimate
 from users.models import User
 
 
 class ReportServiceTestCase(TestCase):
     def setUp(self):
-        self.base_date = datetime(2025, 1, 10, 12, 0, 0, tzinfo=timezone.utc)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.base_date = datetime(2025, 1, 10, 12, 0, 0, tzinfo=timezone.utc)
 
-        self.user1 = User.objects.create_user(
-            username="user1", email="user1@example.com", password="testpass123", is_active=True
-        )
-        self.user1.date_joined = self.base_date
-        self.user1.save()
+            self.user1 = User.objects.create_user(
+                username="user1", email="user1@example.com", password="testpass123", is_active=True
+            )
+            self.user1.date_joined = self.base_date
+            self.user1.save()
 
-        self.user2 = User.objects.create_user(
-            username="user2", email="user2@example.com", password="testpass123", is_active=True
-        )
-        self.user2.date_joined = self.base_date + timedelta(days=1)
-        self.user2.save()
+            self.user2 = User.objects.create_user(
+                username="user2", email="user2@example.com", password="testpass123", is_active=True
+            )
+            self.user2.date_joined = self.base_date + timedelta(days=1)
+            self.user2.save()
 
-        self.user3 = User.objects.create_user(
-            username="user3", email="user3@example.com", password="testpass123", is_active=False
-        )
-        self.user3.date_joined = self.base_date + timedelta(days=1)
-        self.user3.save()
+            self.user3 = User.objects.create_user(
+                username="user3", email="user3@example.com", password="testpass123", is_active=False
+            )
+            self.user3.date_joined = self.base_date + timedelta(days=1)
+            self.user3.save()
 
-        self.order1 = Order.objects.create(user=self.user1, created_at=self.base_date)
-        self.order2 = Order.objects.create(user=self.user1, created_at=self.base_date)
-        self.order3 = Order.objects.create(user=self.user2, created_at=self.base_date + timedelta(days=1))
-        OrderItem1.objects.create(order=self.order1, price=Decimal("100.00"), created_at=self.base_date)
-        OrderItem1.objects.create(order=self.order1, price=Decimal("150.00"), created_at=self.base_date)
-        OrderItem1.objects.create(
-            order=self.order3, price=Decimal("75.50"), created_at=self.base_date + timedelta(days=1)
-        )
-        OrderItem2.objects.create(
-            order=self.order2,
-            placement_price=Decimal("50.00"),
-            article_price=Decimal("30.00"),
-            created_at=self.base_date,
-        )
-        OrderItem2.objects.create(
-            order=self.order2,
-            placement_price=Decimal("25.00"),
-            article_price=Decimal("15.00"),
-            created_at=self.base_date,
-        )
+            self.order1 = Order.objects.create(user=self.user1, created_at=self.base_date)
+            self.order2 = Order.objects.create(user=self.user1, created_at=self.base_date)
+            self.order3 = Order.objects.create(user=self.user2, created_at=self.base_date + timedelta(days=1))
+            OrderItem1.objects.create(order=self.order1, price=Decimal("100.00"), created_at=self.base_date)
+            OrderItem1.objects.create(order=self.order1, price=Decimal("150.00"), created_at=self.base_date)
+            OrderItem1.objects.create(
+                order=self.order3, price=Decimal("75.50"), created_at=self.base_date + timedelta(days=1)
+            )
+            OrderItem2.objects.create(
+                order=self.order2,
+                placement_price=Decimal("50.00"),
+                article_price=Decimal("30.00"),
+                created_at=self.base_date,
+            )
+            OrderItem2.objects.create(
+                order=self.order2,
+                placement_price=Decimal("25.00"),
+                article_price=Decimal("15.00"),
+                created_at=self.base_date,
+            )
 
     def test_daily_report(self):
         start_date = self.base_date
@@ -108,6 +154,83 @@ class ReportServiceTestCase(TestCase):
             self.assertEqual(day["OrderItem2Amount"], 0.00)
             self.assertEqual(day["OrdersTotalAmount"], 0.00)
 
+    def test_segmented_report_by_activation(self):
+        with CaptureQueriesContext(connection) as queries:
+            report = ReportService.generate_segmented_report(
+                self.base_date, self.base_date + timedelta(days=2), "daily", "activation"
+            )
+
+        self.assertEqual(len(queries), 4)
+        self.assertEqual([segment["Segment"] for segment in report], ["activated", "not_activated"])
+        activated, not_activated = report[0]["Data"], report[1]["Data"]
+        self.assertEqual(activated[0]["OrdersCount"], 2)
+        self.assertEqual(activated[0]["OrdersTotalAmount"], 370.00)
+        self.assertEqual(activated[1]["NewUsers"], 1)
+        self.assertEqual(activated[1]["OrderItem1Amount"], 75.50)
+        self.assertEqual(not_activated[1]["NewUsers"], 1)
+        self.assertEqual(not_activated[1]["ActivatedUsers"], 0)
+        self.assertEqual(not_activated[1]["OrdersCount"], 0)
+
+    def test_segments_add_up_to_report(self):
+        start_date, end_date = self.base_date, self.base_date + timedelta(days=3)
+        report = ReportService.generate_report(start_date, end_date, "daily")
+        segmented = ReportService.generate_segmented_report(start_date, end_date, "daily", "signup_month")
+
+        self.assertEqual([segment["Segment"] for segment in segmented], ["2025-01-01"])
+        self.assertEqual(segmented[0]["Data"], report)
+
+    def test_segmented_report_by_users(self):
+        report = ReportService.generate_segmented_report(
+            self.base_date, self.base_date + timedelta(days=2), "weekly", "users", [self.user2.pk, self.user3.pk]
+        )
+
+        self.assertEqual([segment["Segment"] for segment in report], [str(self.user2.pk), str(self.user3.pk)])
+        self.assertEqual(report[0]["Data"][0]["OrdersCount"], 1)
+        self.assertEqual(report[0]["Data"][0]["OrdersTotalAmount"], 75.50)
+        self.assertEqual(report[1]["Data"][0]["NewUsers"], 1)
+        self.assertEqual(report[1]["Data"][0]["OrdersCount"], 0)
+
+    def test_segmented_report_validation(self):
+        with self.assertRaises(ValueError):
+            ReportService.generate_segmented_report(self.base_date, self.base_date, "daily", "country")
+        with self.assertRaises(ValueError):
+            ReportService.generate_segmented_report(self.base_date, self.base_date, "daily", "users")
+
+    def test_window_report_fetches_lead_in(self):
+        start_date = self.base_date + timedelta(days=1)
+        with CaptureQueriesContext(connection) as queries:
+            report = ReportService.generate_window_report(
+                start_date, start_date + timedelta(days=3), "daily", rolling=[7], cumulative=True
+            )
+
+        self.assertEqual(len(queries), 4)
+        self.assertEqual(len(report), 3)
+        self.assertEqual(report[0]["OrdersCount"], 1)
+        self.assertEqual(report[0]["Rolling"]["7d"]["OrdersCount"], round(3 / 7, 2))
+        self.assertEqual(report[0]["Rolling"]["7d"]["OrdersTotalAmount"], round(445.50 / 7, 2))
+        self.assertEqual(report[2]["Rolling"]["7d"]["OrdersCount"], round(3 / 7, 2))
+        self.assertEqual(report[0]["Cumulative"]["OrdersCount"], 1)
+        self.assertEqual(report[2]["Cumulative"]["OrdersCount"], 1)
+        self.assertEqual(report[2]["Cumulative"]["NewUsers"], 2)
+        self.assertEqual(report[2]["Cumulative"]["OrdersTotalAmount"], 75.50)
+
+    def test_window_report_matches_base_report(self):
+        start_date, end_date = self.base_date, self.base_date + timedelta(days=14)
+        for period in ("daily", "weekly", "monthly"):
+            with self.subTest(period=period):
+                base = ReportService.generate_report(start_date, end_date, period)
+                report = ReportService.generate_window_report(start_date, end_date, period, rolling=[28])
+                self.assertEqual([{k: v for k, v in row.items() if k != "Rolling"} for row in report], base)
+
+    def test_weekly_rolling_averages_per_bucket(self):
+        report = ReportService.generate_window_report(
+            self.base_date + timedelta(days=7), self.base_date + timedelta(days=14), "weekly", rolling=[14]
+        )
+
+        self.assertEqual(report[0]["Period"], "2025-01-13")
+        self.assertEqual(report[0]["OrdersCount"], 0)
+        self.assertEqual(report[0]["Rolling"]["14d"]["OrdersCount"], 1.5)
+
     def test_invalid_period_raises_error(self):
         with self.assertRaises(ValueError):
             ReportService.generate_report(self.base_date, self.base_date + timedelta(days=1), "invalid_period")
@@ -138,3 +261,1286 @@ class ReportServiceTestCase(TestCase):
         self.assertIsInstance(day_data["OrderItem1Amount"], float)
         self.assertIsInstance(day_data["OrderItem2Amount"], float)
         self.assertIsInstance(day_data["OrdersTotalAmount"], float)
+
+    def test_weekly_report_matches_daily_totals(self):
+        start_date = self.base_date - timedelta(days=4)
+        end_date = self.base_date + timedelta(days=10)
+
+        report = ReportService.generate_report(start_date, end_date, "weekly")
+
+        self.assertEqual(sum(week["OrdersCount"] for week in report), 3)
+        self.assertEqual(sum(week["NewUsers"] for week in report), 3)
+        self.assertEqual(sum(week["OrdersTotalAmount"] for week in report), 445.50)
+
+    def test_iter_report_matches_generate_report(self):
+        start_date = self.base_date - timedelta(days=20)
+        end_date = self.base_date + timedelta(days=40)
+
+        for period in ("daily", "weekly", "monthly"):
+            self.assertEqual(
+                list(ReportService.iter_report(start_date, end_date, period)),
+                ReportService.generate_report(start_date, end_date, period),
+            )
+
+    def test_generate_reports_matches_individual_reports(self):
+        specs = [
+            (datetime(2025, 1, 1), datetime(2025, 2, 1), "daily"),
+            (datetime(2025, 1, 1), datetime(2025, 3, 1), "monthly"),
+            (datetime(2025, 1, 6), datetime(2025, 1, 20), "weekly"),
+            (datetime(2025, 1, 10, 13, 0), datetime(2025, 1, 13), "daily"),
+            (datetime(2025, 1, 9), datetime(2025, 1, 11, 6, 0), "daily"),
+            (datetime(2024, 6, 1), datetime(2024, 7, 1), "monthly"),
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            reports = ReportService.generate_reports(specs)
+
+        self.assertEqual(len(queries), 4)
+        for spec, report in zip(specs, reports):
+            self.assertEqual(report, ReportService.generate_report(*spec))
+
+    def test_generate_reports_slices_partial_days(self):
+        early, late = ReportService.generate_reports(
+            [
+                (datetime(2025, 1, 10), datetime(2025, 1, 10, 13, 0), "daily"),
+                (datetime(2025, 1, 10, 13, 0), datetime(2025, 1, 12), "daily"),
+            ]
+        )
+
+        self.assertEqual(early[0]["OrdersCount"], 2)
+        self.assertEqual(late[0]["OrdersCount"], 0)
+        self.assertEqual(late[1]["OrdersCount"], 1)
+
+    def test_generate_reports_rejects_invalid_period(self):
+        with self.assertRaises(ValueError):
+            ReportService.generate_reports([(datetime(2025, 1, 1), datetime(2025, 2, 1), "yearly")])
+
+    def test_generate_report_batch_command(self):
+        stdout = StringIO()
+        call_command(
+            "generate_report_batch",
+            "--spec",
+            "2025-01-01:2025-02-01:monthly",
+            "--spec",
+            "2025-01-10:2025-01-12",
+            "--format",
+            "json",
+            stdout=stdout,
+        )
+
+        monthly, daily = json.loads(stdout.getvalue())["reports"]
+        self.assertEqual(monthly["data"][0]["OrdersCount"], 3)
+        self.assertEqual(daily["period"], "daily")
+        self.assertEqual([row["OrdersCount"] for row in daily["data"]], [2, 1])
+
+        with self.assertRaises(CommandError):
+            call_command("generate_report_batch", "--spec", "2025-01-01", stdout=StringIO())
+
+    def test_merge_ranges(self):
+        ranges = ReportService._merge_ranges(
+            [
+                (datetime(2025, 3, 1), datetime(2025, 4, 1)),
+                (datetime(2025, 1, 1), datetime(2025, 2, 1)),
+                (datetime(2025, 1, 15), datetime(2025, 3, 1)),
+                (datetime(2025, 6, 1), datetime(2025, 6, 1)),
+                (datetime(2025, 7, 1), datetime(2025, 8, 1)),
+            ]
+        )
+
+        self.assertEqual(
+            ranges,
+            [(datetime(2025, 1, 1), datetime(2025, 4, 1)), (datetime(2025, 7, 1), datetime(2025, 8, 1))],
+        )
+
+    def test_generate_report_command_writes_csv_and_jsonl(self):
+        with tempfile.TemporaryDirectory() as directory:
+            csv_path = os.path.join(directory, "report.csv")
+            jsonl_path = os.path.join(directory, "report.jsonl")
+            args = ["--start-date", "2025-01-10", "--end-date", "2025-01-13", "--period", "daily"]
+
+            call_command("generate_report", *args, "--format", "csv", "--output", csv_path, stdout=StringIO())
+            call_command("generate_report", *args, "--format", "jsonl", "--output", jsonl_path, stdout=StringIO())
+
+            with open(csv_path, newline="") as stream:
+                csv_rows = list(csv.DictReader(stream))
+            with open(jsonl_path) as stream:
+                jsonl_rows = [json.loads(line) for line in stream]
+
+        self.assertEqual(len(csv_rows), 3)
+        self.assertEqual(csv_rows[0]["Period"], "2025-01-10")
+        self.assertEqual(csv_rows[0]["OrdersTotalAmount"], "370.0")
+        self.assertEqual(jsonl_rows[1]["OrdersCount"], 1)
+        self.assertEqual(jsonl_rows[1]["OrderItem1Amount"], 75.5)
+
+    def test_generate_report_command_writes_parquet(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.parquet")
+            call_command(
+                "generate_report",
+                "--start-date",
+                "2025-01-10",
+                "--end-date",
+                "2025-01-13",
+                "--format",
+                "parquet",
+                "--output",
+                path,
+                stdout=StringIO(),
+            )
+            table = pq.read_table(path)
+
+        self.assertEqual(table.num_rows, 3)
+        self.assertEqual(table.column("OrdersCount").to_pylist(), [2, 1, 0])
+
+    def test_parquet_writer_flushes_in_batches(self):
+        rows = [dict(row, Period=str(day)) for day, row in enumerate([{"OrdersCount": 1}] * 5)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.parquet")
+            written = write_rows(rows, open_report_writer("parquet", path=path, batch_size=2))
+            metadata = pq.ParquetFile(path).metadata
+            table = pq.read_table(path)
+
+        self.assertEqual(written, 5)
+        self.assertEqual(metadata.num_row_groups, 3)
+        self.assertEqual(table.column("Period").to_pylist(), ["0", "1", "2", "3", "4"])
+        self.assertEqual(table.column("OrdersCount").to_pylist(), [1] * 5)
+        self.assertEqual(table.column("NewUsers").to_pylist(), [None] * 5)
+
+    def test_generate_report_command_requires_output_for_parquet(self):
+        with self.assertRaises(CommandError):
+            call_command("generate_report", "--format", "parquet", stdout=StringIO())
+
+    def test_comparison_report_against_previous_period(self):
+        start_date = self.base_date.replace(hour=0) + timedelta(days=1)
+
+        with self.assertNumQueries(4):
+            report = ReportService.generate_comparison_report(
+                start_date, start_date + timedelta(days=1), "daily", "previous"
+            )
+
+        self.assertEqual(len(report), 1)
+        day = report[0]
+        self.assertEqual(day["Period"], "2025-01-11")
+        self.assertEqual(day["PreviousPeriod"], "2025-01-10")
+        self.assertEqual(day["Comparison"]["OrdersCount"], {"Previous": 2, "Delta": -1, "DeltaPercent": -50.0})
+        self.assertEqual(day["Comparison"]["NewUsers"], {"Previous": 1, "Delta": 1, "DeltaPercent": 100.0})
+        self.assertEqual(day["Comparison"]["OrdersTotalAmount"]["Delta"], -294.5)
+
+    def test_comparison_report_splits_non_midnight_boundary(self):
+        Order.objects.create(user=self.user1, created_at=self.base_date - timedelta(hours=4))
+        start_date = self.base_date - timedelta(hours=2)
+        end_date = start_date + timedelta(days=2)
+
+        with self.assertNumQueries(4):
+            report = ReportService.generate_comparison_report(start_date, end_date, "daily", "previous")
+        plain = ReportService.generate_report(start_date, end_date, "daily")
+
+        self.assertEqual([row["Period"] for row in report], ["2025-01-10", "2025-01-11"])
+        self.assertEqual(report[0]["OrdersCount"], 2)
+        self.assertEqual(
+            [{key: row[key] for key in plain[0]} for row in report],
+            plain,
+        )
+
+    def test_comparison_report_year_ago(self):
+        start_date = self.base_date.replace(hour=0)
+
+        report = ReportService.generate_comparison_report(
+            start_date, start_date + timedelta(days=1), "daily", "year_ago"
+        )
+
+        self.assertEqual(report[0]["PreviousPeriod"], "2024-01-10")
+        self.assertEqual(report[0]["Comparison"]["OrdersCount"], {"Previous": 0, "Delta": 2, "DeltaPercent": None})
+
+    def test_comparison_report_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            ReportService.generate_comparison_report(
+                self.base_date, self.base_date + timedelta(days=1), "daily", "last_quarter"
+            )
+
+    def test_cohort_report(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(user=self.user1, created_at=self.base_date + timedelta(days=31))
+
+        report = ReportService.generate_cohort_report(
+            datetime(2025, 1, 1, tzinfo=timezone.utc), datetime(2025, 3, 1, tzinfo=timezone.utc), "monthly"
+        )
+
+        self.assertEqual([cohort["Cohort"] for cohort in report], ["2025-01-01", "2025-02-01"])
+
+        january = report[0]
+        self.assertEqual(january["Users"], 3)
+        self.assertEqual(january["Revenue"], 445.50)
+        self.assertEqual([p["ActiveUsers"] for p in january["Periods"]], [2, 1])
+        self.assertEqual([p["Retention"] for p in january["Periods"]], [0.6667, 0.3333])
+        self.assertEqual(january["Periods"][1]["Offset"], 1)
+
+        february = report[1]
+        self.assertEqual(february["Users"], 0)
+        self.assertEqual(february["Periods"][0]["Retention"], 0.0)
+
+    def test_cohort_report_rejects_daily(self):
+        with self.assertRaises(ValueError):
+            ReportService.generate_cohort_report(self.base_date, self.base_date + timedelta(days=1), "daily")
+
+    def test_exact_distribution_report(self):
+        report = ReportService.generate_distribution_report(
+            self.base_date, self.base_date + timedelta(days=3), "daily", "exact", Decimal("50")
+        )
+
+        day1 = report[0]
+        self.assertEqual(day1["OrdersCount"], 2)
+        self.assertEqual(day1["Mean"], 185.0)
+        self.assertEqual(day1["P50"], 185.0)
+        self.assertAlmostEqual(day1["P90"], 237.0)
+        self.assertEqual(
+            day1["Histogram"],
+            [{"Lower": 100.0, "Upper": 150.0, "Count": 1}, {"Lower": 250.0, "Upper": 300.0, "Count": 1}],
+        )
+        self.assertEqual(report[1]["P99"], 75.5)
+        self.assertIsNone(report[2]["P50"])
+        self.assertEqual(report[2]["Histogram"], [])
+
+    def test_approx_distribution_report_reuses_daily_sketches(self):
+        start_date = self.base_date.replace(hour=0)
+        end_date = start_date + timedelta(days=3)
+
+        daily = ReportService.generate_distribution_report(start_date, end_date, "daily", "approx")
+
+        self.assertEqual(DailySketch.objects.filter(kind=DailySketch.ORDER_VALUE).count(), 3)
+        self.assertEqual(daily[0]["OrdersCount"], 2)
+        self.assertAlmostEqual(daily[0]["P90"], 237.0, delta=237.0 * 0.01)
+        self.assertAlmostEqual(daily[1]["P50"], 75.5, delta=75.5 * 0.01)
+
+        with self.assertNumQueries(1):
+            weekly = ReportService.generate_distribution_report(start_date, end_date, "weekly", "approx")
+
+        self.assertEqual(weekly[0]["OrdersCount"], 3)
+        self.assertAlmostEqual(weekly[0]["P50"], 120.0, delta=120.0 * 0.01)
+
+    def test_backdated_write_invalidates_daily_sketch(self):
+        start_date = self.base_date.replace(hour=0)
+        ReportService.generate_distribution_report(start_date, start_date + timedelta(days=1), "daily", "approx")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderItem1.objects.create(order=self.order2, price=Decimal("10.00"), created_at=self.base_date)
+
+        self.assertFalse(DailySketch.objects.filter(day=self.base_date.date()).exists())
+
+    def test_unique_buyers_report(self):
+        start_date = self.base_date.replace(hour=0)
+        end_date = start_date + timedelta(days=3)
+        Order.objects.create(user=self.user2, created_at=self.base_date + timedelta(days=1, hours=2))
+
+        for mode in ("exact", "approx"):
+            daily = ReportService.generate_unique_buyers_report(start_date, end_date, "daily", mode)
+            weekly = ReportService.generate_unique_buyers_report(start_date, end_date, "weekly", mode)
+
+            self.assertEqual([row["UniqueBuyers"] for row in daily], [1, 1, 0])
+            self.assertEqual(weekly, [{"Period": "2025-01-06", "UniqueBuyers": 2}])
+            self.assertEqual(ReportService.count_unique_buyers(start_date, end_date, mode), 2)
+
+        self.assertEqual(DailySketch.objects.filter(kind=DailySketch.UNIQUE_BUYERS).count(), 3)
+
+    def test_backdated_order_invalidates_buyer_sketch(self):
+        start_date = self.base_date.replace(hour=0)
+        ReportService.generate_unique_buyers_report(start_date, start_date + timedelta(days=1), "daily", "approx")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderItem1.objects.create(order=self.order1, price=Decimal("10.00"), created_at=self.base_date)
+        self.assertTrue(DailySketch.objects.filter(kind=DailySketch.UNIQUE_BUYERS).exists())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(user=self.user3, created_at=self.base_date)
+        self.assertFalse(DailySketch.objects.filter(kind=DailySketch.UNIQUE_BUYERS).exists())
+
+    def test_unique_buyers_report_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            ReportService.generate_unique_buyers_report(self.base_date, self.base_date + timedelta(days=1), mode="fast")
+
+    def test_distribution_report_invalid_mode(self):
+        with self.assertRaises(ValueError):
+            ReportService.generate_distribution_report(self.base_date, self.base_date + timedelta(days=1), mode="fast")
+
+
+class ShardedReportTestCase(TransactionTestCase):
+    def setUp(self):
+        base_date = datetime(2024, 12, 20, 9, 30, tzinfo=timezone.utc)
+        for index in range(12):
+            created_at = base_date + timedelta(days=index * 3, hours=index)
+            user = User.objects.create_user(
+                username=f"shard{index}", email=f"shard{index}@example.com", is_active=bool(index % 2)
+            )
+            user.date_joined = created_at
+            user.save()
+
+            order = Order.objects.create(user=user, created_at=created_at)
+            OrderItem1.objects.create(order=order, price=Decimal("10.25") * (index + 1), created_at=created_at)
+            OrderItem2.objects.create(
+                order=order,
+                placement_price=Decimal("5.10"),
+                article_price=Decimal("1.05") * index,
+                created_at=created_at,
+            )
+
+    def test_sharded_report_matches_serial(self):
+        start_date = datetime(2024, 12, 15, tzinfo=timezone.utc)
+        end_date = datetime(2025, 2, 3, tzinfo=timezone.utc)
+
+        for period in ("daily", "weekly", "monthly"):
+            serial = ReportService.generate_report(start_date, end_date, period, workers=1)
+            sharded = ReportService.generate_report(start_date, end_date, period, workers=4, shard_days=5)
+            self.assertEqual(sharded, serial)
+
+        self.assertEqual(sum(row["OrdersCount"] for row in serial), 12)
+
+    def test_split_ranges(self):
+        start_date = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        shards = ReportService._split_ranges([(start_date, start_date + timedelta(days=10))], shard_days=4)
+
+        self.assertEqual([(end - start).days for start, end in shards], [4, 4, 2])
+        self.assertEqual(shards[0][0], start_date)
+        self.assertEqual(shards[-1][1], start_date + timedelta(days=10))
+        with self.assertRaises(ValueError):
+            ReportService._split_ranges([(start_date, start_date + timedelta(days=1))], shard_days=0)
+
+
+class CoalescedReportTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_duplicates_share_one_computation(self):
+        release = threading.Event()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return [{"Period": "2025-01-01", "OrdersCount": 3}]
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(coalesced, "report", {"period": "monthly"}, compute) for _ in range(8)]
+            time.sleep(0.2)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == results[0] for result in results))
+        self.assertEqual(coalesced("report", {"period": "monthly"}, lambda: "fresh"), "fresh")
+
+    def test_waits_for_leader_in_another_process(self):
+        key = f"coalesce:{get_report_cache_version()}:report:{_params_digest({'period': 'daily'})}"
+        cache.set(f"{key}:lock", "other")
+        threading.Timer(0.1, lambda: cache.set(f"{key}:other", "shared")).start()
+
+        result = coalesced("report", {"period": "daily"}, lambda: self.fail("computed twice"), timeout=5)
+
+        self.assertEqual(result, "shared")
+
+    def test_falls_back_to_computing_after_timeout(self):
+        key = f"coalesce:{get_report_cache_version()}:report:{_params_digest({'period': 'weekly'})}"
+        cache.set(f"{key}:lock", "stuck")
+
+        started = time.monotonic()
+        result = coalesced("report", {"period": "weekly"}, lambda: "local", timeout=0.2)
+
+        self.assertEqual(result, "local")
+        self.assertLess(time.monotonic() - started, 2)
+
+    def test_leader_error_is_shared_with_waiters(self):
+        release = threading.Event()
+
+        def compute():
+            release.wait(5)
+            raise ValueError("boom")
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(coalesced, "report", {"period": "error"}, compute) for _ in range(3)]
+            time.sleep(0.2)
+            release.set()
+            for future in futures:
+                with self.assertRaises(ValueError):
+                    future.result()
+
+
+class SharedCacheCheckTestCase(TestCase):
+    @override_settings(DEBUG=False)
+    def test_warns_about_process_local_cache_in_production(self):
+        self.assertEqual([message.id for message in check_shared_report_cache(None)], ["orders.W001"])
+
+    @override_settings(
+        DEBUG=False,
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://x"}},
+    )
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_report_cache(None), [])
+
+    @override_settings(DEBUG=True)
+    def test_local_cache_is_fine_in_development(self):
+        self.assertEqual(check_shared_report_cache(None), [])
+
+
+@override_settings(REPORT_LIVE_RESYNC_SECONDS=3600)
+class LiveReportTestCase(TestCase):
+    def setUp(self):
+        live_report.reset()
+        self.now = timezone.now()
+        self.user = User.objects.create_user(username="live", email="live@example.com", is_active=True)
+        order = Order.objects.create(user=self.user, created_at=self.now)
+        OrderItem1.objects.create(order=order, price=Decimal("20.00"), created_at=self.now)
+
+    def tearDown(self):
+        live_report.reset()
+
+    def test_snapshot_counts_today(self):
+        version, row = live_report.snapshot()
+
+        self.assertEqual(row["Period"], str(timezone.localdate()))
+        self.assertEqual(row["NewUsers"], 1)
+        self.assertEqual(row["OrdersCount"], 1)
+        self.assertEqual(row["OrderItem1Amount"], 20.0)
+
+    def test_deltas_already_in_the_snapshot_are_skipped(self):
+        version, _ = live_report.snapshot()
+        xmin, xmax, in_progress = live_report._snapshot
+
+        with self.assertNumQueries(0):
+            live_report.apply(timezone.localdate(), {"orders_count": 1}, xid=xmin - 1)
+            self.assertEqual(live_report.wait(version, timeout=0), (version, None))
+
+            live_report.apply(timezone.localdate(), {"orders_count": 1, "orderitem1_amount": "7.50"}, xid=xmax)
+            new_version, row = live_report.wait(version, timeout=0)
+
+        self.assertGreater(new_version, version)
+        self.assertEqual(row["OrdersCount"], 2)
+        self.assertEqual(row["OrderItem1Amount"], 27.5)
+
+    def test_deltas_received_during_resync_are_replayed(self):
+        live_report.snapshot()
+        read_today = live_report._read_today
+
+        def read_with_concurrent_commits(day):
+            snapshot, stats = read_today(day)
+            live_report.apply(day, {"orders_count": 1}, xid=snapshot[0] - 1)
+            live_report.apply(day, {"orders_count": 10}, xid=snapshot[1])
+            return snapshot, stats
+
+        live_report._synced_at = 0.0
+        with patch.object(live_report, "_read_today", read_with_concurrent_commits):
+            live_report.resync()
+
+        self.assertEqual(live_report.snapshot()[1]["OrdersCount"], 11)
+
+    def test_writes_publish_deltas_with_their_transaction_id(self):
+        with CaptureQueriesContext(connection) as queries:
+            Order.objects.create(user=self.user, created_at=self.now)
+
+        notify = [query["sql"] for query in queries.captured_queries if "pg_notify" in query["sql"]]
+        self.assertEqual(len(notify), 1)
+        self.assertIn("pg_current_xact_id()", notify[0])
+        self.assertIn('"orders_count": 1', notify[0])
+
+    def test_wait_times_out_without_changes(self):
+        version, _ = live_report.snapshot()
+
+        self.assertEqual(live_report.wait(version, timeout=0.01), (version, None))
+
+    def test_stream_emits_snapshot_then_updates(self):
+        stream = stream_live_report(heartbeat=0.01)
+
+        self.assertEqual(next(stream), "retry: 10\n")
+        first = next(stream)
+        self.assertIn("event: report", first)
+        self.assertEqual(json.loads(first.split("data: ")[1])["OrdersCount"], 1)
+        self.assertEqual(next(stream), ": keepalive\n\n")
+
+        live_report.apply(timezone.localdate(), {"orders_count": 1})
+        self.assertEqual(json.loads(next(stream).split("data: ")[1])["OrdersCount"], 2)
+
+    def test_live_endpoint_streams_events(self):
+        response = self.client.get(reverse("report-live"))
+
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        chunks = iter(response.streaming_content)
+        next(chunks)
+        self.assertIn(b"event: report", next(chunks))
+
+
+@override_settings(REPORT_LIVE_RESYNC_SECONDS=3600)
+class LiveReportChannelTestCase(TransactionTestCase):
+    def setUp(self):
+        self.report = LiveReport()
+        self.now = timezone.now()
+        self.user = User.objects.create_user(username="channel", email="channel@example.com")
+
+    def tearDown(self):
+        self.report.reset()
+
+    def wait_for(self, version, predicate):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            version, row = self.report.wait(version, timeout=0.1)
+            if row is not None and predicate(row):
+                return row
+        self.fail("The live report did not receive the change")
+
+    def test_committed_writes_reach_listeners(self):
+        version, row = self.report.snapshot()
+        self.assertEqual(row["OrdersCount"], 0)
+
+        with transaction.atomic():
+            order = Order.objects.create(user=self.user, created_at=self.now)
+            OrderItem2.objects.create(
+                order=order, placement_price=Decimal("5.00"), article_price=Decimal("2.50"), created_at=self.now
+            )
+            Order.objects.create(user=self.user, created_at=self.now - timedelta(days=3))
+
+        row = self.wait_for(version, lambda row: row["OrderItem2Amount"] == 7.5)
+        self.assertEqual(row["OrdersCount"], 1)
+        self.assertEqual(row["OrdersTotalAmount"], 7.5)
+
+        version = self.report.version
+        order.delete()
+        self.wait_for(version, lambda row: row["OrdersCount"] == 0)
+
+    def test_resync_between_write_and_notify_does_not_double_count(self):
+        version, _ = self.report.snapshot()
+        publish = signals.publish_live_deltas
+
+        def resync_then_publish(changes, using="default"):
+            def resync():
+                try:
+                    self.report._synced_at = 0.0
+                    self.report.resync()
+                finally:
+                    connections.close_all()
+
+            thread = threading.Thread(target=resync)
+            thread.start()
+            thread.join()
+            publish(changes, using=using)
+
+        with patch("orders.signals.publish_live_deltas", resync_then_publish):
+            Order.objects.create(user=self.user, created_at=self.now)
+        User.objects.create_user(username="fence", email="fence@example.com")
+
+        row = self.wait_for(version, lambda row: row["NewUsers"] == 2)
+        self.assertEqual(row["OrdersCount"], 1)
+
+    def test_resync_releases_the_viewer_connection(self):
+        released = []
+
+        def viewer():
+            try:
+                self.report.snapshot()
+                released.append(connections["default"].connection is None)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=viewer)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(released, [True])
+
+    def test_rolled_back_writes_are_not_published(self):
+        version, _ = self.report.snapshot()
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Order.objects.create(user=self.user, created_at=self.now)
+                raise RuntimeError
+
+        Order.objects.create(user=self.user, created_at=self.now)
+        row = self.wait_for(version, lambda row: row["OrdersCount"] != 0)
+        self.assertEqual(row["OrdersCount"], 1)
+
+    def test_resync_does_not_double_count_committed_deltas(self):
+        self.report.snapshot()
+        Order.objects.create(user=self.user, created_at=self.now)
+        self.report._synced_at = 0.0
+        version, row = self.report.snapshot()
+        self.assertEqual(row["OrdersCount"], 1)
+
+        Order.objects.create(user=self.user, created_at=self.now)
+        row = self.wait_for(version, lambda row: row["OrdersCount"] != 1)
+        self.assertEqual(row["OrdersCount"], 2)
+
+
+class LoadTestCommandTestCase(LiveServerTestCase):
+    def setUp(self):
+        created_at = timezone.now() - timedelta(days=1)
+        for index in range(3):
+            user = User.objects.create_user(username=f"load{index}", email=f"load{index}@example.com")
+            order = Order.objects.create(user=user, created_at=created_at)
+            OrderItem1.objects.create(order=order, price=Decimal("12.50"), created_at=created_at)
+
+    def test_reports_latency_and_queries_per_endpoint(self):
+        stdout = StringIO()
+        call_command(
+            "load_test",
+            "--base-url",
+            self.live_server_url,
+            "--concurrency",
+            "3",
+            "--requests",
+            "30",
+            "--mix",
+            "daily=1,statistics=1,orders_list=1,orders_create=1",
+            stdout=stdout,
+        )
+
+        report = json.loads(stdout.getvalue())
+        endpoints = report["endpoints"]
+        self.assertEqual(sum(endpoint["requests"] for endpoint in endpoints.values()), 30)
+        self.assertEqual(set(endpoints), {"daily", "statistics", "orders_list", "orders_create"})
+        for endpoint in endpoints.values():
+            self.assertEqual(endpoint["errors"], 0)
+            self.assertLessEqual(endpoint["latency_ms"]["p50"], endpoint["latency_ms"]["p99"])
+        self.assertEqual(endpoints["daily"]["queries"]["max"], 4)
+        self.assertEqual(Order.objects.count(), 3 + endpoints["orders_create"]["requests"])
+
+    def test_request_plan_is_reproducible(self):
+        def run():
+            stdout = StringIO()
+            call_command(
+                "load_test", "--base-url", self.live_server_url, "--requests", "12", "--seed", "7", stdout=stdout
+            )
+            return {name: data["requests"] for name, data in json.loads(stdout.getvalue())["endpoints"].items()}
+
+        self.assertEqual(run(), run())
+
+    def test_ranges_are_derived_from_the_anchor_date(self):
+        anchor = date(2025, 1, 20)
+        mix = parse_mix("daily=1,monthly=1,leaderboard=1,orders_create=1")
+        plan = build_plan(mix, ["user"], anchor, seed=3, requests=40)
+
+        self.assertEqual(plan, build_plan(mix, ["user"], anchor, seed=3, requests=40))
+        for _, (_, _, params, body) in plan:
+            if body is not None:
+                self.assertEqual(datetime.fromisoformat(body["created_at"]).date(), anchor)
+            if "end_date" in params:
+                end_date = date.fromisoformat(params["end_date"])
+                self.assertTrue(anchor - timedelta(days=30) <= end_date <= anchor)
+
+        stdout = StringIO()
+        call_command(
+            "load_test",
+            "--base-url",
+            self.live_server_url,
+            "--requests",
+            "4",
+            "--mix",
+            "daily=1",
+            "--anchor-date",
+            "2025-01-20",
+            stdout=stdout,
+        )
+        self.assertEqual(json.loads(stdout.getvalue())["config"]["anchor_date"], "2025-01-20")
+
+    def test_rejects_unknown_endpoint(self):
+        with self.assertRaises(CommandError):
+            call_command("load_test", "--mix", "everything=1", stdout=StringIO())
+
+    def test_rejects_invalid_anchor_date(self):
+        with self.assertRaises(CommandError):
+            call_command("load_test", "--anchor-date", "20-01-2025", stdout=StringIO())
+
+
+class ArchiveOrdersTestCase(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.now = timezone.now()
+            self.cutoff = self.now - timedelta(days=30)
+            self.user = User.objects.create_user(username="archive", email="archive@example.com")
+
+            self.old_orders = []
+            for index in range(5):
+                created_at = self.now - timedelta(days=60 + index)
+                order = Order.objects.create(user=self.user, created_at=created_at)
+                OrderItem1.objects.create(order=order, price=Decimal("10.00"), created_at=created_at)
+                OrderItem2.objects.create(
+                    order=order, placement_price=Decimal("3.00"), article_price=Decimal("1.50"), created_at=created_at
+                )
+                self.old_orders.append(order)
+
+            straddling = self.old_orders[0]
+            OrderItem1.objects.create(order=straddling, price=Decimal("7.00"), created_at=self.now - timedelta(days=1))
+
+            self.recent = Order.objects.create(user=self.user, created_at=self.now - timedelta(days=2))
+            OrderItem1.objects.create(order=self.recent, price=Decimal("99.00"), created_at=self.recent.created_at)
+        ReportService.generate_distribution_report(self.now - timedelta(days=70), self.now, "daily", "approx")
+
+    def _rollup_snapshot(self):
+        return sorted(
+            UserDailyStats.objects.values_list(
+                "user_id", "day", "orders_count", "orderitem1_count", "orderitem1_amount", "orderitem2_count"
+            )
+        )
+
+    def test_archives_in_batches_and_keeps_rollups_consistent(self):
+        version = get_report_cache_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            totals = archive_orders(self.cutoff, batch_size=2)
+
+        self.assertEqual(totals, {"orders": 5, "items1": 6, "items2": 5, "batches": 3})
+        self.assertEqual(list(Order.objects.all()), [self.recent])
+        self.assertEqual(OrderItem1.objects.count(), 1)
+        self.assertEqual(
+            set(ArchivedOrder.objects.values_list("id", flat=True)), {order.pk for order in self.old_orders}
+        )
+        self.assertEqual(ArchivedOrderItem1.objects.count(), 6)
+        self.assertEqual(ArchivedOrderItem2.objects.count(), 5)
+
+        archived = self._rollup_snapshot()
+        rebuild_user_daily_stats()
+        self.assertEqual(archived, self._rollup_snapshot())
+
+        archived_days = [timezone.localdate(order.created_at) for order in self.old_orders]
+        self.assertFalse(DailySketch.objects.filter(day__in=archived_days).exists())
+        self.assertTrue(DailySketch.objects.filter(day=timezone.localdate(self.recent.created_at)).exists())
+        self.assertNotEqual(get_report_cache_version(), version)
+
+    def test_purge_skips_archive_tables(self):
+        archive_orders(self.cutoff, batch_size=10, copy=False)
+
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertFalse(ArchivedOrder.objects.exists())
+        self.assertFalse(ArchivedOrderItem1.objects.exists())
+
+    def test_max_runtime_stops_after_one_batch(self):
+        totals = archive_orders(self.cutoff, batch_size=2, max_runtime=0)
+
+        self.assertEqual(totals["batches"], 1)
+        self.assertEqual(Order.objects.count(), 4)
+
+    def test_command_dry_run(self):
+        stdout = StringIO()
+        call_command("archive_orders", "--older-than-days", "30", "--dry-run", stdout=stdout)
+
+        self.assertIn("Would archive 5 orders, 6 OrderItem1 and 5 OrderItem2", stdout.getvalue())
+        self.assertEqual(Order.objects.count(), 6)
+
+        call_command("archive_orders", "--older-than-days", "30", "--sleep", "0", stdout=StringIO())
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class SnapshotExportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="snapshot", email="snapshot@example.com", password="secret")
+        self.user.date_joined = datetime(2024, 12, 20, tzinfo=timezone.utc)
+        self.user.save()
+
+        for created_at in (
+            datetime(2025, 1, 5, 10, tzinfo=timezone.utc),
+            datetime(2025, 1, 20, 10, tzinfo=timezone.utc),
+            datetime(2025, 2, 3, 10, tzinfo=timezone.utc),
+        ):
+            order = Order.objects.create(user=self.user, created_at=created_at)
+            OrderItem1.objects.create(order=order, price=Decimal("12.34"), created_at=created_at)
+        self.current = Order.objects.create(user=self.user, created_at=timezone.now())
+
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def test_writes_typed_month_partitions(self):
+        summary = export_snapshot(self.directory)
+
+        self.assertEqual(summary["orders"]["rows"], 4)
+        self.assertEqual(summary["orders"]["partitions"], 3)
+        self.assertEqual(summary["order_items1"]["rows"], 3)
+        self.assertEqual(summary["users"]["rows"], 1)
+
+        table = pq.read_table(os.path.join(self.directory, "order_items1", "month=2025-01", "part-0.parquet"))
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(table.schema.field("price").type, pa.decimal128(10, 2))
+        self.assertEqual(table.schema.field("created_at").type, pa.timestamp("us", tz="UTC"))
+        self.assertEqual(table.column("price").to_pylist(), [Decimal("12.34"), Decimal("12.34")])
+
+        users = pq.read_table(os.path.join(self.directory, "users", "month=2024-12", "part-0.parquet"))
+        self.assertNotIn("password", users.schema.names)
+        self.assertEqual(users.column("id").to_pylist(), [str(self.user.pk)])
+
+    def test_incremental_writes_only_new_and_open_partitions(self):
+        export_snapshot(self.directory, tables=["orders"], granularity="day")
+        Order.objects.create(user=self.user, created_at=datetime(2025, 1, 5, 18, tzinfo=timezone.utc))
+        Order.objects.create(user=self.user, created_at=datetime(2025, 3, 1, 9, tzinfo=timezone.utc))
+
+        written = []
+        summary = export_snapshot(
+            self.directory,
+            tables=["orders"],
+            granularity="day",
+            incremental=True,
+            on_partition=lambda table, partition, rows: written.append(partition),
+        )
+
+        self.assertEqual(summary["orders"]["skipped"], 3)
+        self.assertEqual(written, [datetime(2025, 3, 1).date(), timezone.localdate()])
+
+    def test_command_writes_arrow_ipc(self):
+        stdout = StringIO()
+        call_command(
+            "export_snapshot", "--output", self.directory, "--tables", "orders", "--format", "arrow", stdout=stdout
+        )
+
+        with pa.ipc.open_file(os.path.join(self.directory, "orders", "month=2025-02", "part-0.arrow")) as reader:
+            table = reader.read_all()
+        self.assertEqual(table.num_rows, 1)
+        self.assertEqual(table.column("user_id").to_pylist(), [str(self.user.pk)])
+        self.assertIn("orders: 4 rows in 3 partitions", stdout.getvalue())
+
+
+class CalendarReportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="calendar", email="calendar@example.com", password="secret")
+        self.user.date_joined = datetime(2025, 1, 10, tzinfo=timezone.utc)
+        self.user.save()
+
+        for created_at, price in (
+            (datetime(2025, 1, 15, 10, tzinfo=timezone.utc), Decimal("10.00")),
+            (datetime(2025, 3, 31, 10, tzinfo=timezone.utc), Decimal("20.00")),
+            (datetime(2025, 4, 2, 10, tzinfo=timezone.utc), Decimal("30.00")),
+        ):
+            order = Order.objects.create(user=self.user, created_at=created_at)
+            OrderItem1.objects.create(order=order, price=price, created_at=created_at)
+
+        build_calendar(date(2024, 12, 1), date(2027, 2, 1))
+        self.start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        self.end = datetime(2025, 7, 1, tzinfo=timezone.utc)
+
+    def test_fiscal_445_periods(self):
+        self.assertEqual(fiscal_position(date(2025, 1, 1)), (2025, date(2024, 12, 30), 0))
+        self.assertEqual(fiscal_position(date(2025, 2, 23)), (2025, date(2025, 1, 27), 1))
+        self.assertEqual(fiscal_position(date(2025, 3, 30)), (2025, date(2025, 2, 24), 2))
+        self.assertEqual(fiscal_position(date(2025, 12, 28))[0], 2025)
+        self.assertEqual(fiscal_position(date(2025, 12, 29))[0], 2026)
+        self.assertEqual(fiscal_position(date(2027, 1, 3)), (2026, date(2026, 11, 23), 11))
+
+        labels = CalendarPeriod.objects.filter(scheme="fiscal_445", day__in=[date(2025, 3, 30), date(2025, 3, 31)])
+        self.assertEqual(list(labels.values_list("label", flat=True)), ["FY2025-P03", "FY2025-P04"])
+
+    def test_quarterly_report_matches_monthly_totals(self):
+        quarterly = ReportService.generate_calendar_report(self.start, self.end, "quarterly")
+        monthly = ReportService.generate_report(self.start, self.end, "monthly")
+
+        self.assertEqual([row["Label"] for row in quarterly], ["2025-Q1", "2025-Q2"])
+        self.assertEqual([row["Period"] for row in quarterly], ["2025-01-01", "2025-04-01"])
+        for metric in ("NewUsers", "OrdersCount", "OrderItem1Count", "OrdersTotalAmount"):
+            self.assertEqual(sum(row[metric] for row in quarterly), sum(row[metric] for row in monthly), metric)
+        self.assertEqual(quarterly[0]["OrdersTotalAmount"], 30.0)
+        self.assertEqual(quarterly[1]["OrdersTotalAmount"], 30.0)
+
+    def test_gap_fills_periods_without_data(self):
+        report = ReportService.generate_calendar_report(self.start, self.end, "fiscal_445")
+
+        self.assertEqual(len(report), 7)
+        self.assertEqual(report[0]["Label"], "FY2025-P01")
+        self.assertEqual(report[0]["Period"], "2024-12-30")
+        self.assertEqual(report[1]["OrdersCount"], 0)
+        self.assertEqual(report[1]["OrdersTotalAmount"], 0.0)
+        self.assertEqual(sum(row["OrdersCount"] for row in report), 3)
+
+    def test_custom_scheme_is_data(self):
+        CalendarPeriod.objects.bulk_create(
+            CalendarPeriod(
+                scheme="halves",
+                day=self.start.date() + timedelta(days=offset),
+                period=date(2025, 1, 1),
+                label="2025-H1",
+            )
+            for offset in range((self.end - self.start).days)
+        )
+
+        report = ReportService.generate_calendar_report(self.start, self.end, "halves")
+
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]["OrdersCount"], 3)
+
+    def test_missing_calendar_days_raise(self):
+        CalendarPeriod.objects.filter(scheme="monthly", day=date(2025, 2, 14)).delete()
+
+        with self.assertRaisesMessage(ValueError, "build_calendar"):
+            ReportService.generate_calendar_report(self.start, self.end, "monthly")
+        with self.assertRaisesMessage(ValueError, "build_calendar"):
+            ReportService.generate_calendar_report(self.start, self.end, "unknown")
+
+    def test_report_runs_one_query_per_source(self):
+        with CaptureQueriesContext(connection) as queries:
+            ReportService.generate_calendar_report(self.start, self.end, "weekly")
+        self.assertEqual(len(queries), 4)
+
+    def test_build_calendar_command_is_idempotent(self):
+        stdout = StringIO()
+        call_command(
+            "build_calendar", "--start", "2025-01-01", "--end", "2025-01-08", "--schemes", "weekly", stdout=stdout
+        )
+
+        self.assertIn("Wrote 7 calendar rows", stdout.getvalue())
+        self.assertEqual(CalendarPeriod.objects.filter(scheme="weekly", day__lt=date(2025, 1, 8)).count(), 38)
+        with self.assertRaises(CommandError):
+            call_command("build_calendar", "--start", "2025-01-08", "--end", "2025-01-01")
+
+
+class ApproxReportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username="sampled", email="sampled@example.com", password="secret")
+        cls.start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        cls.end = datetime(2025, 4, 1, tzinfo=timezone.utc)
+        orders = Order.objects.bulk_create(
+            Order(user=user, created_at=cls.start + timedelta(minutes=43 * index)) for index in range(3000)
+        )
+        OrderItem1.objects.bulk_create(
+            OrderItem1(order=order, price=Decimal(index % 50 + 1), created_at=order.created_at)
+            for index, order in enumerate(orders)
+        )
+        OrderItem2.objects.bulk_create(
+            OrderItem2(
+                order=order,
+                placement_price=Decimal(index % 20),
+                article_price=Decimal("5.00"),
+                created_at=order.created_at,
+            )
+            for index, order in enumerate(orders[::2])
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE orders_order, orders_orderitem1, orders_orderitem2")
+
+    def test_estimates_cover_exact_values(self):
+        exact = ReportService.generate_report(self.start, self.end, "monthly")
+        approx = ReportService.generate_approx_report(
+            self.start, self.end, "monthly", sample_rows=600, method="bernoulli", seed=1
+        )
+
+        self.assertEqual([row["Period"] for row in approx], [row["Period"] for row in exact])
+        for exact_row, approx_row in zip(exact, approx):
+            self.assertEqual(approx_row["NewUsers"], exact_row["NewUsers"])
+            self.assertEqual(approx_row["SamplePercent"]["Orders"], 20.0)
+            interval = approx_row["ConfidenceInterval"]
+            for metric in ("OrdersCount", "OrderItem1Amount", "OrderItem2Count", "OrdersTotalAmount"):
+                self.assertLess(interval["Lower"][metric], exact_row[metric], metric)
+                self.assertGreater(interval["Upper"][metric], exact_row[metric], metric)
+                self.assertLess(interval["Upper"][metric] - interval["Lower"][metric], exact_row[metric], metric)
+
+    def test_system_sampling_runs_one_query_per_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            approx = ReportService.generate_approx_report(self.start, self.end, "monthly", sample_rows=1000, seed=1)
+
+        self.assertEqual(len(queries), 4)
+        self.assertIn("TABLESAMPLE SYSTEM", queries[1]["sql"])
+        self.assertEqual(len(approx), 3)
+
+    def test_small_tables_are_read_in_full(self):
+        exact = ReportService.generate_report(self.start, self.end, "monthly")
+        approx = ReportService.generate_approx_report(self.start, self.end, "monthly", sample_rows=10000)
+
+        for exact_row, approx_row in zip(exact, approx):
+            self.assertEqual(approx_row["SamplePercent"]["OrderItem1"], 100.0)
+            self.assertEqual(approx_row["OrdersTotalAmount"], exact_row["OrdersTotalAmount"])
+            self.assertEqual(approx_row["ConfidenceInterval"]["Lower"]["OrdersCount"], exact_row["OrdersCount"])
+            self.assertEqual(approx_row["ConfidenceInterval"]["Upper"]["OrdersCount"], exact_row["OrdersCount"])
+
+    def test_invalid_sample_method(self):
+        with self.assertRaises(ValueError):
+            ReportService.generate_approx_report(self.start, self.end, "monthly", method="random")
+
+    def test_empty_cells_get_a_rule_of_three_interval(self):
+        approx = ReportService.generate_approx_report(
+            self.start,
+            datetime(2025, 5, 1, tzinfo=timezone.utc),
+            "monthly",
+            sample_rows=600,
+            method="bernoulli",
+            seed=1,
+        )
+
+        april = approx[-1]
+        self.assertEqual(april["Period"], "2025-04-01")
+        self.assertEqual(april["OrdersCount"], 0)
+        self.assertEqual(april["ConfidenceInterval"]["Lower"]["OrdersCount"], 0)
+        self.assertEqual(april["ConfidenceInterval"]["Upper"]["OrdersCount"], 15)
+        self.assertGreater(april["ConfidenceInterval"]["Upper"]["OrderItem1Amount"], 0)
+        self.assertGreater(april["ConfidenceInterval"]["Upper"]["OrdersTotalAmount"], 0)
+
+    def test_sampling_requires_a_single_from_clause(self):
+        metrics = {"orders_count": lambda: Subquery(Order.objects.filter(pk=OuterRef("pk")).values("pk")[:1])}
+
+        with self.assertRaises(ValueError):
+            ReportService._sampled_statistics(
+                Order, metrics, [(self.start, self.end)], TruncMonth, sample_rows=100, method="SYSTEM"
+            )
+
+
+class QuantileSketchTestCase(TestCase):
+    def test_quantiles_within_relative_accuracy(self):
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        sketch.update(range(1, 1001))
+
+        for q, expected in [(0.5, 500), (0.9, 900), (0.99, 990)]:
+            self.assertAlmostEqual(sketch.quantile(q), expected, delta=expected * 0.01 + 1)
+
+    def test_merge_matches_single_sketch(self):
+        combined = QuantileSketch()
+        combined.update(range(1, 501))
+        first, second = QuantileSketch(), QuantileSketch()
+        first.update(range(1, 251))
+        second.update(range(251, 501))
+
+        first.merge(QuantileSketch.from_dict(second.to_dict()))
+
+        self.assertEqual(first.to_dict(), combined.to_dict())
+
+
+class HyperLogLogTestCase(TestCase):
+    def test_estimate_within_documented_error(self):
+        sketch = HyperLogLog(precision=12)
+        sketch.update(range(50000))
+        sketch.update(range(25000))
+
+        standard_error = 1.04 / math.sqrt(4096)
+        self.assertAlmostEqual(sketch.count(), 50000, delta=50000 * 3 * standard_error)
+
+    def test_small_cardinalities_are_near_exact(self):
+        sketch = HyperLogLog()
+        sketch.update([1, 2, 3, 3, 3])
+
+        self.assertEqual(sketch.count(), 3)
+        self.assertEqual(HyperLogLog().count(), 0)
+
+    def test_merge_matches_union(self):
+        union = HyperLogLog()
+        union.update(range(0, 30000))
+        first, second = HyperLogLog(), HyperLogLog()
+        first.update(range(0, 20000))
+        second.update(range(10000, 30000))
+
+        first.merge(HyperLogLog.from_dict(second.to_dict()))
+
+        self.assertEqual(first.registers, union.registers)
+        self.assertEqual(first.count(), union.count())
+
+    def test_merge_rejects_different_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(precision=10).merge(HyperLogLog(precision=12))
+
+
+class UserDailyStatsTestCase(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.base_date = datetime(2025, 1, 10, 12, 0, 0, tzinfo=timezone.utc)
+            self.user = User.objects.create_user(
+                username="user1", email="user1@example.com", password="testpass123", is_active=True
+            )
+            self.order = Order.objects.create(user=self.user, created_at=self.base_date)
+            self.item1 = OrderItem1.objects.create(order=self.order, price=Decimal("100.00"), created_at=self.base_date)
+            self.item2 = OrderItem2.objects.create(
+                order=self.order,
+                placement_price=Decimal("50.00"),
+                article_price=Decimal("30.00"),
+                created_at=self.base_date + timedelta(days=1),
+            )
+
+    def test_rollup_maintained_on_create(self):
+        day1 = UserDailyStats.objects.get(user=self.user, day=self.base_date.date())
+        self.assertEqual(day1.orders_count, 1)
+        self.assertEqual(day1.orderitem1_count, 1)
+        self.assertEqual(day1.orderitem1_amount, Decimal("100.00"))
+
+        day2 = UserDailyStats.objects.get(user=self.user, day=self.base_date.date() + timedelta(days=1))
+        self.assertEqual(day2.orderitem2_count, 1)
+        self.assertEqual(day2.orderitem2_amount, Decimal("80.00"))
+
+    def test_rollup_maintained_on_update(self):
+        self.item1.price = Decimal("40.00")
+        self.item1.created_at = self.base_date + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item1.save()
+
+        day1 = UserDailyStats.objects.get(user=self.user, day=self.base_date.date())
+        day2 = UserDailyStats.objects.get(user=self.user, day=self.base_date.date() + timedelta(days=1))
+        self.assertEqual(day1.orderitem1_count, 0)
+        self.assertEqual(day1.orderitem1_amount, Decimal("0.00"))
+        self.assertEqual(day2.orderitem1_count, 1)
+        self.assertEqual(day2.orderitem1_amount, Decimal("40.00"))
+
+    def test_rollup_moves_items_when_order_changes_user(self):
+        other = User.objects.create_user(username="user2", email="user2@example.com", password="testpass123")
+
+        self.order.user = other
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.save()
+
+        totals = {
+            (stats.user_id, stats.day): (
+                stats.orders_count,
+                stats.orderitem1_count,
+                stats.orderitem1_amount,
+                stats.orderitem2_count,
+                stats.orderitem2_amount,
+            )
+            for stats in UserDailyStats.objects.all()
+        }
+        day1, day2 = self.base_date.date(), self.base_date.date() + timedelta(days=1)
+        self.assertEqual(totals[(other.pk, day1)], (1, 1, Decimal("100.00"), 0, Decimal("0.00")))
+        self.assertEqual(totals[(other.pk, day2)], (0, 0, Decimal("0.00"), 1, Decimal("80.00")))
+        self.assertEqual(totals[(self.user.pk, day1)], (0, 0, Decimal("0.00"), 0, Decimal("0.00")))
+        self.assertEqual(totals[(self.user.pk, day2)], (0, 0, Decimal("0.00"), 0, Decimal("0.00")))
+
+        rebuild_user_daily_stats()
+        for stats in UserDailyStats.objects.all():
+            self.assertEqual(totals[(stats.user_id, stats.day)][0], stats.orders_count)
+            self.assertEqual(totals[(stats.user_id, stats.day)][2], stats.orderitem1_amount)
+            self.assertEqual(totals[(stats.user_id, stats.day)][4], stats.orderitem2_amount)
+
+    def test_rollup_maintained_on_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.order.delete()
+
+        for stats in UserDailyStats.objects.filter(user=self.user):
+            self.assertEqual(stats.orders_count, 0)
+            self.assertEqual(stats.orderitem1_count, 0)
+            self.assertEqual(stats.orderitem2_count, 0)
+            self.assertEqual(stats.orderitem1_amount + stats.orderitem2_amount, Decimal("0.00"))
+
+    def test_cascade_delete_reads_order_state_once(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(5):
+                OrderItem1.objects.create(order=self.order, price=Decimal("1.00"), created_at=self.base_date)
+        order = Order.objects.get(pk=self.order.pk)
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+
+        order_reads = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT") and 'FROM "orders_order"' in query["sql"]
+        ]
+        self.assertEqual(order_reads, [])
+        self.assertEqual(UserDailyStats.objects.get(user=self.user, day=self.base_date.date()).orderitem1_count, 0)
+
+    def test_item_deletes_resolve_their_orders_in_one_query(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            other = Order.objects.create(user=self.user, created_at=self.base_date)
+            OrderItem1.objects.create(order=other, price=Decimal("5.00"), created_at=self.base_date)
+
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            OrderItem1.objects.all().delete()
+
+        order_reads = [query["sql"] for query in queries if 'FROM "orders_order"' in query["sql"]]
+        self.assertEqual(len(order_reads), 1)
+        stats = UserDailyStats.objects.get(user=self.user, day=self.base_date.date())
+        self.assertEqual((stats.orderitem1_count, stats.orderitem1_amount), (0, Decimal("0.00")))
+
+    def test_contributions_are_applied_once_per_transaction(self):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                for price in ("1.00", "2.00", "3.00"):
+                    OrderItem1.objects.create(order=self.order, price=Decimal(price), created_at=self.base_date)
+                self.assertFalse(any("orders_userdailystats" in query["sql"] for query in queries))
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(len([query for query in queries if "orders_userdailystats" in query["sql"]]), 1)
+        stats = UserDailyStats.objects.get(user=self.user, day=self.base_date.date())
+        self.assertEqual((stats.orderitem1_count, stats.orderitem1_amount), (4, Decimal("106.00")))
+
+    def test_rolled_back_savepoint_drops_its_contributions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                OrderItem1.objects.create(order=self.order, price=Decimal("1.00"), created_at=self.base_date)
+                try:
+                    with transaction.atomic():
+                        OrderItem1.objects.create(order=self.order, price=Decimal("50.00"), created_at=self.base_date)
+                        raise ValueError
+                except ValueError:
+                    pass
+                OrderItem1.objects.create(order=self.order, price=Decimal("2.00"), created_at=self.base_date)
+
+        stats = UserDailyStats.objects.get(user=self.user, day=self.base_date.date())
+        self.assertEqual((stats.orderitem1_count, stats.orderitem1_amount), (3, Decimal("103.00")))
+
+    def test_rebuild_matches_maintained_rollup(self):
+        maintained = list(UserDailyStats.objects.values_list("day", "orders_count", "orderitem1_amount"))
+
+        rebuild_user_daily_stats()
+
+        self.assertEqual(
+            list(UserDailyStats.objects.values_list("day", "orders_count", "orderitem1_amount")), maintained
+        )
+
+    def test_user_report(self):
+        report = ReportService.generate_user_report(
+            self.user.pk, self.base_date - timedelta(days=1), self.base_date + timedelta(days=2), "daily"
+        )
+
+        self.assertEqual(len(report), 3)
+        self.assertEqual(report[1]["OrdersCount"], 1)
+        self.assertEqual(report[1]["OrderItem1Amount"], 100.00)
+        self.assertEqual(report[2]["OrderItem2Amount"], 80.00)
+        self.assertEqual(report[2]["OrdersTotalAmount"], 80.00)
+
+
+class EstimatedCountTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="user1", email="user1@example.com", password="testpass123")
+        now = timezone.now()
+        for _ in range(3):
+            Order.objects.create(user=self.user, created_at=now)
+
+    def test_small_results_use_exact_count(self):
+        self.assertEqual(estimate_count(Order.objects.all(), threshold=10000), 3)
+        self.assertEqual(estimate_count(Order.objects.filter(user=self.user), threshold=10000), 3)
+
+    def test_large_filtered_results_use_planner_estimate(self):
+        queryset = Order.objects.filter(user=self.user)
+
+        with self.assertNumQueries(1):
+            count = estimate_count(queryset, threshold=0)
+
+        self.assertEqual(count, planner_row_estimate(queryset))
+
+    def test_paginator_uses_estimate(self):
+        paginator = EstimatedCountPaginator(Order.objects.all(), per_page=2)
+
+        self.assertEqual(paginator.count, 3)
+        self.assertEqual(paginator.num_pages, 2)
+
+    def test_paginator_finds_next_page_without_the_estimate(self):
+        paginator = EstimatedCountPaginator(Order.objects.order_by("created_at", "id"), per_page=1)
+
+        with patch("reporting.pagination.estimate_count", return_value=1), self.assertNumQueries(2):
+            second, third = paginator.page(2), paginator.page(3)
+
+        self.assertTrue(second.has_next())
+        self.assertFalse(third.has_next())
+        self.assertEqual(len(third), 1)
+        with self.assertRaises(EmptyPage):
+            paginator.page(4)
+
+
+class AdminChangelistTestCase(TestCase):
+    def setUp(self):
+        admin_user = User.objects.create_superuser(username="admin", email="admin@example.com", password="adminpass")
+        self.client.force_login(admin_user)
+
+        now = timezone.now()
+        for _ in range(5):
+            order = Order.objects.create(user=admin_user, created_at=now)
+            OrderItem1.objects.create(order=order, price=Decimal("10.00"), created_at=now)
+            OrderItem2.objects.create(
+                order=order, placement_price=Decimal("1.00"), article_price=Decimal("2.00"), created_at=now
+            )
+
+    def test_changelists_do_not_query_per_row(self):
+        for url in (
+            reverse("admin:orders_order_changelist"),
+            reverse("admin:orders_orderitem1_changelist"),
+            reverse("admin:orders_orderitem2_changelist"),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertLess(len(queries), 10, url)
@@ -1,15 +1,44 @@
-from datetime import datetime, timedelta
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+from unittest.mock import patch
 
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
+from drf_spectacular.generators import SchemaGenerator
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from orders.filters import OrderFilter, OrderItem1Filter, OrderItem2Filter
 from orders.models import Order, OrderItem1, OrderItem2
+from orders.periods import build_calendar
+from orders.serializers import (
+    ApproxReportResponseSerializer,
+    OrderItem1Serializer,
+    OrderItem2Serializer,
+    OrderSerializer,
+    ReportComparisonResponseSerializer,
+    ReportResponseSerializer,
+    ReportWindowResponseSerializer,
+    SegmentedReportResponseSerializer,
+)
+from orders.urls import router as orders_router
+from orders.views import OrderViewSet
+from reporting.querybudget import QueryBudgetExceeded
+from reporting.schema import reset_schema_cache
+from reporting.testing import QueryBudgetTestMixin
 from users.models import User
+from users.urls import router as users_router
 
 
 class OrderAPITestCase(TestCase):
@@ -36,6 +65,17 @@ class OrderAPITestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 2)
 
+    def test_list_pages_past_an_underestimated_count(self):
+        with patch("reporting.pagination.estimate_count", return_value=1):
+            second = self.client.get(reverse("order-list"), {"page_size": 1, "page": 2})
+            third = self.client.get(reverse("order-list"), {"page_size": 1, "page": 3})
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data["results"][0]["id"], str(self.order2.id))
+        self.assertIsNone(second.data["next"])
+        self.assertIsNotNone(second.data["previous"])
+        self.assertEqual(third.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_retrieve_order_detail(self):
         url = reverse("order-detail", kwargs={"pk": self.order1.id})
         response = self.client.get(url)
@@ -72,35 +112,201 @@ class OrderAPITestCase(TestCase):
         self.assertEqual(result["total_price"], 80.00)
 
 
-class ReportAPITestCase(TestCase):
+class OrderFilterAPITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(username=f"filter{index}", email=f"filter{index}@example.com", password="secret")
+            for index in range(50)
+        ]
+        cls.start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        orders = Order.objects.bulk_create(
+            Order(user=cls.users[index % 50], created_at=cls.start + timedelta(hours=index)) for index in range(2000)
+        )
+        OrderItem1.objects.bulk_create(
+            OrderItem1(order=order, price=Decimal(index % 200), created_at=order.created_at)
+            for index, order in enumerate(orders)
+        )
+        OrderItem2.objects.bulk_create(
+            OrderItem2(
+                order=order,
+                placement_price=Decimal(index % 100),
+                article_price=Decimal("10.00"),
+                created_at=order.created_at,
+            )
+            for index, order in enumerate(orders)
+        )
+        cls.orders = orders
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE orders_order, orders_orderitem1, orders_orderitem2")
+
     def setUp(self):
         self.client = APIClient()
 
-        base_date = datetime(2025, 1, 10, 12, 0, 0, tzinfo=timezone.utc)
-
-        self.user1 = User.objects.create_user(
-            username="user1", email="user1@example.com", password="testpass123", is_active=True
+    def list(self, name, params):
+        response = self.client.get(reverse(name), {"page_size": 1000, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def index_name(self, model, fields):
+        return next(index.name for index in model._meta.indexes if index.fields == fields)
+
+    def assertIndexCondition(self, plan, column):
+        conditions = [line for line in plan.splitlines() if "Index Cond:" in line]
+        self.assertTrue(any(column in line for line in conditions), plan)
+
+    def explain(self, filterset_class, params):
+        queryset = filterset_class(params, queryset=filterset_class._meta.model.objects.all()).qs[:100]
+        sql, sql_params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}", sql_params)
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def test_created_at_range(self):
+        data = self.list(
+            "order-list", {"created_at__gte": "2025-01-02T00:00:00Z", "created_at__lt": "2025-01-03T00:00:00Z"}
         )
-        self.user1.date_joined = base_date
-        self.user1.save()
 
-        self.user2 = User.objects.create_user(
-            username="user2", email="user2@example.com", password="testpass123", is_active=False
-        )
-        self.user2.date_joined = base_date + timedelta(days=1)
-        self.user2.save()
+        self.assertEqual(data["count"], 24)
+        plan = self.explain(OrderFilter, {"created_at__gte": "2025-01-02", "created_at__lt": "2025-01-03"})
+        self.assertIn(self.index_name(Order, ["created_at"]), plan)
+
+    def test_user_in_with_range(self):
+        user_ids = f"{self.users[0].pk},{self.users[1].pk}"
+        data = self.list("order-list", {"user__in": user_ids, "created_at__gte": "2025-01-01"})
+
+        self.assertEqual(data["count"], 80)
+        self.assertEqual({order["user"] for order in data["results"]}, {self.users[0].pk, self.users[1].pk})
+        plan = self.explain(OrderFilter, {"user__in": user_ids, "created_at__gte": "2025-01-01"})
+        self.assertIndexCondition(plan, "user_id = ANY")
+
+    def test_order_in_with_price_range(self):
+        order_ids = ",".join(str(order.pk) for order in self.orders[:10])
+        data = self.list("orderitem1-list", {"order__in": order_ids, "price__gte": 5})
+        self.assertEqual(sorted(item["price"] for item in data["results"]), [f"{price}.00" for price in range(5, 10)])
+
+        plan = self.explain(OrderItem1Filter, {"order__in": order_ids, "price__gte": 5})
+        self.assertIndexCondition(plan, "order_id = ANY")
 
-        self.order1 = Order.objects.create(user=self.user1, created_at=base_date)
-        self.order2 = Order.objects.create(user=self.user2, created_at=base_date + timedelta(days=1))
+        data = self.list("orderitem2-list", {"order__in": order_ids, "total_price__lte": 12})
+        self.assertEqual(len(data["results"]), 3)
+        plan = self.explain(OrderItem2Filter, {"order__in": order_ids, "total_price__lte": 12})
+        self.assertIndexCondition(plan, "order_id = ANY")
 
-        OrderItem1.objects.create(order=self.order1, price=Decimal("100.00"), created_at=base_date)
-        OrderItem2.objects.create(
-            order=self.order2,
-            placement_price=Decimal("50.00"),
-            article_price=Decimal("30.00"),
-            created_at=base_date + timedelta(days=1),
+    def test_item_price_range_with_created_at_range(self):
+        data = self.list(
+            "orderitem2-list",
+            {"created_at__gte": "2025-01-01", "created_at__lt": "2025-01-02", "placement_price__gte": 20},
         )
 
+        self.assertEqual(len(data["results"]), 4)
+        plan = self.explain(OrderItem2Filter, {"created_at__gte": "2025-01-01", "placement_price__gte": 20})
+        self.assertIn(self.index_name(OrderItem2, ["created_at"]), plan)
+
+    def test_invalid_filters(self):
+        response = self.client.get(reverse("order-list"), {"user__in": "not-a-uuid"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(reverse("order-list"), {"created_at__gte": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        order_ids = ",".join(str(order.pk) for order in self.orders[:101])
+        response = self.client.get(reverse("orderitem1-list"), {"order__in": order_ids})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SparseFieldsetAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="sparse", email="sparse@example.com")
+
+        now = timezone.now()
+        for offset in range(3):
+            order = Order.objects.create(user=self.user, created_at=now - timedelta(days=offset))
+            OrderItem1.objects.create(order=order, price=Decimal("9.99"), created_at=order.created_at)
+            OrderItem2.objects.create(
+                order=order,
+                placement_price=Decimal("5.00"),
+                article_price=Decimal("2.50"),
+                created_at=order.created_at,
+            )
+
+    def test_fast_path_matches_serializers(self):
+        for route, serializer_class, queryset in (
+            ("order-list", OrderSerializer, Order.objects.all()),
+            ("orderitem1-list", OrderItem1Serializer, OrderItem1.objects.all()),
+            ("orderitem2-list", OrderItem2Serializer, OrderItem2.objects.all()),
+        ):
+            with self.subTest(route=route):
+                response = self.client.get(reverse(route))
+
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                expected = serializer_class(queryset.order_by("-created_at"), many=True).data
+                self.assertEqual(
+                    json.loads(json.dumps(response.data["results"], default=str)),
+                    json.loads(json.dumps(expected, default=str)),
+                )
+
+    def test_fields_restricts_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("order-list"), {"fields": "id,created_at"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data["results"][0]), {"id", "created_at"})
+        select = queries.captured_queries[-1]["sql"]
+        self.assertNotIn("user_id", select)
+        self.assertNotIn("orders_orderitem1", select)
+
+    def test_fields_on_computed_values(self):
+        response = self.client.get(reverse("orderitem2-list"), {"fields": "id,total_price"})
+
+        self.assertEqual(response.data["results"][0]["total_price"], Decimal("7.50"))
+        response = self.client.get(reverse("order-list"), {"fields": "items1_count"})
+        self.assertEqual([row["items1_count"] for row in response.data["results"]], [1, 1, 1])
+
+    def test_fields_on_retrieve(self):
+        item = OrderItem1.objects.first()
+        response = self.client.get(reverse("orderitem1-detail", kwargs={"pk": item.pk}), {"fields": "price"})
+
+        self.assertEqual(response.data, {"price": "9.99"})
+
+    def test_unknown_field(self):
+        response = self.client.get(reverse("order-list"), {"fields": "id,password"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ReportAPITestCase(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client = APIClient()
+
+            base_date = datetime(2025, 1, 10, 12, 0, 0, tzinfo=timezone.utc)
+
+            self.user1 = User.objects.create_user(
+                username="user1", email="user1@example.com", password="testpass123", is_active=True
+            )
+            self.user1.date_joined = base_date
+            self.user1.save()
+
+            self.user2 = User.objects.create_user(
+                username="user2", email="user2@example.com", password="testpass123", is_active=False
+            )
+            self.user2.date_joined = base_date + timedelta(days=1)
+            self.user2.save()
+
+            self.order1 = Order.objects.create(user=self.user1, created_at=base_date)
+            self.order2 = Order.objects.create(user=self.user2, created_at=base_date + timedelta(days=1))
+
+            OrderItem1.objects.create(order=self.order1, price=Decimal("100.00"), created_at=base_date)
+            OrderItem2.objects.create(
+                order=self.order2,
+                placement_price=Decimal("50.00"),
+                article_price=Decimal("30.00"),
+                created_at=base_date + timedelta(days=1),
+            )
+
     def test_daily_report(self):
         url = reverse("report-daily")
         response = self.client.get(url, {"start_date": "2025-01-10", "end_date": "2025-01-13"})
@@ -132,6 +338,119 @@ class ReportAPITestCase(TestCase):
         self.assertEqual(response.data["period"], "monthly")
         self.assertGreater(len(response.data["data"]), 0)
 
+    def test_weekly_report_compare_previous(self):
+        url = reverse("report-weekly")
+        response = self.client.get(url, {"start_date": "2025-01-13", "end_date": "2025-01-20", "compare": "previous"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["compare"], "previous")
+        week = response.data["data"][0]
+        self.assertEqual(week["PreviousPeriod"], "2025-01-06")
+        self.assertEqual(week["Comparison"]["OrdersCount"]["Previous"], 2)
+        self.assertEqual(week["Comparison"]["OrdersCount"]["DeltaPercent"], -100.0)
+
+    def test_report_invalid_compare(self):
+        url = reverse("report-daily")
+        response = self.client.get(url, {"compare": "tomorrow"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_daily_report_grouped_by_activation(self):
+        url = reverse("report-daily")
+        response = self.client.get(
+            url, {"start_date": "2025-01-10", "end_date": "2025-01-12", "group_by": "activation"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["group_by"], "activation")
+        segments = {segment["Segment"]: segment["Data"] for segment in response.data["data"]}
+        self.assertEqual(segments["activated"][0]["OrdersCount"], 1)
+        self.assertEqual(segments["activated"][1]["OrdersCount"], 0)
+        self.assertEqual(segments["not_activated"][1]["OrdersCount"], 1)
+        self.assertEqual(segments["not_activated"][1]["OrdersTotalAmount"], 80.00)
+
+    def test_report_grouped_by_users(self):
+        url = reverse("report-monthly")
+        response = self.client.get(
+            url,
+            {"start_date": "2025-01-01", "end_date": "2025-02-01", "group_by": "users", "users": str(self.user1.pk)},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["data"]), 1)
+        self.assertEqual(response.data["data"][0]["Segment"], str(self.user1.pk))
+        self.assertEqual(response.data["data"][0]["Data"][0]["OrdersTotalAmount"], 100.00)
+
+    def test_daily_report_rolling_and_cumulative(self):
+        url = reverse("report-daily")
+        response = self.client.get(
+            url, {"start_date": "2025-01-11", "end_date": "2025-01-13", "rolling": "7d,28d", "cumulative": "true"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        day1 = response.data["data"][0]
+        self.assertEqual(set(day1["Rolling"]), {"7d", "28d"})
+        self.assertEqual(day1["Rolling"]["7d"]["OrdersCount"], round(2 / 7, 2))
+        self.assertEqual(day1["Cumulative"]["OrdersCount"], 1)
+        self.assertEqual(response.data["data"][1]["Cumulative"]["OrdersTotalAmount"], 80.00)
+
+    def test_monthly_report_approx(self):
+        url = reverse("report-monthly")
+        response = self.client.get(url, {"start_date": "2025-01-01", "end_date": "2025-02-01", "accuracy": "approx"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["accuracy"], "approx")
+        month = response.data["data"][0]
+        self.assertEqual(month["SamplePercent"]["Orders"], 100.0)
+        self.assertEqual(month["OrdersTotalAmount"], 180.00)
+        self.assertEqual(month["ConfidenceInterval"]["Upper"]["OrdersTotalAmount"], 180.00)
+
+        for params in ({"accuracy": "rough"}, {"accuracy": "approx", "compare": "previous"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_report_invalid_rolling(self):
+        url = reverse("report-daily")
+
+        for params in ({"rolling": "7"}, {"rolling": "0d"}, {"rolling": "7d", "compare": "previous"}):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_report_invalid_group_by(self):
+        url = reverse("report-daily")
+
+        for params in (
+            {"group_by": "country"},
+            {"group_by": "users"},
+            {"group_by": "users", "users": "not-a-uuid"},
+            {"group_by": "activation", "compare": "previous"},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_identical_concurrent_reports_are_coalesced(self):
+        release = threading.Event()
+        calls = []
+
+        def generate_report(start_date, end_date, period):
+            calls.append(period)
+            release.wait(5)
+            return []
+
+        url = reverse("report-monthly")
+        params = {"start_date": "2025-01-01", "end_date": "2025-04-01"}
+        with patch("orders.views.ReportService.generate_report", side_effect=generate_report):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [executor.submit(APIClient().get, url, params) for _ in range(4)]
+                time.sleep(0.2)
+                release.set()
+                responses = [future.result() for future in futures]
+
+        self.assertEqual(calls, ["monthly"])
+        self.assertEqual([response.status_code for response in responses], [status.HTTP_200_OK] * 4)
+
     def test_report_without_dates(self):
         url = reverse("report-daily")
         response = self.client.get(url)
@@ -161,3 +480,317 @@ class ReportAPITestCase(TestCase):
         for day_data in response.data["data"]:
             for key in required_keys:
                 self.assertIn(key, day_data)
+
+    def test_cohort_report(self):
+        url = reverse("report-cohorts")
+        response = self.client.get(url, {"period": "weekly", "start_date": "2025-01-06", "end_date": "2025-01-20"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["data"]), 2)
+        cohort = response.data["data"][0]
+        self.assertEqual(cohort["Users"], 2)
+        self.assertEqual(cohort["Periods"][0]["ActiveUsers"], 2)
+        self.assertEqual(cohort["Periods"][0]["Retention"], 1.0)
+
+    def test_cohort_report_invalid_period(self):
+        url = reverse("report-cohorts")
+        response = self.client.get(url, {"period": "daily"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_distribution_report(self):
+        url = reverse("report-distribution")
+        response = self.client.get(
+            url, {"period": "weekly", "mode": "exact", "start_date": "2025-01-06", "end_date": "2025-01-13"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        week = response.data["data"][0]
+        self.assertEqual(week["OrdersCount"], 2)
+        self.assertEqual(week["P50"], 90.0)
+        self.assertEqual(len(week["Histogram"]), 2)
+
+    def test_distribution_report_invalid_bin_width(self):
+        url = reverse("report-distribution")
+        response = self.client.get(url, {"bin_width": "wide"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unique_buyers_report(self):
+        url = reverse("report-unique-buyers")
+        response = self.client.get(
+            url, {"period": "weekly", "mode": "approx", "start_date": "2025-01-06", "end_date": "2025-01-13"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["mode"], "approx")
+        self.assertEqual(len(response.data["data"]), 1)
+        self.assertEqual(response.data["data"][0]["UniqueBuyers"], response.data["total"])
+
+    def test_unique_buyers_approx_stays_within_budget_when_sketches_are_missing(self):
+        Order.objects.create(user=self.user1, created_at=timezone.now())
+        response = self.client.get(reverse("report-unique-buyers"), {"mode": "approx"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(int(response["X-Query-Count"]), 4)
+        self.assertEqual(response.data["total"], 1)
+
+    def test_unique_buyers_report_invalid_mode(self):
+        response = self.client.get(reverse("report-unique-buyers"), {"mode": "fast"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_calendar_report(self):
+        build_calendar(date(2025, 1, 1), date(2025, 4, 1), schemes=["fiscal_445"])
+        response = self.client.get(
+            reverse("report-calendar"), {"scheme": "fiscal_445", "start_date": "2025-01-01", "end_date": "2025-03-31"}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["scheme"], "fiscal_445")
+        self.assertEqual([row["Label"] for row in response.data["data"]], ["FY2025-P01", "FY2025-P02", "FY2025-P03"])
+
+    def test_calendar_report_without_calendar(self):
+        response = self.client.get(reverse("report-calendar"), {"scheme": "quarterly"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("build_calendar", str(response.data["scheme"]))
+
+    def test_batch_report(self):
+        url = reverse("report-batch")
+        response = self.client.post(
+            url,
+            {
+                "reports": [
+                    {"start_date": "2025-01-01", "end_date": "2025-02-01", "period": "monthly"},
+                    {"start_date": "2025-01-10", "end_date": "2025-01-12"},
+                ]
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        monthly, daily = response.data["reports"]
+        self.assertEqual(monthly["period"], "monthly")
+        self.assertEqual(len(monthly["data"]), 1)
+        self.assertEqual(daily["period"], "daily")
+        self.assertEqual(daily["start_date"], "2025-01-10")
+        self.assertEqual(len(daily["data"]), 2)
+        self.assertEqual(monthly["data"][0]["OrdersCount"], sum(row["OrdersCount"] for row in daily["data"]))
+
+    def test_batch_report_invalid_spec(self):
+        url = reverse("report-batch")
+        response = self.client.post(
+            url,
+            {"reports": [{"start_date": "2025-01-01", "end_date": "2025-02-01", "period": "yearly"}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@override_settings(CHANGE_FEED_SAFETY_LAG=0)
+class ChangeFeedAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+        self.user = User.objects.create_user(
+            username="testuser", email="test@example.com", password="testpass123", is_active=True
+        )
+        now = timezone.now()
+        self.orders = [Order.objects.create(user=self.user, created_at=now) for _ in range(3)]
+
+    def test_pages_through_changes_in_stable_order(self):
+        url = reverse("changes-orders")
+
+        first = self.client.get(url, {"limit": 2})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(first.data["results"]), 2)
+        self.assertTrue(first.data["has_more"])
+
+        second = self.client.get(url, {"limit": 2, "since": first.data["next_token"]})
+        self.assertEqual(len(second.data["results"]), 1)
+        self.assertFalse(second.data["has_more"])
+
+        seen = [row["id"] for row in first.data["results"] + second.data["results"]]
+        self.assertCountEqual(seen, [str(order.id) for order in self.orders])
+
+        empty = self.client.get(url, {"since": second.data["next_token"]})
+        self.assertEqual(empty.data["results"], [])
+        self.assertEqual(empty.data["next_token"], second.data["next_token"])
+
+    def test_returns_only_modified_rows_after_token(self):
+        url = reverse("changes-orders")
+        token = self.client.get(url).data["next_token"]
+
+        self.orders[0].created_at = timezone.now() - timedelta(days=1)
+        self.orders[0].save()
+
+        response = self.client.get(url, {"since": token})
+        self.assertEqual([row["id"] for row in response.data["results"]], [str(self.orders[0].id)])
+
+    def test_user_and_item_feeds(self):
+        OrderItem1.objects.create(order=self.orders[0], price=Decimal("10.00"), created_at=timezone.now())
+
+        users = self.client.get(reverse("changes-users"))
+        items1 = self.client.get(reverse("changes-order-items1"))
+        items2 = self.client.get(reverse("changes-order-items2"))
+
+        self.assertEqual(len(users.data["results"]), 1)
+        self.assertIn("updated_at", users.data["results"][0])
+        self.assertEqual(len(items1.data["results"]), 1)
+        self.assertEqual(items2.data["results"], [])
+
+    @override_settings(CHANGE_FEED_SAFETY_LAG=60)
+    def test_holds_back_rows_newer_than_safety_lag(self):
+        url = reverse("changes-orders")
+        self.assertEqual(self.client.get(url).data["results"], [])
+
+        Order.objects.filter(pk=self.orders[1].pk).update(updated_at=timezone.now() - timedelta(minutes=2))
+        response = self.client.get(url)
+        self.assertEqual([row["id"] for row in response.data["results"]], [str(self.orders[1].id)])
+
+    def test_invalid_token(self):
+        response = self.client.get(reverse("changes-orders"), {"since": "not-a-token"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class QueryBudgetAPITestCase(QueryBudgetTestMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        created_at = timezone.now() - timedelta(days=2)
+
+        for user_index in range(10):
+            self.user = User.objects.create_user(
+                username=f"budget{user_index}", email=f"budget{user_index}@example.com"
+            )
+            for _ in range(3):
+                self.order = Order.objects.create(user=self.user, created_at=created_at)
+                for _ in range(2):
+                    self.item1 = OrderItem1.objects.create(
+                        order=self.order, price=Decimal("10.00"), created_at=created_at
+                    )
+                    self.item2 = OrderItem2.objects.create(
+                        order=self.order,
+                        placement_price=Decimal("5.00"),
+                        article_price=Decimal("2.00"),
+                        created_at=created_at,
+                    )
+
+    def test_all_routes_within_budget(self):
+        detail_pks = {
+            "order": self.order.pk,
+            "orderitem1": self.item1.pk,
+            "orderitem2": self.item2.pk,
+            "user": self.user.pk,
+        }
+
+        checked = self.assertRoutesWithinBudget(orders_router, detail_pks)
+        checked += self.assertRoutesWithinBudget(users_router, detail_pks)
+
+        self.assertIn("order-list", checked)
+        self.assertIn("user-statistics", checked)
+
+    def test_order_list_uses_annotated_counts(self):
+        response = self.client.get(reverse("order-list"), {"page_size": 1000})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Query-Count"], "3")
+        self.assertTrue(all(row["items1_count"] == 2 and row["items2_count"] == 2 for row in response.data["results"]))
+
+    def test_order_list_counts_items_per_page_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("order-list"), {"page_size": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(all(row["items1_count"] == 2 and row["items2_count"] == 2 for row in response.data["results"]))
+        sql = [query["sql"] for query in queries.captured_queries if '"orders_order"' in query["sql"]]
+        self.assertTrue(sql)
+        self.assertTrue(all('GROUP BY "orders_order"' not in statement for statement in sql))
+        self.assertTrue(all("JOIN" not in statement for statement in sql))
+
+    @override_settings(QUERY_BUDGET_RAISE=True)
+    def test_over_budget_raises_in_debug(self):
+        with patch.dict(OrderViewSet.query_budgets, {"list": 1}):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse("order-list"))
+
+    @override_settings(QUERY_BUDGET_RAISE=False)
+    def test_over_budget_is_logged_in_production(self):
+        with (
+            patch.dict(OrderViewSet.query_budgets, {"list": 1}),
+            self.assertLogs("reporting.querybudget", "WARNING") as logs,
+        ):
+            response = self.client.get(reverse("order-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        [record] = logs.records
+        self.assertEqual(record.view, "OrderViewSet.list")
+        self.assertEqual(record.query_budget, 1)
+        self.assertGreater(record.query_count, 1)
+
+
+class SchemaAPITestCase(TestCase):
+    def setUp(self):
+        reset_schema_cache()
+        self.addCleanup(reset_schema_cache)
+
+    def test_schema_generated_once_and_served_from_memory(self):
+        with patch("reporting.schema.SchemaGenerator.get_schema", wraps=SchemaGenerator().get_schema) as get_schema:
+            first = self.client.get(reverse("schema"))
+            with self.assertNumQueries(0):
+                second = self.client.get(reverse("schema"))
+
+        self.assertEqual(get_schema.call_count, 1)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+        self.assertIn(b"/api/reports/daily/", first.content)
+
+    def test_period_reports_document_every_response_variant(self):
+        schema = json.loads(self.client.get(reverse("schema"), {"format": "json"}).content)
+        response = schema["paths"]["/api/reports/weekly/"]["get"]["responses"]["200"]["content"]["application/json"]
+        variants = schema["components"]["schemas"]["PeriodReportResponse"]["oneOf"]
+
+        self.assertEqual(response["schema"]["$ref"], "#/components/schemas/PeriodReportResponse")
+        for params, serializer in (
+            ({}, ReportResponseSerializer),
+            ({"compare": "previous"}, ReportComparisonResponseSerializer),
+            ({"group_by": "activation"}, SegmentedReportResponseSerializer),
+            ({"rolling": "7d"}, ReportWindowResponseSerializer),
+            ({"accuracy": "approx"}, ApproxReportResponseSerializer),
+        ):
+            with self.subTest(params=params):
+                component = serializer.__name__.removesuffix("Serializer")
+                self.assertIn({"$ref": f"#/components/schemas/{component}"}, variants)
+                data = self.client.get(reverse("report-weekly"), params).data
+                self.assertEqual(set(data), set(serializer().fields))
+
+    def test_etag_and_conditional_request(self):
+        response = self.client.get(reverse("schema"))
+        etag = response["ETag"]
+
+        not_modified = self.client.get(reverse("schema"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(not_modified["ETag"], etag)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_gzip_and_json_variants(self):
+        plain = self.client.get(reverse("schema"), {"format": "json"})
+        compressed = self.client.get(reverse("schema"), {"format": "json"}, HTTP_ACCEPT_ENCODING="gzip, br")
+
+        self.assertEqual(json.loads(plain.content)["info"]["title"], "User Orders Report API")
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertNotEqual(compressed["ETag"], plain["ETag"])
+
+    def test_serves_pregenerated_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as stream:
+            json.dump({"openapi": "3.0.3", "info": {"title": "Prebuilt", "version": "1"}, "paths": {}}, stream)
+        self.addCleanup(os.unlink, stream.name)
+
+        with override_settings(OPENAPI_SCHEMA_FILE=stream.name):
+            response = self.client.get(reverse("schema"), HTTP_ACCEPT="application/json")
+
+        self.assertEqual(json.loads(response.content)["info"]["title"], "Prebuilt")
@@ -2,14 +2,23 @@ from django.urls import include, path
 
 from rest_framework.routers import DefaultRouter
 
-from .views import OrderItem1ViewSet, OrderItem2ViewSet, OrderViewSet, ReportViewSet
+from .views import (
+    ChangeFeedViewSet,
+    OrderItem1ViewSet,
+    OrderItem2ViewSet,
+    OrderViewSet,
+    ReportViewSet,
+    live_report_stream,
+)
 
 router = DefaultRouter()
 router.register(r"orders", OrderViewSet, basename="order")
 router.register(r"order-items1", OrderItem1ViewSet, basename="orderitem1")
 router.register(r"order-items2", OrderItem2ViewSet, basename="orderitem2")
 router.register(r"reports", ReportViewSet, basename="report")
+router.register(r"changes", ChangeFeedViewSet, basename="changes")
 
 urlpatterns = [
+    path("reports/live/", live_report_stream, name="report-live"),
     path("", include(router.urls)),
 ]
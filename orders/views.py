@@ -1,29 +1,92 @@
+import uuid
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+from django.views.decorators.http import require_GET
 
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.types import OpenApiTypes
-from drf_spectacular.utils import OpenApiParameter, extend_schema
+from drf_spectacular.utils import OpenApiParameter, PolymorphicProxySerializer, extend_schema, extend_schema_view
 from rest_framework import filters, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
+from reporting.fieldsets import FIELDS_PARAMETER, SparseFieldsetMixin
+from reporting.querybudget import QueryBudgetMixin, query_budget
+from users.models import User
+from users.serializers import UserChangeSerializer
+
+from .cache import coalesced
+from .changefeed import InvalidWatermark, read_changes
+from .filters import OrderFilter, OrderItem1Filter, OrderItem2Filter
+from .live import stream_live_report
 from .models import Order, OrderItem1, OrderItem2
-from .reports import ReportService
+from .reports import ReportService, parse_rolling_windows
 from .serializers import (
+    ApproxReportResponseSerializer,
+    ApproxReportSerializer,
+    CalendarReportSerializer,
+    ChangeFeedSerializer,
+    CohortSerializer,
+    DistributionSerializer,
+    OrderChangeSerializer,
     OrderDetailSerializer,
+    OrderItem1ChangeSerializer,
     OrderItem1Serializer,
+    OrderItem2ChangeSerializer,
     OrderItem2Serializer,
     OrderSerializer,
+    ReportBatchRequestSerializer,
+    ReportBatchResponseSerializer,
+    ReportComparisonResponseSerializer,
+    ReportComparisonSerializer,
+    ReportResponseSerializer,
     ReportSerializer,
+    ReportWindowResponseSerializer,
+    ReportWindowSerializer,
+    SegmentedReportResponseSerializer,
+    SegmentedReportSerializer,
+    UniqueBuyersSerializer,
+)
+
+CHANGE_FEED_DEFAULT_LIMIT = 1000
+CHANGE_FEED_MAX_LIMIT = 10000
+REPORT_SEGMENT_MAX_USERS = 100
+
+
+def item_count_subquery(model):
+    counts = model.objects.filter(order=OuterRef("pk")).order_by().values("order").annotate(count=Count("*"))
+    return Coalesce(Subquery(counts.values("count")), 0)
+
+
+SPARSE_FIELDSET_SCHEMA = extend_schema_view(
+    list=extend_schema(parameters=[FIELDS_PARAMETER]), retrieve=extend_schema(parameters=[FIELDS_PARAMETER])
 )
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+@SPARSE_FIELDSET_SCHEMA
+class OrderViewSet(QueryBudgetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ["user", "created_at"]
+    filterset_class = OrderFilter
     ordering_fields = ["created_at"]
     ordering = ["-created_at"]
+    query_budgets = {"list": 4, "retrieve": 3, "create": 13, "update": 17, "partial_update": 17}
+    values_annotations = {
+        "items1_count": lambda: item_count_subquery(OrderItem1),
+        "items2_count": lambda: item_count_subquery(OrderItem2),
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "retrieve":
+            return queryset.select_related("user").prefetch_related("items1", "items2")
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "retrieve":
@@ -31,25 +94,166 @@ class OrderViewSet(viewsets.ModelViewSet):
         return OrderSerializer
 
 
-class OrderItem1ViewSet(viewsets.ModelViewSet):
+@SPARSE_FIELDSET_SCHEMA
+class OrderItem1ViewSet(QueryBudgetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = OrderItem1.objects.all()
     serializer_class = OrderItem1Serializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ["order", "created_at"]
+    filterset_class = OrderItem1Filter
     ordering_fields = ["created_at", "price"]
     ordering = ["-created_at"]
+    query_budgets = {"list": 4, "retrieve": 1, "create": 12, "update": 17, "partial_update": 17, "destroy": 8}
 
 
-class OrderItem2ViewSet(viewsets.ModelViewSet):
+@SPARSE_FIELDSET_SCHEMA
+class OrderItem2ViewSet(QueryBudgetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = OrderItem2.objects.all()
     serializer_class = OrderItem2Serializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
-    filterset_fields = ["order", "created_at"]
+    filterset_class = OrderItem2Filter
     ordering_fields = ["created_at", "placement_price", "article_price"]
     ordering = ["-created_at"]
+    query_budgets = {"list": 4, "retrieve": 1, "create": 12, "update": 17, "partial_update": 17, "destroy": 8}
+    values_annotations = {"total_price": lambda: F("placement_price") + F("article_price")}
+
+
+CHANGE_FEED_PARAMETERS = [
+    OpenApiParameter(
+        name="since",
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+        description="Opaque token from a previous response's next_token. Omit to start from the beginning.",
+        required=False,
+    ),
+    OpenApiParameter(
+        name="limit",
+        type=OpenApiTypes.INT,
+        location=OpenApiParameter.QUERY,
+        description=f"Batch size (max {CHANGE_FEED_MAX_LIMIT}). Defaults to {CHANGE_FEED_DEFAULT_LIMIT}.",
+        required=False,
+    ),
+]
+
+
+class ChangeFeedViewSet(QueryBudgetMixin, viewsets.ViewSet):
+    query_budget = 1
+
+    @extend_schema(parameters=CHANGE_FEED_PARAMETERS, responses={200: ChangeFeedSerializer})
+    @action(detail=False, methods=["get"])
+    def users(self, request):
+        return self._changes(request, User.objects.all(), UserChangeSerializer)
+
+    @extend_schema(parameters=CHANGE_FEED_PARAMETERS, responses={200: ChangeFeedSerializer})
+    @action(detail=False, methods=["get"])
+    def orders(self, request):
+        return self._changes(request, Order.objects.all(), OrderChangeSerializer)
+
+    @extend_schema(parameters=CHANGE_FEED_PARAMETERS, responses={200: ChangeFeedSerializer})
+    @action(detail=False, methods=["get"], url_path="order-items1")
+    def order_items1(self, request):
+        return self._changes(request, OrderItem1.objects.all(), OrderItem1ChangeSerializer)
+
+    @extend_schema(parameters=CHANGE_FEED_PARAMETERS, responses={200: ChangeFeedSerializer})
+    @action(detail=False, methods=["get"], url_path="order-items2")
+    def order_items2(self, request):
+        return self._changes(request, OrderItem2.objects.all(), OrderItem2ChangeSerializer)
+
+    def _changes(self, request, queryset, serializer_class):
+        try:
+            limit = int(request.query_params.get("limit", CHANGE_FEED_DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({"limit": "Must be an integer"})
+        limit = max(1, min(limit, CHANGE_FEED_MAX_LIMIT))
+
+        try:
+            rows, next_token, has_more = read_changes(
+                queryset,
+                request.query_params.get("since"),
+                limit,
+                timedelta(seconds=settings.CHANGE_FEED_SAFETY_LAG),
+            )
+        except InvalidWatermark as exc:
+            raise ValidationError({"since": str(exc)})
+
+        return Response(
+            {
+                "results": serializer_class(rows, many=True).data,
+                "next_token": next_token,
+                "has_more": has_more,
+            }
+        )
+
+
+COMPARE_PARAMETER = OpenApiParameter(
+    name="compare",
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.QUERY,
+    description="Compare each bucket with the previous range or the same range a year ago.",
+    required=False,
+    enum=["previous", "year_ago"],
+)
+
+WINDOW_PARAMETERS = [
+    OpenApiParameter(
+        name="rolling",
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+        description="Comma-separated moving-average windows in days, e.g. 7d,28d. Adds a Rolling object per bucket.",
+        required=False,
+    ),
+    OpenApiParameter(
+        name="cumulative",
+        type=OpenApiTypes.BOOL,
+        location=OpenApiParameter.QUERY,
+        description="Add running totals from the start of the range as a Cumulative object per bucket.",
+        required=False,
+    ),
+]
+
+ACCURACY_PARAMETER = OpenApiParameter(
+    name="accuracy",
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.QUERY,
+    description="exact scans every row; approx scales up a TABLESAMPLE of the order and item tables and adds a 95% "
+    "ConfidenceInterval per metric. Defaults to exact.",
+    required=False,
+    enum=["exact", "approx"],
+)
+
+GROUP_BY_PARAMETERS = [
+    OpenApiParameter(
+        name="group_by",
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+        description="Return one series per segment: user activation, signup month, or the users listed in `users`.",
+        required=False,
+        enum=["activation", "signup_month", "users"],
+    ),
+    OpenApiParameter(
+        name="users",
+        type=OpenApiTypes.STR,
+        location=OpenApiParameter.QUERY,
+        description=f"Comma-separated user ids (max {REPORT_SEGMENT_MAX_USERS}). "
+        "Required for group_by=users; restricts the other groupings to these users.",
+        required=False,
+    ),
+]
 
 
-class ReportViewSet(viewsets.ViewSet):
+PERIOD_REPORT_RESPONSE = PolymorphicProxySerializer(
+    component_name="PeriodReportResponse",
+    serializers=[
+        ReportResponseSerializer,
+        ReportComparisonResponseSerializer,
+        SegmentedReportResponseSerializer,
+        ReportWindowResponseSerializer,
+        ApproxReportResponseSerializer,
+    ],
+    resource_type_field_name=None,
+)
+
+
+class ReportViewSet(QueryBudgetMixin, viewsets.ViewSet):
     @extend_schema(
         parameters=[
             OpenApiParameter(
@@ -66,19 +270,116 @@ class ReportViewSet(viewsets.ViewSet):
                 description="End date (YYYY-MM-DD). Defaults to today.",
                 required=False,
             ),
+            COMPARE_PARAMETER,
+            *GROUP_BY_PARAMETERS,
+            *WINDOW_PARAMETERS,
+            ACCURACY_PARAMETER,
         ],
-        responses={200: ReportSerializer(many=True)},
+        responses={200: PERIOD_REPORT_RESPONSE},
     )
     @action(detail=False, methods=["get"])
+    @query_budget(4)
     def daily(self, request):
+        return self._report_response(request, "daily")
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="start_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="Start date (YYYY-MM-DD). Defaults to 30 days ago.",
+                required=False,
+            ),
+            OpenApiParameter(
+                name="end_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="End date (YYYY-MM-DD). Defaults to today.",
+                required=False,
+            ),
+            COMPARE_PARAMETER,
+            *GROUP_BY_PARAMETERS,
+            *WINDOW_PARAMETERS,
+            ACCURACY_PARAMETER,
+        ],
+        responses={200: PERIOD_REPORT_RESPONSE},
+    )
+    @action(detail=False, methods=["get"])
+    @query_budget(4)
+    def weekly(self, request):
+        return self._report_response(request, "weekly")
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="start_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="Start date (YYYY-MM-DD). Defaults to 30 days ago.",
+                required=False,
+            ),
+            OpenApiParameter(
+                name="end_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="End date (YYYY-MM-DD). Defaults to today.",
+                required=False,
+            ),
+            COMPARE_PARAMETER,
+            *GROUP_BY_PARAMETERS,
+            *WINDOW_PARAMETERS,
+            ACCURACY_PARAMETER,
+        ],
+        responses={200: PERIOD_REPORT_RESPONSE},
+    )
+    @action(detail=False, methods=["get"])
+    @query_budget(4)
+    def monthly(self, request):
+        return self._report_response(request, "monthly")
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="period",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description="Cohort period: weekly or monthly. Defaults to monthly.",
+                required=False,
+                enum=["weekly", "monthly"],
+            ),
+            OpenApiParameter(
+                name="start_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="Start date (YYYY-MM-DD). Defaults to 30 days ago.",
+                required=False,
+            ),
+            OpenApiParameter(
+                name="end_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="End date (YYYY-MM-DD). Defaults to today.",
+                required=False,
+            ),
+        ],
+        responses={200: CohortSerializer(many=True)},
+    )
+    @action(detail=False, methods=["get"])
+    @query_budget(2)
+    def cohorts(self, request):
         start_date, end_date = self._parse_dates(request)
+        period = request.query_params.get("period", "monthly")
 
-        report_data = ReportService.generate_report(start_date, end_date, "daily")
+        try:
+            report_data = ReportService.generate_cohort_report(start_date, end_date, period)
+        except ValueError as exc:
+            raise ValidationError({"period": str(exc)})
 
-        serializer = ReportSerializer(report_data, many=True)
+        serializer = CohortSerializer(report_data, many=True)
         return Response(
             {
-                "period": "daily",
+                "period": period,
                 "start_date": start_date.date().isoformat(),
                 "end_date": end_date.date().isoformat(),
                 "data": serializer.data,
@@ -87,6 +388,29 @@ class ReportViewSet(viewsets.ViewSet):
 
     @extend_schema(
         parameters=[
+            OpenApiParameter(
+                name="period",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description="Aggregation period: daily, weekly or monthly. Defaults to daily.",
+                required=False,
+                enum=["daily", "weekly", "monthly"],
+            ),
+            OpenApiParameter(
+                name="mode",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description="exact (ordered-set aggregates) or approx (merged daily sketches). Defaults to exact.",
+                required=False,
+                enum=["exact", "approx"],
+            ),
+            OpenApiParameter(
+                name="bin_width",
+                type=OpenApiTypes.NUMBER,
+                location=OpenApiParameter.QUERY,
+                description="Histogram bucket width for order totals. Defaults to 50.",
+                required=False,
+            ),
             OpenApiParameter(
                 name="start_date",
                 type=OpenApiTypes.DATE,
@@ -102,18 +426,32 @@ class ReportViewSet(viewsets.ViewSet):
                 required=False,
             ),
         ],
-        responses={200: ReportSerializer(many=True)},
+        responses={200: DistributionSerializer(many=True)},
     )
     @action(detail=False, methods=["get"])
-    def weekly(self, request):
+    @query_budget(3)
+    def distribution(self, request):
         start_date, end_date = self._parse_dates(request)
+        period = request.query_params.get("period", "daily")
+        mode = request.query_params.get("mode", "exact")
+
+        try:
+            bin_width = Decimal(request.query_params.get("bin_width", "50"))
+        except InvalidOperation:
+            raise ValidationError({"bin_width": "Must be a number"})
+        if not bin_width.is_finite():
+            raise ValidationError({"bin_width": "Must be a finite number"})
 
-        report_data = ReportService.generate_report(start_date, end_date, "weekly")
+        try:
+            report_data = ReportService.generate_distribution_report(start_date, end_date, period, mode, bin_width)
+        except ValueError as exc:
+            raise ValidationError({"detail": str(exc)})
 
-        serializer = ReportSerializer(report_data, many=True)
+        serializer = DistributionSerializer(report_data, many=True)
         return Response(
             {
-                "period": "weekly",
+                "period": period,
+                "mode": mode,
                 "start_date": start_date.date().isoformat(),
                 "end_date": end_date.date().isoformat(),
                 "data": serializer.data,
@@ -122,6 +460,22 @@ class ReportViewSet(viewsets.ViewSet):
 
     @extend_schema(
         parameters=[
+            OpenApiParameter(
+                name="period",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description="Aggregation period: daily, weekly or monthly. Defaults to daily.",
+                required=False,
+                enum=["daily", "weekly", "monthly"],
+            ),
+            OpenApiParameter(
+                name="mode",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description="exact (COUNT DISTINCT) or approx (merged daily HyperLogLog sketches). Defaults to exact.",
+                required=False,
+                enum=["exact", "approx"],
+            ),
             OpenApiParameter(
                 name="start_date",
                 type=OpenApiTypes.DATE,
@@ -137,42 +491,228 @@ class ReportViewSet(viewsets.ViewSet):
                 required=False,
             ),
         ],
-        responses={200: ReportSerializer(many=True)},
+        responses={200: UniqueBuyersSerializer(many=True)},
+    )
+    @action(detail=False, methods=["get"], url_path="unique-buyers")
+    @query_budget(4)
+    def unique_buyers(self, request):
+        start_date, end_date = self._parse_dates(request)
+        period = request.query_params.get("period", "daily")
+        mode = request.query_params.get("mode", "exact")
+
+        try:
+            report_data, total = ReportService.generate_unique_buyers_report_with_total(
+                start_date, end_date, period, mode
+            )
+        except ValueError as exc:
+            raise ValidationError({"detail": str(exc)})
+
+        serializer = UniqueBuyersSerializer(report_data, many=True)
+        return Response(
+            {
+                "period": period,
+                "mode": mode,
+                "start_date": start_date.date().isoformat(),
+                "end_date": end_date.date().isoformat(),
+                "total": total,
+                "data": serializer.data,
+            }
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="scheme",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description="Calendar scheme from the calendar table, e.g. quarterly or fiscal_445. "
+                "Defaults to quarterly.",
+                required=False,
+            ),
+            OpenApiParameter(
+                name="start_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="Start date (YYYY-MM-DD). Defaults to 30 days ago.",
+                required=False,
+            ),
+            OpenApiParameter(
+                name="end_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="End date (YYYY-MM-DD). Defaults to today.",
+                required=False,
+            ),
+        ],
+        responses={200: CalendarReportSerializer(many=True)},
     )
     @action(detail=False, methods=["get"])
-    def monthly(self, request):
+    @query_budget(4)
+    def calendar(self, request):
         start_date, end_date = self._parse_dates(request)
+        scheme = request.query_params.get("scheme", "quarterly")
 
-        report_data = ReportService.generate_report(start_date, end_date, "monthly")
+        try:
+            report_data = self._coalesced(
+                request, "calendar", lambda: ReportService.generate_calendar_report(start_date, end_date, scheme)
+            )
+        except ValueError as exc:
+            raise ValidationError({"scheme": str(exc)})
 
-        serializer = ReportSerializer(report_data, many=True)
+        serializer = CalendarReportSerializer(report_data, many=True)
         return Response(
             {
-                "period": "monthly",
+                "scheme": scheme,
                 "start_date": start_date.date().isoformat(),
                 "end_date": end_date.date().isoformat(),
                 "data": serializer.data,
             }
         )
 
-    def _parse_dates(self, request):
-        end_date_str = request.query_params.get("end_date")
-        start_date_str = request.query_params.get("start_date")
+    @extend_schema(
+        request=ReportBatchRequestSerializer,
+        responses={200: ReportBatchResponseSerializer},
+    )
+    @action(detail=False, methods=["post"])
+    @query_budget(4)
+    def batch(self, request):
+        serializer = ReportBatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        specs = serializer.validated_data["reports"]
+
+        reports = ReportService.generate_reports(
+            [
+                (
+                    datetime.combine(spec["start_date"], datetime.min.time()),
+                    datetime.combine(spec["end_date"], datetime.min.time()),
+                    spec["period"],
+                )
+                for spec in specs
+            ]
+        )
+
+        results = [{**spec, "data": report_data} for spec, report_data in zip(specs, reports)]
+        return Response(ReportBatchResponseSerializer({"reports": results}).data)
 
-        if end_date_str:
+    def _report_response(self, request, period):
+        start_date, end_date = self._parse_dates(request)
+        compare = request.query_params.get("compare")
+        group_by = request.query_params.get("group_by")
+        rolling = request.query_params.get("rolling")
+        cumulative = request.query_params.get("cumulative", "").lower() in ("1", "true", "yes")
+        accuracy = request.query_params.get("accuracy", "exact")
+
+        if accuracy not in ("exact", "approx"):
+            raise ValidationError({"accuracy": "Must be exact or approx"})
+        if accuracy == "approx":
+            if compare or group_by or rolling or cumulative:
+                raise ValidationError({"accuracy": "approx cannot be combined with compare, group_by or rolling"})
+            report_data = self._coalesced(
+                request, period, lambda: ReportService.generate_approx_report(start_date, end_date, period)
+            )
+            serializer = ApproxReportSerializer(report_data, many=True)
+        elif rolling or cumulative:
+            if compare or group_by:
+                raise ValidationError({"rolling": "Cannot be combined with compare or group_by"})
+            try:
+                windows = parse_rolling_windows(rolling or "")
+                report_data = self._coalesced(
+                    request,
+                    period,
+                    lambda: ReportService.generate_window_report(start_date, end_date, period, windows, cumulative),
+                )
+            except ValueError as exc:
+                raise ValidationError({"rolling": str(exc)})
+            serializer = ReportWindowSerializer(report_data, many=True)
+        elif group_by:
+            if compare:
+                raise ValidationError({"group_by": "Cannot be combined with compare"})
+            try:
+                user_ids = self._parse_user_ids(request)
+                report_data = self._coalesced(
+                    request,
+                    period,
+                    lambda: ReportService.generate_segmented_report(start_date, end_date, period, group_by, user_ids),
+                )
+            except ValueError as exc:
+                raise ValidationError({"group_by": str(exc)})
+            serializer = SegmentedReportSerializer(report_data, many=True)
+        elif compare:
             try:
-                end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
-            except ValueError:
-                end_date = datetime.now()
+                report_data = self._coalesced(
+                    request,
+                    period,
+                    lambda: ReportService.generate_comparison_report(start_date, end_date, period, compare),
+                )
+            except ValueError as exc:
+                raise ValidationError({"compare": str(exc)})
+            serializer = ReportComparisonSerializer(report_data, many=True)
         else:
+            report_data = self._coalesced(
+                request, period, lambda: ReportService.generate_report(start_date, end_date, period)
+            )
+            serializer = ReportSerializer(report_data, many=True)
+
+        response = {
+            "period": period,
+            "start_date": start_date.date().isoformat(),
+            "end_date": end_date.date().isoformat(),
+            "data": serializer.data,
+        }
+        if compare:
+            response["compare"] = compare
+        if group_by:
+            response["group_by"] = group_by
+        if accuracy == "approx":
+            response["accuracy"] = accuracy
+        return Response(response)
+
+    def _coalesced(self, request, period, compute):
+        return coalesced(f"report:{period}", request.query_params.dict(), compute)
+
+    def _parse_user_ids(self, request):
+        value = request.query_params.get("users")
+        if not value:
+            return None
+
+        try:
+            user_ids = [uuid.UUID(part.strip()) for part in value.split(",") if part.strip()]
+        except ValueError:
+            raise ValidationError({"users": "Must be a comma-separated list of user ids"})
+        if len(user_ids) > REPORT_SEGMENT_MAX_USERS:
+            raise ValidationError({"users": f"At most {REPORT_SEGMENT_MAX_USERS} users can be listed"})
+        return user_ids
+
+    def _parse_dates(self, request):
+        return parse_report_dates(request)
+
+
+def parse_report_dates(request):
+    end_date_str = request.query_params.get("end_date")
+    start_date_str = request.query_params.get("start_date")
+
+    if end_date_str:
+        try:
+            end_date = datetime.strptime(end_date_str, "%Y-%m-%d")
+        except ValueError:
             end_date = datetime.now()
+    else:
+        end_date = datetime.now()
 
-        if start_date_str:
-            try:
-                start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
-            except ValueError:
-                start_date = end_date - timedelta(days=30)
-        else:
+    if start_date_str:
+        try:
+            start_date = datetime.strptime(start_date_str, "%Y-%m-%d")
+        except ValueError:
             start_date = end_date - timedelta(days=30)
+    else:
+        start_date = end_date - timedelta(days=30)
+
+    return start_date, end_date
+
 
-        return start_date, end_date
+@require_GET
+def live_report_stream(request):
+    response = StreamingHttpResponse(stream_live_report(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
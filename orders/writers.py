@@ -0,0 +1,136 @@
+import csv
+import json
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+REPORT_COLUMNS = [
+    "Period",
+    "NewUsers",
+    "ActivatedUsers",
+    "OrdersCount",
+    "OrderItem1Count",
+    "OrderItem1Amount",
+    "OrderItem2Count",
+    "OrderItem2Amount",
+    "OrdersTotalAmount",
+]
+
+REPORT_FORMATS = ["csv", "jsonl", "parquet"]
+
+
+class WriterUnavailable(Exception):
+    pass
+
+
+def report_arrow_schema():
+    pa = import_pyarrow()
+    return pa.schema(
+        [
+            ("Period", pa.string()),
+            ("NewUsers", pa.int64()),
+            ("ActivatedUsers", pa.int64()),
+            ("OrdersCount", pa.int64()),
+            ("OrderItem1Count", pa.int64()),
+            ("OrderItem1Amount", pa.float64()),
+            ("OrderItem2Count", pa.int64()),
+            ("OrderItem2Amount", pa.float64()),
+            ("OrdersTotalAmount", pa.float64()),
+        ]
+    )
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise WriterUnavailable("Parquet output requires pyarrow; install requirements.txt") from exc
+    return pyarrow
+
+
+class CsvRowWriter:
+    def __init__(self, stream: TextIO, columns: List[str]):
+        self._writer = csv.DictWriter(stream, fieldnames=columns, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._writer.writerow(row)
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlRowWriter:
+    def __init__(self, stream: TextIO, columns: List[str]):
+        self._stream = stream
+        self._columns = columns
+
+    def write(self, row: Dict[str, Any]) -> None:
+        self._stream.write(json.dumps({column: row.get(column) for column in self._columns}, default=str) + "\n")
+
+    def close(self) -> None:
+        pass
+
+
+class ParquetRowWriter:
+    def __init__(self, path, schema, batch_size: int = 10000, compression: str = "snappy"):
+        pa = import_pyarrow()
+        self._pa = pa
+        self._schema = schema
+        self._batch_size = batch_size
+        self._columns: Dict[str, list] = {name: [] for name in schema.names}
+        self._rows = 0
+        self._writer = self._open(path, compression)
+
+    def _open(self, path, compression):
+        return self._pa.parquet.ParquetWriter(str(path), self._schema, compression=compression)
+
+    def write(self, row: Dict[str, Any]) -> None:
+        for name, values in self._columns.items():
+            values.append(row.get(name))
+        self._rows += 1
+        if self._rows >= self._batch_size:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+        self._writer.write_table(self._pa.Table.from_pydict(self._columns, schema=self._schema))
+        self._columns = {name: [] for name in self._schema.names}
+        self._rows = 0
+
+
+class ArrowRowWriter(ParquetRowWriter):
+    def __init__(self, path, schema, batch_size: int = 10000, compression: Optional[str] = None):
+        super().__init__(path, schema, batch_size=batch_size, compression=compression)
+
+    def _open(self, path, compression):
+        options = self._pa.ipc.IpcWriteOptions(compression=compression)
+        return self._pa.ipc.new_file(str(path), self._schema, options=options)
+
+
+def write_rows(rows: Iterable[Dict[str, Any]], writer) -> int:
+    written = 0
+    try:
+        for row in rows:
+            writer.write(row)
+            written += 1
+    finally:
+        writer.close()
+    return written
+
+
+def open_report_writer(fmt: str, stream: Optional[TextIO] = None, path=None, batch_size: int = 10000):
+    if fmt == "csv":
+        return CsvRowWriter(stream, REPORT_COLUMNS)
+    if fmt == "jsonl":
+        return JsonlRowWriter(stream, REPORT_COLUMNS)
+    if fmt == "parquet":
+        if path is None:
+            raise ValueError("Parquet output requires an output path")
+        return ParquetRowWriter(path, report_arrow_schema(), batch_size=batch_size)
+    raise ValueError(f"Invalid format: {fmt}. Must be one of {', '.join(REPORT_FORMATS)}")
@@ -29,6 +29,9 @@ docker compose exec -T web python manage.py makemigrations orders || echo "Order
 echo "🔄 Running database migrations..."
 docker compose exec -T web python manage.py migrate
 
+echo "🔎 Building search indexes..."
+docker compose exec -T web python manage.py create_search_indexes
+
 echo "🎲 Generating sample data..."
 docker compose exec -T web python manage.py generate_sample_data --users 30 --days 10
 
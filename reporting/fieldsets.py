@@ -0,0 +1,89 @@
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SerializerMethodField
+from rest_framework.relations import PrimaryKeyRelatedField, RelatedField
+from rest_framework.response import Response
+
+FIELDS_PARAMETER = OpenApiParameter(
+    name="fields",
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.QUERY,
+    description="Comma-separated subset of response fields. Only the matching columns are selected.",
+    required=False,
+)
+
+
+class SparseFieldsetMixin:
+    fields_query_param = "fields"
+    values_annotations = {}
+
+    def get_requested_fields(self):
+        request = getattr(self, "request", None)
+        value = request.query_params.get(self.fields_query_param) if request is not None else None
+        if not value or request.method != "GET":
+            return None
+
+        requested = list(dict.fromkeys(part.strip() for part in value.split(",") if part.strip()))
+        available = self.get_serializer_class()().fields
+        unknown = [name for name in requested if name not in available]
+        if unknown:
+            raise ValidationError({self.fields_query_param: f"Unknown fields: {', '.join(unknown)}"})
+        return requested
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        requested = self.get_requested_fields()
+        if requested:
+            fields = getattr(serializer, "child", serializer).fields
+            for name in list(fields):
+                if name not in requested:
+                    fields.pop(name)
+        return serializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, "action", None) != "list" or not self.values_annotations:
+            return queryset
+
+        fields = self.get_serializer().fields
+        return queryset.annotate(
+            **{name: expression() for name, expression in self.values_annotations.items() if name in fields}
+        )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        plan = self.get_values_plan(queryset)
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = queryset.values(*{source for _, source, _ in plan})
+        page = self.paginate_queryset(rows)
+        data = []
+        for row in rows if page is None else page:
+            item = {}
+            for name, source, convert in plan:
+                value = row[source]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def get_values_plan(self, queryset):
+        plan = []
+        for name, field in self.get_serializer().fields.items():
+            if field.write_only:
+                continue
+            if name in queryset.query.annotations:
+                plan.append((name, name, None))
+            elif isinstance(field, SerializerMethodField) or "." in field.source or field.source == "*":
+                return None
+            elif isinstance(field, RelatedField):
+                if not isinstance(field, PrimaryKeyRelatedField) or field.pk_field is not None:
+                    return None
+                plan.append((name, field.source, None))
+            else:
+                plan.append((name, field.source, field.to_representation))
+        return plan
@@ -0,0 +1,104 @@
+import json
+
+from django.conf import settings
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+def planner_row_estimate(queryset: QuerySet):
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    queryset = queryset.order_by()
+    with connection.cursor() as cursor:
+        if not queryset.query.where and not queryset.query.distinct:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            return int(row[0]) if row and row[0] >= 0 else None
+
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def estimate_count(queryset, threshold=None):
+    if threshold is None:
+        threshold = settings.ESTIMATED_COUNT_THRESHOLD
+    if not isinstance(queryset, QuerySet):
+        return len(queryset)
+
+    estimate = planner_row_estimate(queryset)
+    if estimate is None or estimate < threshold:
+        return queryset.count()
+    return estimate
+
+
+class LookaheadPage(Page):
+    def __init__(self, object_list, number, paginator, more):
+        super().__init__(object_list, number, paginator)
+        self.more = more
+
+    def has_next(self):
+        return self.more
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise EmptyPage("That page number is less than 1")
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage("That page contains no results")
+        return LookaheadPage(rows[: self.per_page], number, self, more=len(rows) > self.per_page)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    django_paginator_class = EstimatedCountPaginator
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class CappedResultPagination(BasePagination):
+    def paginate_queryset(self, queryset, request, view=None):
+        max_results = settings.SEARCH_MAX_RESULTS
+        rows = list(queryset[: max_results + 1])
+        self.truncated = len(rows) > max_results
+        return rows[:max_results]
+
+    def get_paginated_response(self, data):
+        return Response({"count": len(data), "truncated": self.truncated, "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["count", "truncated", "results"],
+            "properties": {
+                "count": {"type": "integer", "example": 20},
+                "truncated": {"type": "boolean"},
+                "results": schema,
+            },
+        }
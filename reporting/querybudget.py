@@ -0,0 +1,69 @@
+import logging
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def query_budget(limit: int):
+    def decorator(func):
+        func.query_budget = limit
+        return func
+
+    return decorator
+
+
+def report_overrun(view, request, count: int, budget: int) -> None:
+    name = f"{type(view).__name__}.{getattr(view, 'action', None) or request.method.lower()}"
+    message = f"{name} ran {count} queries (budget {budget}) for {request.method} {request.path}"
+    if settings.QUERY_BUDGET_RAISE:
+        raise QueryBudgetExceeded(message)
+    logger.warning(message, extra={"view": name, "query_count": count, "query_budget": budget})
+
+
+class QueryBudgetMixin:
+    query_budget = None
+    query_budgets = {}
+
+    def get_query_budget(self):
+        action = getattr(self, "action", None)
+        handler = getattr(self, action, None) if action else None
+        if getattr(handler, "query_budget", None) is not None:
+            return handler.query_budget
+        return self.query_budgets.get(action, self.query_budget)
+
+    def dispatch(self, request, *args, **kwargs):
+        with count_queries() as counter:
+            response = super().dispatch(request, *args, **kwargs)
+
+        budget = self.get_query_budget()
+        response["X-Query-Count"] = str(counter.count)
+        if budget is not None:
+            response["X-Query-Budget"] = str(budget)
+            if counter.count > budget:
+                report_overrun(self, self.request, counter.count, budget)
+        return response
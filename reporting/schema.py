@@ -0,0 +1,87 @@
+import gzip
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.views import View
+
+import yaml
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+
+SCHEMA_FORMATS = {
+    "yaml": "application/vnd.oai.openapi; charset=utf-8",
+    "json": "application/vnd.oai.openapi+json; charset=utf-8",
+}
+
+
+class SchemaVariant:
+    def __init__(self, body: bytes, content_type: str):
+        self.body = body
+        self.content_type = content_type
+        self.etag = f'"{hashlib.sha256(body).hexdigest()}"'
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.gzip_etag = self.etag[:-1] + '-gzip"'
+
+
+_variants = {}
+_lock = threading.Lock()
+
+
+def load_schema():
+    schema_file = settings.OPENAPI_SCHEMA_FILE
+    if schema_file:
+        text = Path(schema_file).read_text(encoding="utf-8")
+        return json.loads(text) if schema_file.endswith(".json") else yaml.safe_load(text)
+    return SchemaGenerator().get_schema(request=None, public=True)
+
+
+def build_schema_variants():
+    schema = load_schema()
+    return {
+        "yaml": SchemaVariant(OpenApiYamlRenderer().render(schema), SCHEMA_FORMATS["yaml"]),
+        "json": SchemaVariant(OpenApiJsonRenderer().render(schema, renderer_context={}), SCHEMA_FORMATS["json"]),
+    }
+
+
+def get_schema_variants():
+    if not _variants:
+        with _lock:
+            if not _variants:
+                _variants.update(build_schema_variants())
+    return _variants
+
+
+def reset_schema_cache():
+    with _lock:
+        _variants.clear()
+
+
+class CachedSchemaView(View):
+    def get(self, request):
+        variant = get_schema_variants()[self._negotiate_format(request)]
+
+        use_gzip = "gzip" in request.headers.get("Accept-Encoding", "")
+        etag = variant.gzip_etag if use_gzip else variant.etag
+
+        if etag in [tag.strip() for tag in request.headers.get("If-None-Match", "").split(",")]:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(variant.gzip_body if use_gzip else variant.body, content_type=variant.content_type)
+            if use_gzip:
+                response["Content-Encoding"] = "gzip"
+
+        response["ETag"] = etag
+        response["Cache-Control"] = f"public, max-age={settings.OPENAPI_SCHEMA_MAX_AGE}"
+        patch_vary_headers(response, ["Accept", "Accept-Encoding"])
+        return response
+
+    def _negotiate_format(self, request):
+        fmt = request.GET.get("format")
+        if fmt in SCHEMA_FORMATS:
+            return fmt
+        return "json" if "json" in request.headers.get("Accept", "") else "yaml"
@@ -0,0 +1,125 @@
+import logging
+import operator
+from functools import reduce
+
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import DatabaseError, connections, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest, Lower
+
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter
+from rest_framework import filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("contains", "prefix", "fuzzy")
+
+SEARCH_MODE_PARAMETER = OpenApiParameter(
+    name="search_mode",
+    type=OpenApiTypes.STR,
+    location=OpenApiParameter.QUERY,
+    description="How `search` matches: substring (contains), prefix, or typo-tolerant trigram similarity (fuzzy). "
+    "Defaults to contains.",
+    required=False,
+    enum=list(SEARCH_MODES),
+)
+
+_trigram_enabled = {}
+
+
+def trigram_enabled(using="default") -> bool:
+    if using not in _trigram_enabled:
+        connection = connections[using]
+        if connection.vendor != "postgresql":
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            _trigram_enabled[using] = cursor.fetchone() is not None
+    return _trigram_enabled[using]
+
+
+def ensure_trigram_indexes(model, fields, using="default") -> bool:
+    _trigram_enabled.pop(using, None)
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if cursor.fetchone() is None:
+            return False
+
+        try:
+            with transaction.atomic(using=using):
+                cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError as error:
+            logger.warning("Could not enable pg_trgm, fuzzy search stays disabled: %s", error)
+            return False
+
+        if connection.in_atomic_block:
+            raise transaction.TransactionManagementError(
+                "Trigram indexes are built concurrently and cannot run in a transaction"
+            )
+
+        table = model._meta.db_table
+        for field in fields:
+            column = model._meta.get_field(field).column
+            name = f"{table}_{column}_trgm"
+            cursor.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", [name])
+            row = cursor.fetchone()
+            if row is not None and not row[0]:
+                logger.warning("Rebuilding %s, left invalid by an interrupted build", name)
+                cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {connection.ops.quote_name(name)}")
+            cursor.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {connection.ops.quote_name(name)} "
+                f"ON {connection.ops.quote_name(table)} USING gin (LOWER({connection.ops.quote_name(column)}) "
+                "gin_trgm_ops)"
+            )
+    return trigram_enabled(using)
+
+
+class IndexedSearchFilter(filters.SearchFilter):
+    search_mode_param = "search_mode"
+
+    def filter_queryset(self, request, queryset, view):
+        fields = [field.lstrip("^=@$") for field in self.get_search_fields(view, request) or ()]
+        terms = [term.lower() for term in self.get_search_terms(request)]
+        if not fields or not terms:
+            return queryset
+
+        mode = request.query_params.get(self.search_mode_param, "contains")
+        if mode not in SEARCH_MODES:
+            raise ValidationError({self.search_mode_param: f"Must be one of {', '.join(SEARCH_MODES)}"})
+        if mode == "fuzzy" and not trigram_enabled(queryset.db):
+            raise ValidationError({self.search_mode_param: "Fuzzy search requires the pg_trgm extension"})
+
+        aliases = {f"_search_{field}": Lower(field) for field in fields}
+        queryset = queryset.alias(**aliases)
+        lookup = {"contains": "contains", "prefix": "startswith", "fuzzy": "trigram_word_similar"}[mode]
+        for term in terms:
+            condition = Q()
+            for alias in aliases:
+                condition |= Q(**{f"{alias}__{lookup}": term})
+            queryset = queryset.filter(condition)
+
+        if request.query_params.get(api_settings.ORDERING_PARAM):
+            return queryset
+        if mode == "fuzzy":
+            scores = []
+            for term in terms:
+                similarities = [TrigramWordSimilarity(Value(term), alias) for alias in aliases]
+                scores.append(similarities[0] if len(similarities) == 1 else Greatest(*similarities))
+            score = reduce(operator.add, scores)
+            return queryset.alias(_search_rank=score).order_by("-_search_rank", *fields[:1])
+
+        phrase = " ".join(terms)
+        rank = Case(
+            *[When(**{alias: phrase}, then=Value(0)) for alias in aliases],
+            *[When(**{f"{alias}__startswith": terms[0]}, then=Value(1)) for alias in aliases],
+            default=Value(2),
+            output_field=IntegerField(),
+        )
+        return queryset.alias(_search_rank=rank).order_by("_search_rank", *fields[:1])
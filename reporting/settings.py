@@ -16,6 +16,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "django_filters",
     "drf_spectacular",
@@ -86,12 +87,45 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+REPORT_CACHE_TIMEOUT = int(os.environ.get("REPORT_CACHE_TIMEOUT", 60 * 60 * 24))
+REPORT_COALESCE_TIMEOUT = float(os.environ.get("REPORT_COALESCE_TIMEOUT", 30))
+
+CHANGE_FEED_SAFETY_LAG = float(os.environ.get("CHANGE_FEED_SAFETY_LAG", 10))
+
+ESTIMATED_COUNT_THRESHOLD = int(os.environ.get("ESTIMATED_COUNT_THRESHOLD", 10000))
+SEARCH_MAX_RESULTS = int(os.environ.get("SEARCH_MAX_RESULTS", 50))
+
+REPORT_SHARD_WORKERS = int(os.environ.get("REPORT_SHARD_WORKERS", 1))
+REPORT_SHARD_DAYS = int(os.environ.get("REPORT_SHARD_DAYS", 90))
+
+REPORT_SAMPLE_ROWS = int(os.environ.get("REPORT_SAMPLE_ROWS", 100000))
+REPORT_SAMPLE_METHOD = os.environ.get("REPORT_SAMPLE_METHOD", "SYSTEM")
+
+QUERY_BUDGET_RAISE = os.environ.get("QUERY_BUDGET_RAISE", str(DEBUG)) == "True"
+
+REPORT_LIVE_RESYNC_SECONDS = int(os.environ.get("REPORT_LIVE_RESYNC_SECONDS", 60))
+REPORT_LIVE_HEARTBEAT_SECONDS = int(os.environ.get("REPORT_LIVE_HEARTBEAT_SECONDS", 15))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "reporting.pagination.EstimatedCountPagination",
     "PAGE_SIZE": 100,
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
@@ -104,6 +138,9 @@ REST_FRAMEWORK = {
     ],
 }
 
+OPENAPI_SCHEMA_FILE = os.environ.get("OPENAPI_SCHEMA_FILE", "")
+OPENAPI_SCHEMA_MAX_AGE = int(os.environ.get("OPENAPI_SCHEMA_MAX_AGE", 60 * 60))
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "User Orders Report API",
     "DESCRIPTION": "API for generating user activity and order statistics reports",
@@ -0,0 +1,36 @@
+from django.test import override_settings
+from django.urls import reverse
+
+BUDGET_CHECK_PAGE_SIZE = 1000
+
+
+class QueryBudgetTestMixin:
+    def assertRoutesWithinBudget(self, router, detail_pks=None, params=None):
+        detail_pks = detail_pks or {}
+        params = params or {}
+        checked = []
+
+        for prefix, viewset, basename in router.registry:
+            for route in router.get_routes(viewset):
+                action = router.get_method_map(viewset, route.mapping).get("get")
+                if action is None:
+                    continue
+
+                name = route.name.format(basename=basename)
+                kwargs = {}
+                if "{lookup}" in route.url:
+                    if basename not in detail_pks:
+                        self.fail(f"No object to request for detail route {name}")
+                    kwargs = {"pk": detail_pks[basename]}
+
+                query = {"page_size": BUDGET_CHECK_PAGE_SIZE, **params.get(name, {})}
+                with override_settings(QUERY_BUDGET_RAISE=False):
+                    response = self.client.get(reverse(name, kwargs=kwargs), query)
+
+                with self.subTest(route=name):
+                    self.assertLess(response.status_code, 500)
+                    self.assertIn("X-Query-Budget", response, f"{name} does not declare a query budget")
+                    self.assertLessEqual(int(response["X-Query-Count"]), int(response["X-Query-Budget"]))
+                checked.append(name)
+
+        return checked
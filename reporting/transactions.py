@@ -0,0 +1,8 @@
+from django.db import router, transaction
+
+
+class AtomicSaveMixin:
+    def save(self, *args, using=None, **kwargs):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, using=using, **kwargs)
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
+from reporting.pagination import EstimatedCountPaginator
+
 from .models import User
 
 
@@ -10,3 +12,5 @@ class UserAdmin(BaseUserAdmin):
     list_filter = ("is_active", "is_staff", "date_joined")
     search_fields = ("email", "username")
     ordering = ("-date_joined",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
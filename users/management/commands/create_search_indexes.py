@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from reporting.search import ensure_trigram_indexes
+from users.models import User
+from users.views import UserViewSet
+
+
+class Command(BaseCommand):
+    help = "Enable pg_trgm and build the user search trigram indexes without blocking writes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to build the indexes on. Default: default",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("Building user search indexes..."))
+
+        if ensure_trigram_indexes(User, UserViewSet.search_fields, options["database"]):
+            self.stdout.write(self.style.SUCCESS("Trigram indexes are in place; fuzzy search is enabled"))
+        else:
+            self.stdout.write(self.style.WARNING("pg_trgm is not available; fuzzy search stays disabled"))
@@ -1,9 +1,18 @@
 import uuid
 
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
 from django.db.models import Count, DecimalField, F, Sum
-from django.db.models.functions import Coalesce
+from django.db.models.functions import Coalesce, Lower
+
+from reporting.transactions import AtomicSaveMixin
+
+LEADERBOARD_METRICS = {
+    "spend": lambda: Sum(F("daily_stats__orderitem1_amount") + F("daily_stats__orderitem2_amount")),
+    "orders": lambda: Sum("daily_stats__orders_count"),
+    "items": lambda: Sum(F("daily_stats__orderitem1_count") + F("daily_stats__orderitem2_count")),
+}
 
 
 class UserQuerySet(models.QuerySet):
@@ -44,6 +53,17 @@ class UserQuerySet(models.QuerySet):
             ),
         ).annotate(total_spent=F("orderitem1_total") + F("orderitem2_placement_total") + F("orderitem2_article_total"))
 
+    def top_by(self, metric, start_date, end_date, limit=50):
+        if metric not in LEADERBOARD_METRICS:
+            raise ValueError(f"Invalid metric: {metric}. Must be one of {', '.join(LEADERBOARD_METRICS)}")
+
+        return (
+            self.filter(daily_stats__day__gte=start_date, daily_stats__day__lt=end_date)
+            .annotate(leaderboard_value=LEADERBOARD_METRICS[metric]())
+            .filter(leaderboard_value__gt=0)
+            .order_by("-leaderboard_value", "pk")[:limit]
+        )
+
 
 class UserManager(models.Manager):
     def get_queryset(self):
@@ -95,18 +115,36 @@ class UserManager(models.Manager):
     def with_total_spent(self):
         return self.get_queryset().with_total_spent()
 
+    def top_by(self, metric, start_date, end_date, limit=50):
+        return self.get_queryset().top_by(metric, start_date, end_date, limit)
+
 
-class User(AbstractUser):
+class User(AtomicSaveMixin, AbstractUser):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     email = models.EmailField(unique=True)
     is_active = models.BooleanField(default=False)
     date_joined = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = UserManager()
 
     class Meta:
         db_table = "users_user"
         ordering = ["-date_joined"]
+        indexes = [
+            models.Index(fields=["updated_at", "id"]),
+            models.Index(OpClass(Lower("username"), name="text_pattern_ops"), name="users_user_username_prefix"),
+            models.Index(OpClass(Lower("email"), name="text_pattern_ops"), name="users_user_email_prefix"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_identity = instance.identity()
+        return instance
+
+    def identity(self):
+        return self.__dict__.get("username"), self.__dict__.get("email")
 
     def __str__(self):
         return self.email
@@ -30,3 +30,19 @@ class UserStatisticsSerializer(serializers.ModelSerializer):
             "total_spent",
         ]
         read_only_fields = ["id", "date_joined"]
+
+
+class LeaderboardEntrySerializer(serializers.ModelSerializer):
+    value = serializers.DecimalField(source="leaderboard_value", max_digits=14, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = User
+        fields = ["id", "username", "email", "value"]
+        read_only_fields = fields
+
+
+class UserChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ["id", "username", "email", "is_active", "date_joined", "updated_at"]
+        read_only_fields = fields
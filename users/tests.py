@@ -1,36 +1,42 @@
+from datetime import timedelta
 from decimal import Decimal
+from io import StringIO
 
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
 from django.utils import timezone
 
 from orders.models import Order, OrderItem1, OrderItem2
+from reporting.search import ensure_trigram_indexes
 from users.models import User
 
 
 class UserQuerySetTestCase(TestCase):
     def setUp(self):
-        self.user1 = User.objects.create_user(
-            username="user1", email="user1@example.com", password="testpass123", is_active=True
-        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user1 = User.objects.create_user(
+                username="user1", email="user1@example.com", password="testpass123", is_active=True
+            )
 
-        self.user2 = User.objects.create_user(
-            username="user2", email="user2@example.com", password="testpass123", is_active=False
-        )
+            self.user2 = User.objects.create_user(
+                username="user2", email="user2@example.com", password="testpass123", is_active=False
+            )
 
-        now = timezone.now()
-        self.order1 = Order.objects.create(user=self.user1, created_at=now)
-        self.order2 = Order.objects.create(user=self.user1, created_at=now)
+            now = timezone.now()
+            self.order1 = Order.objects.create(user=self.user1, created_at=now)
+            self.order2 = Order.objects.create(user=self.user1, created_at=now)
 
-        OrderItem1.objects.create(order=self.order1, price=Decimal("100.50"), created_at=now)
-        OrderItem1.objects.create(order=self.order1, price=Decimal("50.25"), created_at=now)
+            OrderItem1.objects.create(order=self.order1, price=Decimal("100.50"), created_at=now)
+            OrderItem1.objects.create(order=self.order1, price=Decimal("50.25"), created_at=now)
 
-        OrderItem2.objects.create(
-            order=self.order1, placement_price=Decimal("30.00"), article_price=Decimal("20.00"), created_at=now
-        )
+            OrderItem2.objects.create(
+                order=self.order1, placement_price=Decimal("30.00"), article_price=Decimal("20.00"), created_at=now
+            )
 
-        OrderItem2.objects.create(
-            order=self.order2, placement_price=Decimal("15.00"), article_price=Decimal("10.00"), created_at=now
-        )
+            OrderItem2.objects.create(
+                order=self.order2, placement_price=Decimal("15.00"), article_price=Decimal("10.00"), created_at=now
+            )
 
     def test_with_orders_count(self):
         users = User.objects.with_orders_count()
@@ -100,3 +106,93 @@ class UserQuerySetTestCase(TestCase):
         self.assertEqual(user2.orderitem1_total, Decimal("0"))
         self.assertEqual(user2.orderitem2_total, Decimal("0"))
         self.assertEqual(user2.total_spent, Decimal("0"))
+
+    def test_top_by_spend(self):
+        today = timezone.now().date()
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(user=self.user2, created_at=timezone.now())
+            OrderItem1.objects.create(order=order, price=Decimal("500.00"), created_at=timezone.now())
+
+        users = list(User.objects.top_by("spend", today - timedelta(days=1), today + timedelta(days=1), limit=1))
+
+        self.assertEqual(len(users), 1)
+        self.assertEqual(users[0].id, self.user2.id)
+        self.assertEqual(users[0].leaderboard_value, Decimal("500.00"))
+
+    def test_top_by_orders_and_items(self):
+        today = timezone.now().date()
+
+        by_orders = User.objects.top_by("orders", today, today + timedelta(days=1))
+        by_items = User.objects.top_by("items", today, today + timedelta(days=1))
+
+        self.assertEqual([(u.id, u.leaderboard_value) for u in by_orders], [(self.user1.id, 2)])
+        self.assertEqual([(u.id, u.leaderboard_value) for u in by_items], [(self.user1.id, 4)])
+
+    def test_top_by_excludes_out_of_range(self):
+        today = timezone.now().date()
+
+        users = User.objects.top_by("spend", today - timedelta(days=10), today - timedelta(days=5))
+
+        self.assertEqual(list(users), [])
+
+    def test_top_by_invalid_metric(self):
+        with self.assertRaises(ValueError):
+            User.objects.top_by("refunds", timezone.now().date(), timezone.now().date())
+
+
+class SearchIndexCommandTestCase(TransactionTestCase):
+    def setUp(self):
+        self.statements = []
+        self.addCleanup(self._drop_indexes)
+
+    def _drop_indexes(self):
+        with connection.cursor() as cursor:
+            for column in ("username", "email"):
+                cursor.execute(f"DROP INDEX IF EXISTS users_user_{column}_trgm")
+
+    def _btree_instead_of_trigram(self, execute, sql, params, many, context):
+        if "pg_available_extensions" in sql:
+            sql, params = "SELECT 1", None
+        elif "CREATE EXTENSION" in sql:
+            sql = "SELECT 1"
+        elif "INDEX" in sql:
+            sql = sql.replace("USING gin (", "(").replace(" gin_trgm_ops)", ")")
+            self.statements.append((sql, connection.in_atomic_block))
+        return execute(sql, params, many, context)
+
+    def _index_is_valid(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)", [name])
+            row = cursor.fetchone()
+        return row and row[0]
+
+    def test_command_builds_indexes_concurrently_outside_a_transaction(self):
+        with connection.execute_wrapper(self._btree_instead_of_trigram):
+            call_command("create_search_indexes", stdout=StringIO())
+            call_command("create_search_indexes", stdout=StringIO())
+
+        created = [(sql, atomic) for sql, atomic in self.statements if sql.startswith("CREATE")]
+        self.assertEqual(len(created), 4)
+        self.assertTrue(all("CONCURRENTLY IF NOT EXISTS" in sql and not atomic for sql, atomic in created))
+        self.assertTrue(self._index_is_valid("users_user_username_trgm"))
+        self.assertTrue(self._index_is_valid("users_user_email_trgm"))
+
+    def test_invalid_index_from_an_interrupted_build_is_rebuilt(self):
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE INDEX users_user_username_trgm ON users_user (LOWER(username))")
+            cursor.execute(
+                "UPDATE pg_index SET indisvalid = false WHERE indexrelid = 'users_user_username_trgm'::regclass"
+            )
+
+        with connection.execute_wrapper(self._btree_instead_of_trigram), self.assertLogs("reporting.search", "WARNING"):
+            ensure_trigram_indexes(User, ["username"])
+
+        self.assertIn("DROP INDEX CONCURRENTLY", self.statements[0][0])
+        self.assertTrue(self._index_is_valid("users_user_username_trgm"))
+
+    def test_refuses_to_build_inside_a_transaction(self):
+        with connection.execute_wrapper(self._btree_instead_of_trigram), transaction.atomic():
+            with self.assertRaises(transaction.TransactionManagementError):
+                ensure_trigram_indexes(User, ["username"])
+
+        self.assertEqual(self.statements, [])
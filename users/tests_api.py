@@ -1,35 +1,45 @@
+from datetime import timedelta
 from decimal import Decimal
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
 
+from orders.cache import VERSION_KEY
 from orders.models import Order, OrderItem1, OrderItem2
+from reporting.search import IndexedSearchFilter, ensure_trigram_indexes, trigram_enabled
 from users.models import User
+from users.views import UserViewSet
 
 
 class UserAPITestCase(TestCase):
     def setUp(self):
-        self.client = APIClient()
+        with self.captureOnCommitCallbacks(execute=True):
+            cache.clear()
+            self.client = APIClient()
 
-        self.user1 = User.objects.create_user(
-            username="user1", email="user1@example.com", password="testpass123", is_active=True
-        )
+            self.user1 = User.objects.create_user(
+                username="user1", email="user1@example.com", password="testpass123", is_active=True
+            )
 
-        self.user2 = User.objects.create_user(
-            username="user2", email="user2@example.com", password="testpass123", is_active=False
-        )
+            self.user2 = User.objects.create_user(
+                username="user2", email="user2@example.com", password="testpass123", is_active=False
+            )
 
-        now = timezone.now()
-        self.order1 = Order.objects.create(user=self.user1, created_at=now)
+            now = timezone.now()
+            self.order1 = Order.objects.create(user=self.user1, created_at=now)
 
-        OrderItem1.objects.create(order=self.order1, price=Decimal("100.50"), created_at=now)
-        OrderItem2.objects.create(
-            order=self.order1, placement_price=Decimal("30.00"), article_price=Decimal("20.00"), created_at=now
-        )
+            OrderItem1.objects.create(order=self.order1, price=Decimal("100.50"), created_at=now)
+            OrderItem2.objects.create(
+                order=self.order1, placement_price=Decimal("30.00"), article_price=Decimal("20.00"), created_at=now
+            )
 
     def test_list_users(self):
         url = reverse("user-list")
@@ -38,6 +48,19 @@ class UserAPITestCase(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 2)
 
+    def test_list_users_with_sparse_fields(self):
+        url = reverse("user-list")
+        response = self.client.get(url, {"fields": "id,email", "ordering": "username"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"],
+            [
+                {"id": str(self.user1.id), "email": "user1@example.com"},
+                {"id": str(self.user2.id), "email": "user2@example.com"},
+            ],
+        )
+
     def test_retrieve_user(self):
         url = reverse("user-detail", kwargs={"pk": self.user1.id})
         response = self.client.get(url)
@@ -96,3 +119,191 @@ class UserAPITestCase(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 2)
+
+    def test_user_report(self):
+        url = reverse("user-report", kwargs={"pk": self.user1.id})
+        today = timezone.now().date()
+        response = self.client.get(
+            url,
+            {
+                "period": "daily",
+                "start_date": (today - timedelta(days=1)).isoformat(),
+                "end_date": (today + timedelta(days=1)).isoformat(),
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["period"], "daily")
+        self.assertEqual(len(response.data["data"]), 2)
+        self.assertEqual(response.data["data"][1]["OrdersCount"], 1)
+        self.assertEqual(response.data["data"][1]["OrdersTotalAmount"], 150.50)
+
+    def test_user_report_invalid_period(self):
+        url = reverse("user-report", kwargs={"pk": self.user1.id})
+        response = self.client.get(url, {"period": "hourly"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_leaderboard(self):
+        url = reverse("user-leaderboard")
+        today = timezone.now().date()
+        response = self.client.get(
+            url,
+            {
+                "metric": "spend",
+                "start_date": today.isoformat(),
+                "end_date": (today + timedelta(days=1)).isoformat(),
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["data"]), 1)
+        self.assertEqual(response.data["data"][0]["email"], "user1@example.com")
+        self.assertEqual(float(response.data["data"][0]["value"]), 150.50)
+
+    def test_leaderboard_closed_range_is_cached_until_backdated_write(self):
+        url = reverse("user-leaderboard")
+        yesterday = timezone.now() - timedelta(days=1)
+        params = {
+            "metric": "orders",
+            "start_date": yesterday.date().isoformat(),
+            "end_date": timezone.now().date().isoformat(),
+        }
+
+        self.assertEqual(self.client.get(url, params).data["data"], [])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, params).data["data"], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(user=self.user2, created_at=yesterday)
+
+        response = self.client.get(url, params)
+        self.assertEqual(len(response.data["data"]), 1)
+        self.assertEqual(response.data["data"][0]["email"], "user2@example.com")
+
+    def test_leaderboard_cache_ignores_entries_from_before_a_version_eviction(self):
+        url = reverse("user-leaderboard")
+        yesterday = timezone.now() - timedelta(days=1)
+        params = {"metric": "orders", "start_date": yesterday.date().isoformat(), "end_date": timezone.now().date()}
+
+        self.assertEqual(self.client.get(url, params).data["data"], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(user=self.user2, created_at=yesterday)
+        self.assertEqual(len(self.client.get(url, params).data["data"]), 1)
+
+        cache.delete(VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(user=self.user1, created_at=yesterday)
+
+        self.assertEqual(len(self.client.get(url, params).data["data"]), 2)
+
+    def test_leaderboard_cache_is_invalidated_when_a_user_is_renamed(self):
+        url = reverse("user-leaderboard")
+        yesterday = timezone.now() - timedelta(days=1)
+        params = {"metric": "orders", "start_date": yesterday.date().isoformat(), "end_date": timezone.now().date()}
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.create(user=self.user2, created_at=yesterday)
+        self.assertEqual(self.client.get(url, params).data["data"][0]["username"], "user2")
+
+        User.objects.get(pk=self.user2.pk).save()
+        with self.assertNumQueries(0):
+            self.client.get(url, params)
+
+        response = self.client.patch(
+            reverse("user-detail", kwargs={"pk": self.user2.pk}), {"username": "renamed"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(self.client.get(url, params).data["data"][0]["username"], "renamed")
+
+    def test_leaderboard_invalid_metric(self):
+        url = reverse("user-leaderboard")
+        response = self.client.get(url, {"metric": "refunds"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserSearchAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for username, email in (
+            ("maria", "maria@example.com"),
+            ("mariano", "mariano@example.com"),
+            ("anna.maria", "anna@example.com"),
+            ("bob", "bob@shop.example.com"),
+        ):
+            User.objects.create_user(username=username, email=email, password="secret")
+
+    def search(self, **params):
+        response = self.client.get(reverse("user-list"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return [user["username"] for user in response.data["results"]]
+
+    def test_contains_ranks_exact_then_prefix_matches(self):
+        self.assertEqual(self.search(search="MARIA"), ["maria", "mariano", "anna.maria"])
+        self.assertEqual(self.search(search="shop"), ["bob"])
+
+    def test_prefix_mode(self):
+        self.assertEqual(self.search(search="mari", search_mode="prefix"), ["maria", "mariano"])
+        self.assertEqual(self.search(search="anna@", search_mode="prefix"), ["anna.maria"])
+
+    def test_terms_must_each_match_some_field(self):
+        self.assertEqual(self.search(search="anna maria"), ["anna.maria"])
+        self.assertEqual(self.search(search="maria anna@"), ["anna.maria"])
+        self.assertEqual(self.search(search="maria shop"), [])
+        self.assertEqual(self.search(search="mari mariano@", search_mode="prefix"), ["mariano"])
+
+    def test_explicit_ordering_wins_over_rank(self):
+        self.assertEqual(self.search(search="maria", ordering="-username"), ["mariano", "maria", "anna.maria"])
+
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_results_are_capped_without_count_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user-list"), {"search": "maria"})
+
+        self.assertEqual(response.data["count"], 2)
+        self.assertTrue(response.data["truncated"])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("COUNT(", queries[0]["sql"])
+
+    def test_invalid_mode(self):
+        response = self.client.get(reverse("user-list"), {"search": "maria", "search_mode": "regex"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prefix_search_uses_index(self):
+        queryset = IndexedSearchFilter().filter_queryset(
+            Request(APIRequestFactory().get("/", {"search": "mari", "search_mode": "prefix"})),
+            User.objects.all(),
+            UserViewSet(),
+        )
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(f"EXPLAIN {sql}", params)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+
+        self.assertIn("users_user_username_prefix", plan)
+        self.assertIn("users_user_email_prefix", plan)
+
+    def test_missing_extension_is_logged_and_leaves_transaction_usable(self):
+        def unavailable_extension(execute, sql, params, many, context):
+            if "pg_available_extensions" in sql:
+                sql, params = "SELECT 1", None
+            elif "CREATE EXTENSION" in sql:
+                sql = "CREATE EXTENSION pg_trgm_unavailable"
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(unavailable_extension), self.assertLogs("reporting.search", "WARNING"):
+            self.assertFalse(ensure_trigram_indexes(User, ["username"]))
+
+        self.assertEqual(User.objects.count(), 4)
+
+    def test_fuzzy_search(self):
+        if not trigram_enabled():
+            response = self.client.get(reverse("user-list"), {"search": "mariq", "search_mode": "fuzzy"})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            return
+
+        self.assertEqual(set(self.search(search="mariq", search_mode="fuzzy")), {"maria", "mariano", "anna.maria"})
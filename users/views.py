@@ -1,22 +1,51 @@
 from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import filters, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
-from .models import User
-from .serializers import UserSerializer, UserStatisticsSerializer
+from orders.cache import cached_for_closed_range
+from orders.reports import ReportService
+from orders.rollups import day_bounds
+from orders.serializers import UserReportSerializer
+from orders.views import parse_report_dates
+from reporting.fieldsets import FIELDS_PARAMETER, SparseFieldsetMixin
+from reporting.pagination import CappedResultPagination
+from reporting.querybudget import QueryBudgetMixin, query_budget
+from reporting.search import SEARCH_MODE_PARAMETER, IndexedSearchFilter
 
+from .models import LEADERBOARD_METRICS, User
+from .serializers import LeaderboardEntrySerializer, UserSerializer, UserStatisticsSerializer
 
-class UserViewSet(viewsets.ModelViewSet):
+LEADERBOARD_DEFAULT_LIMIT = 50
+LEADERBOARD_MAX_LIMIT = 1000
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=[FIELDS_PARAMETER, SEARCH_MODE_PARAMETER]),
+    retrieve=extend_schema(parameters=[FIELDS_PARAMETER]),
+    statistics=extend_schema(parameters=[SEARCH_MODE_PARAMETER]),
+)
+class UserViewSet(QueryBudgetMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, IndexedSearchFilter]
     filterset_fields = ["is_active", "date_joined"]
     search_fields = ["username", "email"]
     ordering_fields = ["date_joined", "username", "email"]
     ordering = ["-date_joined"]
+    query_budgets = {"list": 3, "retrieve": 1, "create": 4, "update": 4, "partial_update": 4}
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and self.request.query_params.get(IndexedSearchFilter.search_param):
+            self._paginator = CappedResultPagination()
+        return super().paginator
 
     @action(detail=False, methods=["get"])
+    @query_budget(3)
     def statistics(self, request):
         queryset = self.filter_queryset(User.objects.with_statistics())
 
@@ -29,7 +58,127 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
     @action(detail=True, methods=["get"])
+    @query_budget(1)
     def user_statistics(self, request, pk=None):
         user = User.objects.with_statistics().get(pk=pk)
         serializer = UserStatisticsSerializer(user)
         return Response(serializer.data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="metric",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description="Ranking metric: spend, orders or items. Defaults to spend.",
+                required=False,
+                enum=list(LEADERBOARD_METRICS),
+            ),
+            OpenApiParameter(
+                name="limit",
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description=f"Number of users to return (max {LEADERBOARD_MAX_LIMIT}). Defaults to 50.",
+                required=False,
+            ),
+            OpenApiParameter(
+                name="start_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="Start date (YYYY-MM-DD). Defaults to 30 days ago.",
+                required=False,
+            ),
+            OpenApiParameter(
+                name="end_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="End date (YYYY-MM-DD). Defaults to today.",
+                required=False,
+            ),
+        ],
+        responses={200: LeaderboardEntrySerializer(many=True)},
+    )
+    @action(detail=False, methods=["get"])
+    @query_budget(1)
+    def leaderboard(self, request):
+        metric = request.query_params.get("metric", "spend")
+        if metric not in LEADERBOARD_METRICS:
+            raise ValidationError({"metric": f"Must be one of {', '.join(LEADERBOARD_METRICS)}"})
+
+        try:
+            limit = int(request.query_params.get("limit", LEADERBOARD_DEFAULT_LIMIT))
+        except ValueError:
+            raise ValidationError({"limit": "Must be an integer"})
+        limit = max(1, min(limit, LEADERBOARD_MAX_LIMIT))
+
+        start_date, end_date = parse_report_dates(request)
+        first_day, last_day = day_bounds(start_date, end_date)
+
+        def compute():
+            users = User.objects.top_by(metric, first_day, last_day, limit)
+            return list(LeaderboardEntrySerializer(users, many=True).data)
+
+        data = cached_for_closed_range(
+            "leaderboard",
+            {"metric": metric, "start": first_day, "end": last_day, "limit": limit},
+            end_date,
+            compute,
+        )
+        return Response(
+            {
+                "metric": metric,
+                "start_date": start_date.date().isoformat(),
+                "end_date": end_date.date().isoformat(),
+                "data": data,
+            }
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name="period",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.QUERY,
+                description="Aggregation period: daily, weekly or monthly. Defaults to daily.",
+                required=False,
+                enum=["daily", "weekly", "monthly"],
+            ),
+            OpenApiParameter(
+                name="start_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="Start date (YYYY-MM-DD). Defaults to 30 days ago.",
+                required=False,
+            ),
+            OpenApiParameter(
+                name="end_date",
+                type=OpenApiTypes.DATE,
+                location=OpenApiParameter.QUERY,
+                description="End date (YYYY-MM-DD). Defaults to today.",
+                required=False,
+            ),
+        ],
+        responses={200: UserReportSerializer(many=True)},
+    )
+    @action(detail=True, methods=["get"])
+    @query_budget(2)
+    def report(self, request, pk=None):
+        user = self.get_object()
+        period = request.query_params.get("period", "daily")
+        start_date, end_date = parse_report_dates(request)
+
+        try:
+            report_data = ReportService.generate_user_report(user.pk, start_date, end_date, period)
+        except ValueError as exc:
+            raise ValidationError({"period": str(exc)})
+
+        serializer = UserReportSerializer(report_data, many=True)
+        return Response(
+            {
+                "user": user.pk,
+                "period": period,
+                "start_date": start_date.date().isoformat(),
+                "end_date": end_date.date().isoformat(),
+                "data": serializer.data,
+            }
+        )